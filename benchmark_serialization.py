@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Serialization benchmark
+Measures, per tool, the JSON cost of decoding a device response and
+encoding the tool result: stdlib json with indent=2 (before), stdlib json
+with the compact output format, and the shared codec with the compact
+output format (after)
+"""
+
+import sys
+import json
+import time
+from pathlib import Path
+
+# Add project root to path
+sys.path.append(str(Path(__file__).parent))
+
+from fortigate import codec
+from mcptool.output import encode
+
+
+def policy(i):
+    return {
+        'policyid': i, 'q_origin_key': i, 'name': f'policy-{i}', 'uuid': f'6f1c{i:08x}-0000-51ee-0000-000000000000',
+        'srcintf': [{'name': 'port1', 'q_origin_key': 'port1'}], 'dstintf': [{'name': 'wan1', 'q_origin_key': 'wan1'}],
+        'action': 'accept' if i % 3 else 'deny', 'status': 'enable', 'schedule': 'always',
+        'srcaddr': [{'name': f'net-{i % 250}', 'q_origin_key': f'net-{i % 250}'}],
+        'dstaddr': [{'name': 'all', 'q_origin_key': 'all'}],
+        'service': [{'name': 'HTTPS', 'q_origin_key': 'HTTPS'}, {'name': 'DNS', 'q_origin_key': 'DNS'}],
+        'nat': 'enable', 'logtraffic': 'utm', 'utm-status': 'enable', 'inspection-mode': 'flow',
+        'av-profile': 'default', 'webfilter-profile': '', 'ips-sensor': 'default', 'comments': f'rule {i}',
+        'hit_count': i * 7, 'bytes': i * 1024,
+    }
+
+
+def session(i):
+    return {
+        'proto': 6, 'saddr': f'10.{i % 256}.{i // 256 % 256}.1', 'daddr': '93.184.216.34',
+        'sport': 1024 + i % 60000, 'dport': 443, 'policyid': i % 500, 'duration': i % 3600,
+        'expiry': 3600, 'bytes': i * 10, 'packets': i, 'srcintf': 'port1', 'dstintf': 'wan1',
+        'shaping_policy_id': 0, 'vdom': 'root', 'country': 'Reserved',
+    }
+
+
+def local_user(i):
+    return {
+        'name': f'user{i}', 'q_origin_key': f'user{i}', 'id': i, 'status': 'enable', 'type': 'password',
+        'two-factor': 'disable', 'email-to': f'user{i}@example.com', 'sms-phone': '',
+        'passwd-policy': '', 'passwd-time': '0000-00-00 00:00:00', 'authtimeout': 0,
+    }
+
+
+def address(i):
+    return {
+        'name': f'net-{i}', 'q_origin_key': f'net-{i}', 'uuid': f'a1b2{i:08x}-0000-51ee-0000-000000000000',
+        'type': 'ipmask', 'subnet': f'10.{i // 256 % 256}.{i % 256}.0 255.255.255.0',
+        'associated-interface': '', 'color': 0, 'comment': '', 'visibility': 'enable',
+    }
+
+
+def route(i):
+    return {
+        'ip_version': 4, 'type': 'static', 'ip_mask': f'172.16.{i % 256}.0/24', 'distance': 10,
+        'metric': 0, 'priority': 1, 'vrf': 0, 'gateway': '192.0.2.1', 'interface': 'wan1', 'is_tunnel_route': False,
+    }
+
+
+# Tool name, record factory, number of records
+WORKLOADS = [
+    ('fortigate_get_firewall_policies', policy, 10000),
+    ('fortigate_get_session_table', session, 20000),
+    ('fortigate_get_local_users', local_user, 5000),
+    ('fortigate_get_address_objects', address, 20000),
+    ('fortigate_get_routing_table', route, 5000),
+]
+
+
+def best_of(func, repeat):
+    """Returns the fastest of several timed runs, in milliseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main(repeat=5):
+    print(f"JSON codec: {codec.active()}")
+    print(f"{'tool':34} {'records':>8} {'before ms':>10} {'compact ms':>11} {'after ms':>9} {'speedup':>8} "
+          f"{'before chars':>13} {'after chars':>12}")
+    for tool, factory, count in WORKLOADS:
+        records = [factory(i) for i in range(count)]
+        body = json.dumps({'http_method': 'GET', 'results': records, 'status': 'success'}).encode()
+
+        def before():
+            return json.dumps(json.loads(body)['results'], indent=2)
+
+        def compact():
+            return json.dumps(json.loads(body)['results'], separators=(',', ':'))
+
+        def after():
+            return encode(codec.loads(body)['results'])
+
+        before_ms = best_of(before, repeat)
+        compact_ms = best_of(compact, repeat)
+        after_ms = best_of(after, repeat)
+        print(f"{tool:34} {count:>8} {before_ms:>10.1f} {compact_ms:>11.1f} {after_ms:>9.1f} {before_ms / after_ms:>7.1f}x "
+              f"{len(before()):>13} {len(after()):>12}")
+
+
+if __name__ == "__main__":
+    main()
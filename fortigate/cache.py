@@ -0,0 +1,217 @@
+"""
+Response cache for FortiOS CMDB reads
+
+Each FortigateAPI instance (one per device) owns a ResponseCache holding
+decoded GET responses keyed by (endpoint, vdom, query parameters). Entries
+expire after a TTL and the cache is a least-recently-used map bounded by
+the size of the cached response bodies. Writes through the same client
+invalidate the affected table so callers never read their own stale data.
+
+CMDB responses carry the configuration revision they were read at. When an
+entry's TTL runs out it is kept, and the client compares its revision with
+the device's current one (a tiny CMDB request, itself reused for
+revision_interval seconds); if the configuration has not changed the entry
+is served again instead of refetching the whole table. As soon as a
+response or a probe shows a VDOM at another revision, the entries read at
+any other revision are dropped, even those still within their TTL.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+# Default lifetime of a cached response, in seconds (0 disables caching)
+DEFAULT_CACHE_TTL = 30.0
+# Default upper bound of the cached response bodies, in bytes
+DEFAULT_CACHE_MAX_BYTES = 32 * 1024 * 1024
+# Small per-VDOM CMDB object fetched to read the current config revision
+DEFAULT_REVISION_ENDPOINT = 'cmdb/system/settings'
+REVISION_PROBE_PARAMS = {'format': 'opmode'}
+# Seconds a probed config revision is trusted before probing again
+DEFAULT_REVISION_INTERVAL = 2.0
+
+
+def cache_key(endpoint: str, vdom: str, params: Dict = None) -> tuple:
+    """Builds a hashable cache key from a request"""
+    frozen = tuple(sorted(
+        (name, tuple(value) if isinstance(value, list) else value)
+        for name, value in (params or {}).items()
+    ))
+    return endpoint.strip('/'), vdom, frozen
+
+
+def table_path(endpoint: str) -> str:
+    """Returns the CMDB table an endpoint belongs to (cmdb/<path>/<name>)"""
+    return '/'.join(endpoint.strip('/').split('/')[:3])
+
+
+def _covers_vdom(selector: str, vdom: str) -> bool:
+    """Tells whether a cached request's VDOM selector ('a', 'a,b' or '*') includes vdom"""
+    return selector == vdom or selector == '*' or (
+        isinstance(selector, str) and vdom in selector.split(','))
+
+
+class _Entry:
+    __slots__ = ('value', 'size', 'expires', 'revision')
+
+    def __init__(self, value: Any, size: int, expires: float, revision: Optional[str]):
+        self.value = value
+        self.size = size
+        self.expires = expires
+        self.revision = revision
+
+
+class ResponseCache:
+    """TTL cache of GET responses with a byte-bounded LRU eviction policy
+
+    Cached values are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_CACHE_TTL, max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+                 revalidate: bool = True, revision_endpoint: str = DEFAULT_REVISION_ENDPOINT,
+                 revision_interval: float = DEFAULT_REVISION_INTERVAL):
+        self.ttl = float(ttl)
+        self.max_bytes = int(max_bytes)
+        self.revalidate = bool(revalidate)
+        self.revision_endpoint = revision_endpoint.strip('/')
+        self.revision_interval = float(revision_interval)
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._bytes = 0
+        # vdom -> (revision, monotonic time it was read)
+        self._revisions: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.revision_checks = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_bytes > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Returns the cached value for key, or None if absent or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires <= time.monotonic():
+                # Expired entries are kept for revalidation when they carry a revision
+                if not (self.revalidate and entry.revision):
+                    self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def stale_revision(self, key: Hashable) -> Optional[str]:
+        """Returns the config revision of an expired entry that may be revalidated"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.revision if entry is not None and self.revalidate else None
+
+    def renew(self, key: Hashable) -> Optional[Any]:
+        """Extends the TTL of an entry whose revision is still current and returns it"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry.expires = time.monotonic() + self.ttl
+            self._entries.move_to_end(key)
+            self.revalidations += 1
+            return entry.value
+
+    def record_miss(self):
+        """Counts a lookup that had to be served by the device"""
+        with self._lock:
+            self.misses += 1
+
+    def known_revision(self, vdom: str) -> Optional[str]:
+        """Returns the config revision of a VDOM if it was read recently enough"""
+        with self._lock:
+            known = self._revisions.get(vdom)
+            if known is None or time.monotonic() - known[1] > self.revision_interval:
+                return None
+            return known[0]
+
+    def note_revision(self, vdom: str, revision: Optional[str], probed: bool = False):
+        """Records the config revision of a VDOM seen in a response
+
+        A revision other than the last one seen drops the entries of the VDOM
+        read at any other revision: the configuration changed since.
+        """
+        with self._lock:
+            if probed:
+                self.revision_checks += 1
+            if not revision:
+                return
+            known = self._revisions.get(vdom)
+            if known is None or known[0] != revision:
+                stale = [key for key, entry in self._entries.items()
+                         if entry.revision != revision and _covers_vdom(key[1], vdom)]
+                for key in stale:
+                    self._remove(key)
+                self.invalidations += len(stale)
+            self._revisions[vdom] = (revision, time.monotonic())
+
+    def put(self, key: Hashable, value: Any, size: int, revision: Optional[str] = None):
+        """Stores value, evicting least recently used entries beyond max_bytes"""
+        if not self.enabled or size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(value, size, time.monotonic() + self.ttl, revision)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, endpoint: str = None, vdom: str = None):
+        """Drops entries of a CMDB table (all tables if endpoint is None) in a VDOM (all if None)"""
+        prefix = table_path(endpoint) if endpoint else None
+        with self._lock:
+            stale = [
+                key for key in self._entries
+                if (vdom is None or _covers_vdom(key[1], vdom))
+                and (prefix is None or key[0] == prefix or key[0].startswith(prefix + '/'))
+            ]
+            for key in stale:
+                self._remove(key)
+            self.invalidations += len(stale)
+            # The config revision changed with the write that triggered this
+            if vdom is None:
+                self._revisions.clear()
+            else:
+                self._revisions.pop(vdom, None)
+
+    def clear(self):
+        """Drops every entry"""
+        self.invalidate()
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def stats(self) -> Dict:
+        """Returns cache counters"""
+        with self._lock:
+            lookups = self.hits + self.revalidations + self.misses
+            return {
+                'enabled': self.enabled,
+                'ttl': self.ttl,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'revalidations': self.revalidations,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.revalidations) / lookups, 3) if lookups else 0.0,
+                'revision_checks': self.revision_checks,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
@@ -0,0 +1,120 @@
+"""
+Single-flight coalescing of identical in-flight requests
+
+When several callers ask a device for the same resource at the same time,
+only the first one (the leader) sends the request; the others wait for and
+share its outcome. Keys are built by the API clients from
+(method, endpoint, vdom, params); instances are per device.
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class SingleFlight:
+    """Thread-based single-flight group for the blocking FortigateAPI"""
+
+    class _Call:
+        __slots__ = ('done', 'result', 'error')
+
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._calls: Dict[Hashable, "SingleFlight._Call"] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def run(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """Runs func once for all concurrent callers using the same key"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'in_flight': len(self._calls), 'leaders': self.leaders, 'coalesced': self.coalesced}
+
+
+class AsyncSingleFlight:
+    """asyncio single-flight group for AsyncFortigateAPI"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Awaits func once for all concurrent callers using the same key
+
+        The shared call runs in its own task, so cancelling one caller does
+        not cancel the request the others are waiting for.
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            self.leaders += 1
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def join(self, key: Hashable) -> Optional[asyncio.Future]:
+        """Returns the future of an in-flight call for key, counting the caller as coalesced"""
+        future = self._calls.get(key)
+        if future is not None:
+            self.coalesced += 1
+        return future
+
+    def lead(self, key: Hashable) -> asyncio.Future:
+        """Registers the caller as leader for key; resolve the future with finish()"""
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        self.leaders += 1
+        return future
+
+    def finish(self, key: Hashable, future: asyncio.Future, result: Any = None,
+               error: BaseException = None):
+        """Publishes the leader's outcome (cancels the future when neither is given)"""
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+            # Followers are optional: do not warn about an unretrieved exception
+            future.exception()
+        elif result is not None:
+            future.set_result(result)
+        else:
+            future.cancel()
+
+    def stats(self) -> Dict:
+        return {'in_flight': len(self._calls), 'leaders': self.leaders, 'coalesced': self.coalesced}
@@ -0,0 +1,99 @@
+"""
+JSON encoding and decoding used across the server
+
+Response bodies, request bodies and tool results all go through this
+module, except the items of streamed responses (see jsonstream). It uses
+orjson when the optional package is installed and the standard library
+otherwise; values orjson cannot encode (integers wider
+than 64 bits, custom types handled by a default function) fall back to the
+standard library so results never depend on which codec is active.
+"""
+
+import json
+from typing import Any, Callable, Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+CODECS = ('auto', 'orjson', 'json')
+
+
+class StdlibCodec:
+    """The standard library json module"""
+
+    name = 'json'
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+    def dumps(self, value: Any, indent: Optional[int] = None, default: Callable = None) -> str:
+        # Non-ASCII text is kept as is, like orjson does
+        if indent:
+            return json.dumps(value, indent=indent, default=default, ensure_ascii=False)
+        return json.dumps(value, separators=(',', ':'), default=default, ensure_ascii=False)
+
+    def dumpb(self, value: Any) -> bytes:
+        return self.dumps(value).encode('utf-8')
+
+
+class OrjsonCodec(StdlibCodec):
+    """orjson, a JSON library implemented in Rust"""
+
+    name = 'orjson'
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return orjson.loads(data)
+
+    def dumpb(self, value: Any, indent: Optional[int] = None, default: Callable = None) -> bytes:
+        # orjson only indents by two spaces, other widths go to the standard library
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent == 2 else 0)
+        try:
+            return orjson.dumps(value, default=default, option=option)
+        except (TypeError, orjson.JSONEncodeError):
+            return super().dumps(value, indent=indent, default=default).encode('utf-8')
+
+    def dumps(self, value: Any, indent: Optional[int] = None, default: Callable = None) -> str:
+        if indent and indent != 2:
+            return super().dumps(value, indent=indent, default=default)
+        return self.dumpb(value, indent=indent, default=default).decode('utf-8')
+
+
+def _select(name: str) -> StdlibCodec:
+    if name not in CODECS:
+        raise ValueError(f"Unknown JSON codec {name}, expected one of {', '.join(CODECS)}")
+    if name == 'orjson' and orjson is None:
+        raise ValueError("JSON codec orjson is not installed (pip install orjson)")
+    if name == 'json' or orjson is None:
+        return StdlibCodec()
+    return OrjsonCodec()
+
+
+_codec = _select('auto')
+
+
+def configure(name: str = 'auto'):
+    """Selects the codec: 'auto' (orjson if installed), 'orjson' or 'json'"""
+    global _codec
+    _codec = _select(name)
+
+
+def active() -> str:
+    """Returns the name of the codec in use"""
+    return _codec.name
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Decodes a JSON document"""
+    return _codec.loads(data)
+
+
+def dumps(value: Any, indent: Optional[int] = None, default: Callable = None) -> str:
+    """Encodes a value as JSON text, compact unless indent is given"""
+    return _codec.dumps(value, indent=indent, default=default)
+
+
+def dumpb(value: Any) -> bytes:
+    """Encodes a value as compact UTF-8 JSON, for request bodies"""
+    return _codec.dumpb(value)
@@ -0,0 +1,394 @@
+"""
+Batch policy lookup of large flow files
+
+Flows are read from a CSV or NDJSON file in chunks and looked up against a
+compiled PolicyEngine. With NumPy installed (optional dependency) each
+chunk is evaluated as arrays: the segment indexes of the engine become
+matrices of 64-bit policy bitmask words, every flow gathers and ANDs the
+rows of its source, destination, service and interfaces, and the first
+set bit of the result is the first candidate policy. Flows whose first
+candidate cannot be decided from the indexes alone (wildcard or FQDN
+addresses, source-port or ICMP-type services, schedules...) and rows that
+do not parse are looked up one by one, as they are without NumPy.
+"""
+
+import csv
+import itertools
+import socket
+import time
+import weakref
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from . import codec
+from .policy_engine import PORT_MAX, PORT_PROTOCOLS, PolicyEngine, protocol_number
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Flows looked up per chunk, and upper bound of the bitmask words gathered per chunk
+DEFAULT_CHUNK_FLOWS = 65536
+MAX_CHUNK_WORDS = 4 * 1024 * 1024
+# Row errors reported in the summary
+MAX_REPORTED_ERRORS = 10
+
+FLOW_FIELDS = ('srcintf', 'source_ip', 'dest', 'protocol', 'source_port', 'dest_port', 'dstintf')
+# Column holding why a row could not be read, None for rows that were read
+ERROR_FIELD = 'error'
+FIELD_ALIASES = {
+    'src': 'source_ip', 'source': 'source_ip', 'srcip': 'source_ip', 'src_ip': 'source_ip',
+    'dst': 'dest', 'destination': 'dest', 'dstip': 'dest', 'dst_ip': 'dest', 'dest_ip': 'dest',
+    'proto': 'protocol', 'sport': 'source_port', 'src_port': 'source_port',
+    'dport': 'dest_port', 'dst_port': 'dest_port',
+}
+
+
+def numpy_available() -> bool:
+    """Tells whether the optional NumPy acceleration is installed"""
+    return np is not None
+
+
+def _field(key: Any) -> Optional[str]:
+    if not isinstance(key, str):
+        return None
+    name = key.strip().lower()
+    name = FIELD_ALIASES.get(name, name)
+    return name if name in FLOW_FIELDS else None
+
+
+def read_chunks(path: str, size: int = DEFAULT_CHUNK_FLOWS) -> Iterator[Dict[str, list]]:
+    """Yields the flows of a CSV file with a header row, or of an NDJSON file
+
+    Flows come in chunks of up to size flows, as one list of values per
+    field; fields missing from a row hold None. NDJSON lines that are not
+    JSON objects become rows with only an ERROR_FIELD value.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.lower().endswith(('.ndjson', '.jsonl', '.json')):
+            fields: Dict[str, Optional[str]] = {}
+            while True:
+                lines = list(itertools.islice(f, size))
+                if not lines:
+                    return
+                rows = []
+                for line in lines:
+                    if not line.strip():
+                        continue
+                    try:
+                        record = codec.loads(line)
+                    except ValueError as e:
+                        rows.append({ERROR_FIELD: f"Invalid JSON: {e}"})
+                        continue
+                    if not isinstance(record, dict):
+                        rows.append({ERROR_FIELD: f"Expected a JSON object, not {type(record).__name__}"})
+                        continue
+                    row = {}
+                    for key, value in record.items():
+                        name = fields[key] if key in fields else fields.setdefault(key, _field(key))
+                        if name:
+                            row[name] = value
+                    rows.append(row)
+                if not rows:
+                    continue
+                yield {name: [row.get(name) for row in rows] for name in FLOW_FIELDS + (ERROR_FIELD,)}
+        else:
+            reader = csv.reader(f)
+            header = [_field(key) for key in next(reader, [])]
+            positions = {name: i for i, name in enumerate(header) if name}
+            while True:
+                rows = list(itertools.islice(reader, size))
+                if not rows:
+                    return
+                if not all(rows):
+                    rows = [row for row in rows if row]
+                    if not rows:
+                        continue
+                width = len(header)
+                if any(len(row) != width for row in rows):
+                    rows = [(row + [None] * width)[:width] for row in rows]
+                yield {name: list(map(itemgetter(positions[name]), rows)) if name in positions
+                       else [None] * len(rows) for name in FLOW_FIELDS + (ERROR_FIELD,)}
+
+
+def _row(columns: Dict[str, list], i: int) -> Dict:
+    return {name: values[i] for name, values in columns.items()}
+
+
+def _port(value: Any) -> int:
+    if value in (None, ''):
+        return 0
+    port = int(value)
+    if not 0 <= port <= PORT_MAX:
+        raise ValueError(f"Port {port} out of range 0-{PORT_MAX}")
+    return port
+
+
+class _VectorTables:
+    """The indexes of a PolicyEngine as NumPy arrays"""
+
+    def __init__(self, engine: PolicyEngine):
+        count = len(engine.policies)
+        self.words = max(1, (count + 63) // 64)
+        self.policy_ids = np.array([policy.policyid or 0 for policy in engine.policies] + [0], dtype=np.int64)
+        self.decisive = np.array([self._decisive(policy) for policy in engine.policies] + [True], dtype=bool)
+
+        self.source_points = np.array(engine.source_index.points, dtype=np.uint64)
+        self.source_rows = self._rows(engine.source_index.masks)
+        self.destination_points = np.array(engine.destination_index.points, dtype=np.uint64)
+        self.destination_rows = self._rows(engine.destination_index.masks)
+
+        # Interface rows; the last row is for interfaces no policy names
+        self.srcintf_codes = {name: i for i, name in enumerate(engine.srcintf_masks)}
+        self.srcintf_rows = self._rows([mask | engine.any_srcintf for mask in engine.srcintf_masks.values()]
+                                       + [engine.any_srcintf])
+        self.dstintf_codes = {name: i for i, name in enumerate(engine.dstintf_masks)}
+        self.dstintf_rows = self._rows([mask | engine.any_dstintf for mask in engine.dstintf_masks.values()]
+                                       + [engine.any_dstintf])
+
+        # Service rows: port segments and 'any port' per port protocol, one row per other protocol
+        masks, self.port_tables = [], {}
+        for number in PORT_PROTOCOLS:
+            index = engine.port_indexes[number]
+            extra = engine.protocol_masks.get(number, 0)
+            self.port_tables[number] = (len(masks), np.array(index.points, dtype=np.int64),
+                                        len(masks) + len(index.points))
+            masks.extend(mask | extra for mask in index.masks)
+            masks.append(engine.port_any[number] | extra)
+        self.protocol_rows = {}
+        for number, mask in engine.protocol_masks.items():
+            if number not in PORT_PROTOCOLS:
+                self.protocol_rows[number] = len(masks)
+                masks.append(engine.any_protocol | mask)
+        self.default_protocol_row = len(masks)
+        masks.append(engine.any_protocol)
+        self.service_rows = self._rows(masks)
+
+        # Routes by prefix length, and static NAT translations
+        self.route_names = []
+        self.routes = []
+        for length in engine.routes.lengths:
+            networks = sorted(engine.routes.prefixes[length].items())
+            codes = []
+            for _, name in networks:
+                codes.append(self.dstintf_codes.get(name, len(self.dstintf_codes)))
+            mask = ((2 ** 32 - 1) << (32 - length)) & (2 ** 32 - 1)
+            self.routes.append((np.uint64(mask), np.array([network for network, _ in networks], dtype=np.uint64),
+                                np.array(codes, dtype=np.int64)))
+        self.vip_starts = np.array([start for start, _, _ in engine.vips], dtype=np.int64)
+        self.vip_ends = np.array([end for _, end, _ in engine.vips], dtype=np.int64)
+        self.vip_mapped = np.array([mapped for _, _, mapped in engine.vips], dtype=np.int64)
+
+    @staticmethod
+    def _decisive(policy) -> bool:
+        """Tells whether being the first candidate of a flow proves a policy matches it"""
+        if policy.device_conditions or policy.service_negate:
+            return False
+        if not policy.srcaddr.plain or not policy.dstaddr.plain or not policy.service.plain:
+            return False
+        for number, first, second in policy.service.entries:
+            if number in PORT_PROTOCOLS and second is not None and second.intervals() != [(0, 65535)]:
+                return False
+            if number == 1 and (first is not None or second is not None):
+                return False
+        return True
+
+    def _rows(self, masks: List[int]) -> "np.ndarray":
+        size = self.words * 8
+        data = b''.join(mask.to_bytes(size, 'little') for mask in masks)
+        return np.frombuffer(data, dtype='<u8').reshape(len(masks), self.words)
+
+    def dstintf(self, destinations: "np.ndarray") -> "np.ndarray":
+        """Returns the egress interface row of each destination"""
+        routed = destinations.astype(np.int64)
+        if len(self.vip_starts):
+            i = np.searchsorted(self.vip_starts, routed, side='right') - 1
+            safe = np.maximum(i, 0)
+            hit = (i >= 0) & (routed <= self.vip_ends[safe])
+            routed = np.where(hit, self.vip_mapped[safe] + routed - self.vip_starts[safe], routed)
+        routed = routed.astype(np.uint64)
+        unknown = len(self.dstintf_codes)
+        codes = np.full(len(routed), -1, dtype=np.int64)
+        for mask, networks, interfaces in self.routes:
+            masked = routed & mask
+            position = np.minimum(np.searchsorted(networks, masked), len(networks) - 1)
+            hit = (codes < 0) & (networks[position] == masked)
+            codes[hit] = interfaces[position[hit]]
+        codes[codes < 0] = unknown
+        return codes
+
+
+# Array tables of the engines used so far, dropped with their engine
+_tables: "weakref.WeakKeyDictionary[PolicyEngine, _VectorTables]" = weakref.WeakKeyDictionary()
+
+
+def _vector_tables(engine: PolicyEngine) -> _VectorTables:
+    tables = _tables.get(engine)
+    if tables is None:
+        tables = _tables[engine] = _VectorTables(engine)
+    return tables
+
+
+def _ipv4_array(values: list, valid: "np.ndarray") -> "np.ndarray":
+    try:
+        return np.frombuffer(b''.join(socket.inet_pton(socket.AF_INET, value) for value in values),
+                             dtype='>u4').astype(np.uint64)
+    except (OSError, TypeError):
+        pass
+    result = np.zeros(len(values), dtype=np.uint64)
+    for i, value in enumerate(values):
+        try:
+            result[i] = int.from_bytes(socket.inet_pton(socket.AF_INET, value), 'big')
+        except (OSError, TypeError):
+            valid[i] = False
+    return result
+
+
+def _port_array(values: list, valid: "np.ndarray") -> "np.ndarray":
+    try:
+        result = np.fromiter(map(int, values), dtype=np.int64, count=len(values))
+    except (TypeError, ValueError):
+        result = np.zeros(len(values), dtype=np.int64)
+        for i, value in enumerate(values):
+            try:
+                result[i] = _port(value)
+            except (TypeError, ValueError):
+                valid[i] = False
+    # Out of range ports would select another service row: the exact lookup reports them
+    outside = (result < 0) | (result > PORT_MAX)
+    if outside.any():
+        valid &= ~outside
+        result[outside] = 0
+    return result
+
+
+def _code_array(values: list, codes: Callable[[Any], int], valid: "np.ndarray") -> "np.ndarray":
+    """Maps values through a function called once per distinct value, -1 marking failures"""
+    table = {}
+    for value in set(values):
+        try:
+            table[value] = codes(value)
+        except (TypeError, ValueError):
+            table[value] = -1
+    result = np.array([table[value] for value in values], dtype=np.int64)
+    valid &= result >= 0
+    return result
+
+
+def _lookup_chunk(engine: PolicyEngine, tables: _VectorTables,
+                  columns: Dict[str, list]) -> Tuple[List[int], List[bool], List[Optional[str]]]:
+    """Looks up a chunk of flows with arrays, returns policy IDs, exact flags and errors"""
+    size = len(columns['source_ip'])
+    valid = np.ones(size, dtype=bool)
+    sources = _ipv4_array(columns['source_ip'], valid)
+    destinations = _ipv4_array(columns['dest'], valid)
+    protocols = _code_array(columns['protocol'], protocol_number, valid)
+    dest_ports = _port_array(columns['dest_port'], valid)
+    _port_array(columns['source_port'], valid)
+    unknown_srcintf = len(tables.srcintf_codes)
+    srcintf = _code_array(columns['srcintf'], lambda name: tables.srcintf_codes.get(name, unknown_srcintf), valid)
+    # Explicit egress interfaces are rare, and unreadable rows fail: leave them to the exact lookup
+    valid &= np.array([not name for name in columns['dstintf']], dtype=bool)
+    valid &= np.array([error is None for error in columns[ERROR_FIELD]], dtype=bool)
+
+    service = np.full(size, tables.default_protocol_row, dtype=np.int64)
+    for number, row in tables.protocol_rows.items():
+        service[protocols == number] = row
+    for number, (base, points, any_port) in tables.port_tables.items():
+        selected = protocols == number
+        segments = np.searchsorted(points, dest_ports[selected], side='right') - 1
+        service[selected] = np.where(dest_ports[selected] == 0, any_port, base + segments)
+
+    candidates = tables.source_rows[np.searchsorted(tables.source_points, sources, side='right') - 1]
+    candidates &= tables.destination_rows[np.searchsorted(tables.destination_points, destinations,
+                                                          side='right') - 1]
+    candidates &= tables.service_rows[service]
+    candidates &= tables.srcintf_rows[srcintf]
+    candidates &= tables.dstintf_rows[tables.dstintf(destinations)]
+
+    # First candidate: lowest set bit of the first nonzero word
+    nonzero = candidates != 0
+    found = nonzero.any(axis=1)
+    word = nonzero.argmax(axis=1)
+    values = candidates[np.arange(size), word]
+    lowest = values & (~values + np.uint64(1))
+    bits = word * 64 + np.log2(np.where(found, lowest, 1).astype(np.float64)).astype(np.int64)
+    first = np.where(found, bits, len(tables.policy_ids) - 1)
+    policy_ids = tables.policy_ids[first].tolist()
+    decided = valid & tables.decisive[first]
+
+    exact = [True] * size
+    errors: List[Optional[str]] = [None] * size
+    for i in np.flatnonzero(~decided).tolist():
+        policy_ids[i], exact[i], errors[i] = _lookup_one(engine, _row(columns, i))
+    return policy_ids, exact, errors
+
+
+def _lookup_one(engine: PolicyEngine, flow: Dict) -> Tuple[int, bool, Optional[str]]:
+    """Looks up one flow with the scalar engine"""
+    if flow.get(ERROR_FIELD):
+        return -1, False, flow[ERROR_FIELD]
+    try:
+        result = engine.lookup(flow.get('srcintf'), flow.get('source_ip'), flow.get('protocol'),
+                               flow.get('dest'), _port(flow.get('source_port')), _port(flow.get('dest_port')),
+                               dstintf=flow.get('dstintf') or None)
+    except (AttributeError, TypeError, ValueError) as e:
+        return -1, False, str(e)
+    return result['policy_id'], result['exact'], None
+
+
+def simulate_file(engine: PolicyEngine, path: str, output_path: str = None,
+                  chunk_flows: int = DEFAULT_CHUNK_FLOWS) -> Dict:
+    """Looks up every flow of a file, writing one result row per flow to output_path
+
+    Returns counts per policy and per outcome. Policy ID -1 marks rows that
+    could not be parsed.
+    """
+    started = time.perf_counter()
+    output_path = output_path or f"{path}.policies.csv"
+    vectorized = numpy_available() and bool(engine.policies)
+    if vectorized:
+        tables = _vector_tables(engine)
+        chunk_flows = max(1024, min(chunk_flows, MAX_CHUNK_WORDS // tables.words))
+    counts: Dict[int, int] = {}
+    total = inexact = 0
+    errors = []
+
+    with open(output_path, 'w', newline='', encoding='utf-8') as out:
+        writer = csv.writer(out)
+        writer.writerow(['flow', 'policy_id', 'exact'])
+        for columns in read_chunks(path, chunk_flows):
+            size = len(columns['source_ip'])
+            if vectorized:
+                policy_ids, exact, failures = _lookup_chunk(engine, tables, columns)
+            else:
+                policy_ids, exact, failures = (list(column) for column in zip(
+                    *(_lookup_one(engine, _row(columns, i)) for i in range(size))))
+            for i, policy_id in enumerate(policy_ids):
+                counts[policy_id] = counts.get(policy_id, 0) + 1
+                if failures[i] is not None:
+                    if len(errors) < MAX_REPORTED_ERRORS:
+                        errors.append({'flow': total + i + 1, 'error': failures[i]})
+                elif not exact[i]:
+                    inexact += 1
+            writer.writerows(zip(range(total + 1, total + size + 1), policy_ids,
+                                 ('true' if item else 'false' for item in exact)))
+            total += size
+
+    elapsed = time.perf_counter() - started
+    return {
+        'flows': total,
+        'policies': {str(policy_id): count for policy_id, count
+                     in sorted(counts.items(), key=lambda item: -item[1]) if policy_id >= 0},
+        'implicit_deny': counts.get(0, 0),
+        'inexact': inexact,
+        'errors': counts.get(-1, 0),
+        'first_errors': errors,
+        'output_path': output_path,
+        'vectorized': vectorized,
+        'revision': engine.revision,
+        'elapsed_ms': round(elapsed * 1000, 2),
+        'flows_per_second': round(total / elapsed) if elapsed else None,
+    }
+
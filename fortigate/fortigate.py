@@ -4,36 +4,196 @@ Fortigate MCP Server using FastMCP
 Manages multiple Fortigate devices and VDOMs
 """
 
-import json
+import asyncio
 import logging
+import time
+import httpx
 import requests
-from typing import Dict, List, Optional, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
 from urllib3.exceptions import InsecureRequestWarning
 
+from . import codec
+from .cache import (DEFAULT_CACHE_MAX_BYTES, DEFAULT_CACHE_TTL, DEFAULT_REVISION_ENDPOINT,
+                    DEFAULT_REVISION_INTERVAL, REVISION_PROBE_PARAMS, ResponseCache, cache_key)
+from .coalesce import AsyncSingleFlight, SingleFlight
+from .jsonstream import ResultsStreamParser, STREAM_CHUNK_SIZE
+from .request_log import RequestLogger
+from .resilience import CircuitBreaker, CircuitOpenError, RetryPolicy
+from .throttle import DeviceThrottle
+from .timeouts import AdaptiveTimeouts
+from .transport import ConnectionSettings, ConnectionStats, IdleEviction, http2_available
+
 requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
 
-# Logging configuration
-logging.basicConfig(level=logging.DEBUG)
+# Logging is configured by the application (see server.py); request and
+# response records go through the bounded RequestLogger
 logger = logging.getLogger("fortigate-mcp")
+request_log = RequestLogger(logger)
+
+# Number of records requested per page by the iter_* methods
+DEFAULT_PAGE_SIZE = 1000
+# Maximum number of threads used for per-VDOM requests by the blocking client
+MAX_VDOM_WORKERS = 8
+# Fleet fan-out defaults: devices queried at once and seconds allowed per device
+DEFAULT_FLEET_CONCURRENCY = 10
+DEFAULT_FLEET_TIMEOUT = 30.0
+
+
+def is_multi_vdom(vdom: Optional[str]) -> bool:
+    """Tells whether vdom selects several VDOMs ('vdom1,vdom2' or '*')"""
+    return isinstance(vdom, str) and (vdom == '*' or ',' in vdom)
+
+
+def _vdom_response(vdom: str, response: Any) -> Dict:
+    """Tags a single-VDOM response like an entry of a multi-VDOM response"""
+    if isinstance(response, dict):
+        return dict(response, vdom=vdom)
+    return {'vdom': vdom, 'results': response}
+
+
+def _extract_results(response: Any, default: Any) -> Any:
+    """Returns the 'results' member of a response, keyed by VDOM for multi-VDOM responses"""
+    if isinstance(response, list):
+        # Multi-VDOM queries return one response object per VDOM
+        return {item.get('vdom'): item.get('results', default) for item in response}
+    return response.get('results', default)
+
+
+async def collect(result: Any) -> Any:
+    """Awaits an API call, collecting the items of iter_* async generators into a list"""
+    if hasattr(result, '__aiter__'):
+        return [item async for item in result]
+    return await result
 
 
 class FortigateAPI:
     """Class to manage Fortigate REST APIs"""
 
-    def __init__(self, host: str, token: str):
-        self.host = host.rstrip('/')
-        self.token = token
-        self.base_url = f"https://{self.host}/api/v2"
+    def __init__(self, host: str, token: str, cache: Dict = None, connection: Dict = None,
+                 limits: Dict = None, retry: Dict = None, circuit_breaker: Dict = None,
+                 timeouts: Dict = None):
+        self._setup(host, token, cache, connection, limits, retry, circuit_breaker, timeouts)
+        self.inflight = SingleFlight()
         self.session = requests.Session()
         self.session.headers.update({
             'Authorization': f'Bearer {self.token}',
             'Content-Type': 'application/json'
         })
+        if not self.connection.keepalive:
+            self.session.headers['Connection'] = 'close'
         self.session.verify = False
+        adapter = self.connection.adapter()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.idle = IdleEviction(adapter, self.connection_stats, self.connection.keepalive_expiry)
+
+    def _setup(self, host: str, token: str, cache: Dict = None, connection: Dict = None,
+               limits: Dict = None, retry: Dict = None, circuit_breaker: Dict = None,
+               timeouts: Dict = None):
+        """Initializes the transport-independent client state"""
+        self.host = host.rstrip('/')
+        self.token = token
+        self.base_url = f"https://{self.host}/api/v2"
+        self.connection = ConnectionSettings.from_config(connection)
+        self.connection_stats = ConnectionStats()
+        # Shared with another client of the same device, like the cache
+        self.throttle = limits if isinstance(limits, DeviceThrottle) else DeviceThrottle.from_config(limits)
+        self.retry = retry if isinstance(retry, RetryPolicy) else RetryPolicy.from_config(retry)
+        self.breaker = (circuit_breaker if isinstance(circuit_breaker, CircuitBreaker)
+                        else CircuitBreaker.from_config(circuit_breaker))
+        self.timeouts = timeouts if isinstance(timeouts, AdaptiveTimeouts) else AdaptiveTimeouts.from_config(timeouts)
+        # Whether the device accepts multi-VDOM queries (None until known)
+        self.multi_vdom_query: Optional[bool] = None
+
+        if isinstance(cache, ResponseCache):
+            # Shared with another client of the same device
+            self.cache = cache
+        else:
+            cache = cache or {}
+            self.cache = ResponseCache(
+                ttl=cache.get('ttl', DEFAULT_CACHE_TTL),
+                max_bytes=cache.get('max_bytes', DEFAULT_CACHE_MAX_BYTES),
+                revalidate=cache.get('revalidate', True),
+                revision_endpoint=cache.get('revision_endpoint', DEFAULT_REVISION_ENDPOINT),
+                revision_interval=cache.get('revision_interval', DEFAULT_REVISION_INTERVAL)
+            )
 
-    def _make_request(self, method: str, endpoint: str, vdom: str = 'root',
-                      params: Dict = None, data: Dict = None) -> Dict:
-        """Executes API request with VDOM handling"""
+    def _cache_key(self, method: str, endpoint: str, vdom: str, params: Dict = None) -> Optional[tuple]:
+        """Returns the cache key of a cacheable request (CMDB GETs), else None"""
+        if method != 'GET' or not endpoint.startswith('cmdb/') or not self.cache.enabled:
+            return None
+        if endpoint.strip('/') == self.cache.revision_endpoint:
+            # Revision probes must always reach the device
+            return None
+        return cache_key(endpoint, vdom, params)
+
+    def _cache_lookup(self, key: Optional[tuple], vdom: str) -> Optional[Any]:
+        """Returns a cached response, revalidating expired entries against the config revision"""
+        if key is None:
+            return None
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        revision = self.cache.stale_revision(key)
+        if revision is not None and self._config_revision(vdom) == revision:
+            return self.cache.renew(key)
+        self.cache.record_miss()
+        return None
+
+    def _config_revision(self, vdom: str) -> Optional[str]:
+        """Returns the current config revision of a VDOM, probing the device if needed"""
+        revision = self.cache.known_revision(vdom)
+        if revision is None:
+            try:
+                response = self._make_request('GET', self.cache.revision_endpoint, vdom=vdom,
+                                              params=dict(REVISION_PROBE_PARAMS))
+            except (requests.exceptions.RequestException, CircuitOpenError):
+                return None
+            revision = response.get('revision')
+            self.cache.note_revision(vdom, revision, probed=True)
+        return revision
+
+    def config_revision(self, vdom: str = 'root') -> Optional[str]:
+        """Returns the current configuration revision of a VDOM, None if it cannot be read"""
+        return self._config_revision(vdom)
+
+    def _cache_store(self, key: tuple, vdom: str, value: Any, size: int, revision: Optional[str]):
+        """Caches a response together with the config revision it was read at"""
+        self.cache.note_revision(vdom, revision)
+        self.cache.put(key, value, size, revision)
+
+    def _invalidate_after_write(self, method: str, endpoint: str, vdom: str, data: Dict = None):
+        """Drops cached responses a write request may have changed"""
+        if method == 'GET':
+            return
+        if not endpoint.startswith('cmdb/'):
+            # Monitor actions (config restore, HA failover...) may change any table
+            self.cache.clear()
+        elif method == 'PUT' and data and data.get('name') not in (None, endpoint.rstrip('/').split('/')[-1]):
+            # A rename is propagated by FortiOS to every referencing table
+            self.cache.invalidate(vdom=vdom)
+        else:
+            self.cache.invalidate(endpoint, vdom)
+
+    def client_stats(self) -> Dict:
+        """Returns client-side counters (cache, coalescing, connections, throttling, failures, latency)"""
+        return {
+            'cache': self.cache.stats(),
+            'coalescing': self.inflight.stats(),
+            'connections': self._connection_stats(),
+            'throttle': self.throttle.stats(),
+            'retry': self.retry.stats(),
+            'circuit_breaker': self.breaker.stats(),
+            'timeouts': self.timeouts.stats()
+        }
+
+    def _connection_stats(self) -> Dict:
+        return self.connection_stats.stats(self.connection, self.idle.live_connections())
+
+    def _prepare_request(self, endpoint: str, vdom: str = 'root',
+                         params: Dict = None) -> tuple:
+        """Builds URL and query parameters for an API request"""
         url = f"{self.base_url}/{endpoint}"
 
         # Add VDOM parameter if not root
@@ -41,41 +201,280 @@ class FortigateAPI:
             params = params or {}
             params['vdom'] = vdom
 
-        try:
-            logger.debug(f"making request to {url} with params {params}, data {data}, vdom {vdom}")
-            response = self.session.request(
-                method=method,
-                url=url,
-                params=params,
-                json=data,
-                timeout=30
+        return url, params
+
+    def _make_request(self, method: str, endpoint: str, vdom: str = 'root',
+                      params: Dict = None, data: Dict = None) -> Dict:
+        """Executes API request with VDOM handling"""
+        if method == 'GET' and is_multi_vdom(vdom):
+            return self._multi_vdom_request(endpoint, vdom, params)
+        return self._request(method, endpoint, vdom, params, data)
+
+    def _multi_vdom_request(self, endpoint: str, vdom: str, params: Dict = None) -> List[Dict]:
+        """GETs an endpoint for several VDOMs, returning one response object per VDOM
+
+        Uses a single multi-VDOM query ('vdom=a,b' or 'vdom=*') and falls back to
+        concurrent per-VDOM requests on devices that do not support it.
+        """
+        if self.multi_vdom_query is not False:
+            try:
+                result = self._request('GET', endpoint, vdom, dict(params or {}))
+                if isinstance(result, list):
+                    self.multi_vdom_query = True
+                    return result
+            except requests.exceptions.HTTPError:
+                if self.multi_vdom_query:
+                    raise
+        responses = self.per_vdom(vdom, lambda name: self._request('GET', endpoint, name, dict(params or {})))
+        self.multi_vdom_query = False
+        return [_vdom_response(name, response) for name, response in responses.items()]
+
+    def vdom_names(self, vdom: str) -> List[str]:
+        """Expands a VDOM selector ('root', 'vdom1,vdom2' or '*') into VDOM names"""
+        if vdom == '*':
+            return [item['name'] for item in self.get_vdoms(fields=['name'])]
+        return [name.strip() for name in vdom.split(',') if name.strip()]
+
+    def per_vdom(self, vdom: str, func: Callable[[str], Any]) -> Any:
+        """Calls func(vdom), or func for each VDOM of a multi-VDOM selector concurrently
+
+        Multi-VDOM results are returned as a dict keyed by VDOM.
+        """
+        if not is_multi_vdom(vdom):
+            return func(vdom)
+        vdoms = self.vdom_names(vdom)
+        if not vdoms:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(len(vdoms), MAX_VDOM_WORKERS)) as pool:
+            return dict(zip(vdoms, pool.map(func, vdoms)))
+
+    def _request(self, method: str, endpoint: str, vdom: str = 'root',
+                 params: Dict = None, data: Dict = None) -> Any:
+        """Executes a request through the response cache and request coalescing"""
+        key = self._cache_key(method, endpoint, vdom, params)
+        cached = self._cache_lookup(key, vdom)
+        if cached is not None:
+            return cached
+
+        if method == 'GET':
+            # Identical concurrent GETs share a single request to the device
+            result, size = self.inflight.run(
+                (method,) + cache_key(endpoint, vdom, params),
+                lambda: self._send(method, endpoint, vdom, params, data)
             )
+        else:
+            try:
+                result, size = self._send(method, endpoint, vdom, params, data)
+            finally:
+                self._invalidate_after_write(method, endpoint, vdom, data)
+
+        if key is not None:
+            # Multi-VDOM responses (lists) carry a revision per VDOM and are not revalidated
+            revision = result.get('revision') if isinstance(result, dict) else None
+            self._cache_store(key, vdom, result, size, revision)
+        return result
+
+    def _send(self, method: str, endpoint: str, vdom: str, params: Dict = None,
+              data: Dict = None) -> tuple:
+        """Sends a request to the device, retrying transient failures of idempotent requests"""
+        attempt = 0
+        while True:
+            attempt += 1
+            self.breaker.before_request(self.host)
+            try:
+                result = self._send_once(method, endpoint, vdom, params, data)
+            except requests.exceptions.RequestException as e:
+                delay = self._after_failure(method, endpoint, attempt, e)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+            else:
+                self.breaker.record()
+                return result
+
+    def _after_failure(self, method: str, endpoint: str, attempt: int, error: Exception) -> Optional[float]:
+        """Records a failed attempt, returns the backoff before retrying or None to give up"""
+        self.breaker.record(error)
+        if isinstance(error, (requests.exceptions.ReadTimeout, httpx.ReadTimeout)):
+            # Count the timeout as a sample so the endpoint's timeout grows instead of repeating
+            self.timeouts.observe(endpoint, self.timeouts.get(endpoint)[1])
+        delay = self.retry.delay(method, attempt, error)
+        if delay is not None:
+            logger.warning("Retrying %s %s in %.2fs after attempt %d failed: %s",
+                           method, endpoint, delay, attempt, error)
+        return delay
+
+    def _send_once(self, method: str, endpoint: str, vdom: str, params: Dict = None,
+                   data: Dict = None) -> tuple:
+        """Sends a request to the device, returns the decoded body and its size in bytes"""
+        url, params = self._prepare_request(endpoint, vdom, params)
+
+        try:
+            request_log.request(method, endpoint, vdom, params, data)
+            with self.throttle.slot():
+                self.idle.touch()
+                self.connection_stats.record_request()
+                started = time.monotonic()
+                response = self.session.request(
+                    method=method,
+                    url=url,
+                    params=params,
+                    data=None if data is None else codec.dumpb(data),
+                    timeout=self.timeouts.get(endpoint)
+                )
+            elapsed = time.monotonic() - started
+            self.timeouts.observe(endpoint, elapsed)
+            request_log.response(method, endpoint, response.status_code,
+                                 elapsed, lambda: response.content)
             response.raise_for_status()
-            logger.debug(f"response: {response.text}")
-            return response.json()
+            return codec.loads(response.content), len(response.content)
         except requests.exceptions.RequestException as e:
-            logger.error(f"API request failed: {e}")
+            request_log.failure(method, endpoint, e)
             raise
 
+    def _cmdb_params(self, filters: List[str] = None, fields: List[str] = None) -> Optional[Dict]:
+        """Builds CMDB query parameters for filter expressions and field projection"""
+        params = {}
+        if filters:
+            params['filter'] = filters
+        if fields:
+            # FortiOS field projection: format=field1|field2|...
+            params['format'] = '|'.join(fields)
+        return params or None
+
+    def _results(self, response: Dict, default: Any) -> Any:
+        """Extracts the 'results' member of an API response"""
+        return _extract_results(response, default)
+
+    def _stream_results(self, endpoint: str, vdom: str = 'root', params: Dict = None) -> Iterator[Dict]:
+        """Executes a GET request and yields its 'results' items, decoded as they come off the socket
+
+        The page is decoded while the request holds its throttle slot and its
+        items are yielded once the slot is released, so a slow consumer does
+        not keep other requests waiting.
+        """
+        key = self._cache_key('GET', endpoint, vdom, params)
+        if key is not None:
+            # Streamed pages are cached as item lists, apart from full responses
+            key += ('items',)
+        cached = self._cache_lookup(key, vdom)
+        if cached is not None:
+            yield from cached
+            return
+
+        url, params = self._prepare_request(endpoint, vdom, params)
+
+        attempt = 0
+        while True:
+            attempt += 1
+            self.breaker.before_request(self.host)
+            try:
+                request_log.request('GET', endpoint, vdom, params)
+                with self.throttle.slot():
+                    self.idle.touch()
+                    self.connection_stats.record_request()
+                    started = time.monotonic()
+                    with self.session.request('GET', url, params=params, stream=True,
+                                              timeout=self.timeouts.get(endpoint)) as response:
+                        elapsed = time.monotonic() - started
+                        self.timeouts.observe(endpoint, elapsed)
+                        request_log.response('GET', endpoint, response.status_code, elapsed)
+                        response.raise_for_status()
+                        self.breaker.record()
+                        parser = ResultsStreamParser()
+                        # The decoded page (bounded by the page size) is kept for the cache anyway
+                        items = []
+                        size = 0
+                        for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                            size += len(chunk)
+                            items.extend(parser.feed(chunk))
+                        items.extend(parser.close())
+                        if key is not None:
+                            self._cache_store(key, vdom, items, size, parser.metadata.get('revision'))
+                break
+            except requests.exceptions.RequestException as e:
+                request_log.failure('GET', endpoint, e)
+                delay = self._after_failure('GET', endpoint, attempt, e)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+        yield from items
+
+    def _iter_results(self, endpoint: str, vdom: str = 'root', params: Dict = None,
+                      page_size: int = DEFAULT_PAGE_SIZE, limit: int = None) -> Iterator[Dict]:
+        """Yields the results of a table endpoint page by page using start/count"""
+        if is_multi_vdom(vdom):
+            raise ValueError("Paged iteration takes a single VDOM, use per_vdom() for several")
+        start = 0
+        while limit is None or start < limit:
+            count = page_size if limit is None else min(page_size, limit - start)
+            page_params = dict(params or {}, start=start, count=count)
+            received = 0
+            for item in self._stream_results(endpoint, vdom=vdom, params=page_params):
+                received += 1
+                yield item
+            if received < count:
+                return
+            start += received
+
     def get_system_status(self) -> Dict:
         """Get system status"""
         return self._make_request('GET', 'monitor/system/status')
 
-    def get_vdoms(self) -> List[Dict]:
+    def get_vdoms(self, fields: List[str] = None) -> List[Dict]:
         """List all VDOMs"""
-        result = self._make_request('GET', 'cmdb/system/vdom')
-        return result.get('results', [])
+        return self._results(self._make_request('GET', 'cmdb/system/vdom', params=self._cmdb_params(fields=fields)), [])
 
 ### Policy
-    def get_firewall_policies(self, vdom: str = 'root') -> List[Dict]:
-        """Get firewall policy list"""
-        result = self._make_request('GET', 'cmdb/firewall/policy', vdom=vdom)
-        return result.get('results', [])
+    def get_firewall_policies(self, vdom: str = 'root', filters: List[str] = None,
+                              fields: List[str] = None) -> List[Dict]:
+        """Get firewall policy list
 
-    def get_policy_by_id(self, policy_id: int, vdom: str = 'root') -> Dict:
+        filters: FortiOS filter expressions (e.g. 'action==accept'), combined with AND
+        fields: Only return these fields of each policy
+        """
+        params = self._cmdb_params(filters=filters, fields=fields)
+        return self._results(self._make_request('GET', 'cmdb/firewall/policy', vdom=vdom, params=params), [])
+
+    def iter_firewall_policies(self, vdom: str = 'root', filters: List[str] = None,
+                               fields: List[str] = None,
+                               page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[Dict]:
+        """Iterate over firewall policies, fetching them page by page"""
+        return self._iter_results('cmdb/firewall/policy', vdom=vdom,
+                                  params=self._cmdb_params(filters=filters, fields=fields),
+                                  page_size=page_size)
+
+    def get_firewall_policies6(self, vdom: str = 'root', fields: List[str] = None) -> List[Dict]:
+        """Get IPv6 firewall policies (FortiOS before 6.4)"""
+        return self._results(self._make_request('GET', 'cmdb/firewall/policy6', vdom=vdom, params=self._cmdb_params(fields=fields)), [])
+
+    def get_local_in_policies(self, vdom: str = 'root', fields: List[str] = None) -> List[Dict]:
+        """Get local-in policies"""
+        return self._results(self._make_request('GET', 'cmdb/firewall/local-in-policy', vdom=vdom, params=self._cmdb_params(fields=fields)), [])
+
+    def get_central_snat_map(self, vdom: str = 'root', fields: List[str] = None) -> List[Dict]:
+        """Get central SNAT map entries"""
+        return self._results(self._make_request('GET', 'cmdb/firewall/central-snat-map', vdom=vdom, params=self._cmdb_params(fields=fields)), [])
+
+    def get_proxy_policies(self, vdom: str = 'root', fields: List[str] = None) -> List[Dict]:
+        """Get explicit proxy policies"""
+        return self._results(self._make_request('GET', 'cmdb/firewall/proxy-policy', vdom=vdom, params=self._cmdb_params(fields=fields)), [])
+
+    def get_dos_policies(self, vdom: str = 'root', fields: List[str] = None) -> List[Dict]:
+        """Get IPv4 DoS policies"""
+        return self._results(self._make_request('GET', 'cmdb/firewall/DoS-policy', vdom=vdom, params=self._cmdb_params(fields=fields)), [])
+
+    def get_shaping_policies(self, vdom: str = 'root', fields: List[str] = None) -> List[Dict]:
+        """Get traffic shaping policies"""
+        return self._results(self._make_request('GET', 'cmdb/firewall/shaping-policy', vdom=vdom, params=self._cmdb_params(fields=fields)), [])
+
+    def get_profile_groups(self, vdom: str = 'root', fields: List[str] = None) -> List[Dict]:
+        """Get firewall profile groups"""
+        return self._results(self._make_request('GET', 'cmdb/firewall/profile-group', vdom=vdom, params=self._cmdb_params(fields=fields)), [])
+
+    def get_policy_by_id(self, policy_id: int, vdom: str = 'root', fields: List[str] = None) -> Dict:
         """Get specific firewall policy by ID"""
-        result = self._make_request('GET', f'cmdb/firewall/policy/{policy_id}', vdom=vdom)
-        return result.get('results', {})
+        return self._results(self._make_request('GET', f'cmdb/firewall/policy/{policy_id}', vdom=vdom, params=self._cmdb_params(fields=fields)), {})
 
     def create_firewall_policy(self, policy_data: Dict, vdom: str = 'root') -> Dict:
         """Create new firewall policy"""
@@ -102,13 +501,21 @@ class FortigateAPI:
         if dest_port != 0:
             params['destport'] = dest_port
 
-        result = self._make_request('GET', f'monitor/firewall/policy-lookup', vdom=vdom,params=params )
-        return result.get('results', {})
+        return self._results(self._make_request('GET', f'monitor/firewall/policy-lookup', vdom=vdom,params=params ), {})
 
-    def get_address_objects(self, vdom: str = 'root') -> List[Dict]:
+    def get_address_objects(self, vdom: str = 'root', fields: List[str] = None) -> List[Dict]:
         """Get address objects"""
-        result = self._make_request('GET', 'cmdb/firewall/address', vdom=vdom)
-        return result.get('results', [])
+        return self._results(self._make_request('GET', 'cmdb/firewall/address', vdom=vdom, params=self._cmdb_params(fields=fields)), [])
+
+    def iter_address_objects(self, vdom: str = 'root', fields: List[str] = None,
+                             page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[Dict]:
+        """Iterate over address objects, fetching them page by page"""
+        return self._iter_results('cmdb/firewall/address', vdom=vdom,
+                                  params=self._cmdb_params(fields=fields), page_size=page_size)
+
+    def get_address_groups(self, vdom: str = 'root', fields: List[str] = None) -> List[Dict]:
+        """Get address groups"""
+        return self._results(self._make_request('GET', 'cmdb/firewall/addrgrp', vdom=vdom, params=self._cmdb_params(fields=fields)), [])
 
     def create_address_object(self, address_data: Dict, vdom: str = 'root') -> Dict:
         """Create address object"""
@@ -122,10 +529,9 @@ class FortigateAPI:
         """Delete address object"""
         return self._make_request('DELETE', f'cmdb/firewall/address/{name}', vdom=vdom)
 
-    def get_service_objects(self, vdom: str = 'root') -> List[Dict]:
+    def get_service_objects(self, vdom: str = 'root', fields: List[str] = None) -> List[Dict]:
         """Get service objects"""
-        result = self._make_request('GET', 'cmdb/firewall/service/custom', vdom=vdom)
-        return result.get('results', [])
+        return self._results(self._make_request('GET', 'cmdb/firewall/service/custom', vdom=vdom, params=self._cmdb_params(fields=fields)), [])
 
     def create_service_object(self, service_data: Dict, vdom: str = 'root') -> Dict:
         """Create service object"""
@@ -139,15 +545,21 @@ class FortigateAPI:
         """Delete service object"""
         return self._make_request('DELETE', f'cmdb/firewall/service/custom/{name}', vdom=vdom)
 
-    def get_vip_addresses(self, vdom: str = 'root') -> List[Dict]:
+    def get_service_groups(self, vdom: str = 'root', fields: List[str] = None) -> List[Dict]:
+        """Get service groups"""
+        return self._results(self._make_request('GET', 'cmdb/firewall.service/group', vdom=vdom, params=self._cmdb_params(fields=fields)), [])
+
+    def get_vip_addresses(self, vdom: str = 'root', fields: List[str] = None) -> List[Dict]:
         """Get firewall virtual ip list"""
-        result = self._make_request('GET', 'cmdb/firewall/vip', vdom=vdom)
-        return result.get('results', [])
+        return self._results(self._make_request('GET', 'cmdb/firewall/vip', vdom=vdom, params=self._cmdb_params(fields=fields)), [])
+
+    def get_vip_groups(self, vdom: str = 'root', fields: List[str] = None) -> List[Dict]:
+        """Get firewall virtual ip groups"""
+        return self._results(self._make_request('GET', 'cmdb/firewall/vipgrp', vdom=vdom, params=self._cmdb_params(fields=fields)), [])
 
     def delete_vip_address(self, vip_name: str, vdom: str = 'root') -> Dict:
         """Delete firewall virtual ip address"""
-        result = self._make_request('DELETE', f'cmdb/firewall/vip/{vip_name}', vdom=vdom)
-        return result.get('results', [])
+        return self._results(self._make_request('DELETE', f'cmdb/firewall/vip/{vip_name}', vdom=vdom), [])
 
     def create_vip_object(self, vip_data: Dict, vdom: str = 'root') -> Dict:
         """Create VIP object"""
@@ -158,10 +570,13 @@ class FortigateAPI:
         return self._make_request('PUT', f'cmdb/firewall/vip/{name}', vdom=vdom, data=vip_data)
 
     ### Network
-    def get_interfaces(self, vdom: str = 'root') -> List[Dict]:
+    def get_interfaces(self, vdom: str = 'root', fields: List[str] = None) -> List[Dict]:
         """Get interface list"""
-        result = self._make_request('GET', 'cmdb/system/interface', vdom=vdom)
-        return result.get('results', [])
+        return self._results(self._make_request('GET', 'cmdb/system/interface', vdom=vdom, params=self._cmdb_params(fields=fields)), [])
+
+    def get_zones(self, vdom: str = 'root', fields: List[str] = None) -> List[Dict]:
+        """Get interface zones"""
+        return self._results(self._make_request('GET', 'cmdb/system/zone', vdom=vdom, params=self._cmdb_params(fields=fields)), [])
 
     def configure_interface(self, name: str, data: Dict, vdom: str = 'root') -> Dict:
         """Configure an interface"""
@@ -171,10 +586,9 @@ class FortigateAPI:
         """Create a new VLAN"""
         return self._make_request('POST', 'cmdb/system/interface', vdom=vdom, data=data)
 
-    def get_static_routes(self, vdom: str = 'root') -> List[Dict]:
+    def get_static_routes(self, vdom: str = 'root', fields: List[str] = None) -> List[Dict]:
         """Get static routes"""
-        result = self._make_request('GET', 'cmdb/router/static', vdom=vdom)
-        return result.get('results', [])
+        return self._results(self._make_request('GET', 'cmdb/router/static', vdom=vdom, params=self._cmdb_params(fields=fields)), [])
 
     def create_static_route(self, route_data: Dict, vdom: str = 'root') -> Dict:
         """Create static route"""
@@ -188,10 +602,9 @@ class FortigateAPI:
         """Update static route"""
         return self._make_request('PUT', f'cmdb/router/static/{route_id}', vdom=vdom, data=route_data)
 
-    def get_policy_routes(self, vdom: str = 'root') -> List[Dict]:
+    def get_policy_routes(self, vdom: str = 'root', fields: List[str] = None) -> List[Dict]:
         """Get policy routes"""
-        result = self._make_request('GET', 'cmdb/router/policy', vdom=vdom)
-        return result.get('results', [])
+        return self._results(self._make_request('GET', 'cmdb/router/policy', vdom=vdom, params=self._cmdb_params(fields=fields)), [])
 
     def create_policy_route(self, route_data: Dict, vdom: str = 'root') -> Dict:
         """Create policy route"""
@@ -203,24 +616,20 @@ class FortigateAPI:
         for the specified VDOM (default 'root').
         """
         endpoint = 'monitor/router/ipv4'
-        result = self._make_request('GET', endpoint, vdom=vdom)
-        return result.get('results', [])
+        return self._results(self._make_request('GET', endpoint, vdom=vdom), [])
 ### Routing dynamic
     def get_bgp_peers(self, vdom: str = 'root') -> List[Dict]:
         endpoint = 'monitor/router/bgp/neighbors'
-        result = self._make_request('GET', endpoint, vdom=vdom)
-        return result.get('results', [])
+        return self._results(self._make_request('GET', endpoint, vdom=vdom), [])
 
     def route_lookup(self, route: str, vdom: str = 'root' ) -> Dict:
         endpoint = 'monitor/router/lookup'
-        result = self._make_request('GET', endpoint, vdom=vdom, params={"destination": route})
-        return result.get('results',{})
+        return self._results(self._make_request('GET', endpoint, vdom=vdom, params={"destination": route}), {})
 
 ### Security Profiles
-    def get_av_profiles(self, vdom: str = 'root') -> List[Dict]:
+    def get_av_profiles(self, vdom: str = 'root', fields: List[str] = None) -> List[Dict]:
         """Get antivirus profiles"""
-        result = self._make_request('GET', 'cmdb/antivirus/profile', vdom=vdom)
-        return result.get('results', [])
+        return self._results(self._make_request('GET', 'cmdb/antivirus/profile', vdom=vdom, params=self._cmdb_params(fields=fields)), [])
 
     def create_av_profile(self, profile_data: Dict, vdom: str = 'root') -> Dict:
         """Create antivirus profile"""
@@ -234,10 +643,9 @@ class FortigateAPI:
         """Delete antivirus profile"""
         return self._make_request('DELETE', f'cmdb/antivirus/profile/{profile_name}', vdom=vdom)
 
-    def get_webfilter_profiles(self, vdom: str = 'root') -> List[Dict]:
+    def get_webfilter_profiles(self, vdom: str = 'root', fields: List[str] = None) -> List[Dict]:
         """Get web filter profiles"""
-        result = self._make_request('GET', 'cmdb/webfilter/profile', vdom=vdom)
-        return result.get('results', [])
+        return self._results(self._make_request('GET', 'cmdb/webfilter/profile', vdom=vdom, params=self._cmdb_params(fields=fields)), [])
 
     def create_webfilter_profile(self, profile_data: Dict, vdom: str = 'root') -> Dict:
         """Create web filter profile"""
@@ -251,10 +659,9 @@ class FortigateAPI:
         """Delete web filter profile"""
         return self._make_request('DELETE', f'cmdb/webfilter/profile/{profile_name}', vdom=vdom)
 
-    def get_ips_sensors(self, vdom: str = 'root') -> List[Dict]:
+    def get_ips_sensors(self, vdom: str = 'root', fields: List[str] = None) -> List[Dict]:
         """Get IPS sensors"""
-        result = self._make_request('GET', 'cmdb/ips/sensor', vdom=vdom)
-        return result.get('results', [])
+        return self._results(self._make_request('GET', 'cmdb/ips/sensor', vdom=vdom, params=self._cmdb_params(fields=fields)), [])
 
     def create_ips_sensor(self, sensor_data: Dict, vdom: str = 'root') -> Dict:
         """Create IPS sensor"""
@@ -268,10 +675,9 @@ class FortigateAPI:
         """Delete IPS sensor"""
         return self._make_request('DELETE', f'cmdb/ips/sensor/{sensor_name}', vdom=vdom)
 
-    def get_ssl_ssh_profiles(self, vdom: str = 'root') -> List[Dict]:
+    def get_ssl_ssh_profiles(self, vdom: str = 'root', fields: List[str] = None) -> List[Dict]:
         """Get SSL/SSH inspection profiles"""
-        result = self._make_request('GET', 'cmdb/firewall/ssl-ssh-profile', vdom=vdom)
-        return result.get('results', [])
+        return self._results(self._make_request('GET', 'cmdb/firewall/ssl-ssh-profile', vdom=vdom, params=self._cmdb_params(fields=fields)), [])
 
     def create_ssl_ssh_profile(self, profile_data: Dict, vdom: str = 'root') -> Dict:
         """Create SSL/SSH inspection profile"""
@@ -285,10 +691,9 @@ class FortigateAPI:
         """Delete SSL/SSH inspection profile"""
         return self._make_request('DELETE', f'cmdb/firewall/ssl-ssh-profile/{profile_name}', vdom=vdom)
 
-    def get_dnsfilter_profiles(self, vdom: str = 'root') -> List[Dict]:
+    def get_dnsfilter_profiles(self, vdom: str = 'root', fields: List[str] = None) -> List[Dict]:
         """Get DNS filter profiles"""
-        result = self._make_request('GET', 'cmdb/dnsfilter/profile', vdom=vdom)
-        return result.get('results', [])
+        return self._results(self._make_request('GET', 'cmdb/dnsfilter/profile', vdom=vdom, params=self._cmdb_params(fields=fields)), [])
 
     def create_dnsfilter_profile(self, profile_data: Dict, vdom: str = 'root') -> Dict:
         """Create DNS filter profile"""
@@ -303,10 +708,15 @@ class FortigateAPI:
         return self._make_request('DELETE', f'cmdb/dnsfilter/profile/{profile_name}', vdom=vdom)
 
 ### User Management
-    def get_local_users(self, vdom: str = 'root') -> List[Dict]:
+    def get_local_users(self, vdom: str = 'root', fields: List[str] = None) -> List[Dict]:
         """Get local users"""
-        result = self._make_request('GET', 'cmdb/user/local', vdom=vdom)
-        return result.get('results', [])
+        return self._results(self._make_request('GET', 'cmdb/user/local', vdom=vdom, params=self._cmdb_params(fields=fields)), [])
+
+    def iter_local_users(self, vdom: str = 'root', fields: List[str] = None,
+                         page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[Dict]:
+        """Iterate over local users, fetching them page by page"""
+        return self._iter_results('cmdb/user/local', vdom=vdom,
+                                  params=self._cmdb_params(fields=fields), page_size=page_size)
 
     def create_local_user(self, user_data: Dict, vdom: str = 'root') -> Dict:
         """Create local user"""
@@ -320,10 +730,9 @@ class FortigateAPI:
         """Delete local user"""
         return self._make_request('DELETE', f'cmdb/user/local/{username}', vdom=vdom)
 
-    def get_user_groups(self, vdom: str = 'root') -> List[Dict]:
+    def get_user_groups(self, vdom: str = 'root', fields: List[str] = None) -> List[Dict]:
         """Get user groups"""
-        result = self._make_request('GET', 'cmdb/user/group', vdom=vdom)
-        return result.get('results', [])
+        return self._results(self._make_request('GET', 'cmdb/user/group', vdom=vdom, params=self._cmdb_params(fields=fields)), [])
 
     def create_user_group(self, group_data: Dict, vdom: str = 'root') -> Dict:
         """Create user group"""
@@ -337,10 +746,9 @@ class FortigateAPI:
         """Delete user group"""
         return self._make_request('DELETE', f'cmdb/user/group/{group_name}', vdom=vdom)
 
-    def get_auth_servers(self, vdom: str = 'root') -> List[Dict]:
+    def get_auth_servers(self, vdom: str = 'root', fields: List[str] = None) -> List[Dict]:
         """Get authentication servers (LDAP)"""
-        result = self._make_request('GET', 'cmdb/user/ldap', vdom=vdom)
-        return result.get('results', [])
+        return self._results(self._make_request('GET', 'cmdb/user/ldap', vdom=vdom, params=self._cmdb_params(fields=fields)), [])
 
     def create_ldap_server(self, server_data: Dict, vdom: str = 'root') -> Dict:
         """Create LDAP authentication server"""
@@ -354,10 +762,9 @@ class FortigateAPI:
         """Delete LDAP authentication server"""
         return self._make_request('DELETE', f'cmdb/user/ldap/{server_name}', vdom=vdom)
 
-    def get_radius_servers(self, vdom: str = 'root') -> List[Dict]:
+    def get_radius_servers(self, vdom: str = 'root', fields: List[str] = None) -> List[Dict]:
         """Get RADIUS authentication servers"""
-        result = self._make_request('GET', 'cmdb/user/radius', vdom=vdom)
-        return result.get('results', [])
+        return self._results(self._make_request('GET', 'cmdb/user/radius', vdom=vdom, params=self._cmdb_params(fields=fields)), [])
 
     def create_radius_server(self, server_data: Dict, vdom: str = 'root') -> Dict:
         """Create RADIUS authentication server"""
@@ -368,10 +775,9 @@ class FortigateAPI:
         return self._make_request('DELETE', f'cmdb/user/radius/{server_name}', vdom=vdom)
 
 ### VPN Management
-    def get_ipsec_phase1(self, vdom: str = 'root') -> List[Dict]:
+    def get_ipsec_phase1(self, vdom: str = 'root', fields: List[str] = None) -> List[Dict]:
         """Get IPSec phase 1 configurations"""
-        result = self._make_request('GET', 'cmdb/vpn.ipsec/phase1-interface', vdom=vdom)
-        return result.get('results', [])
+        return self._results(self._make_request('GET', 'cmdb/vpn.ipsec/phase1-interface', vdom=vdom, params=self._cmdb_params(fields=fields)), [])
 
     def create_ipsec_phase1(self, phase1_data: Dict, vdom: str = 'root') -> Dict:
         """Create IPSec phase 1 interface"""
@@ -385,10 +791,9 @@ class FortigateAPI:
         """Delete IPSec phase 1 interface"""
         return self._make_request('DELETE', f'cmdb/vpn.ipsec/phase1-interface/{interface_name}', vdom=vdom)
 
-    def get_ipsec_phase2(self, vdom: str = 'root') -> List[Dict]:
+    def get_ipsec_phase2(self, vdom: str = 'root', fields: List[str] = None) -> List[Dict]:
         """Get IPSec phase 2 configurations"""
-        result = self._make_request('GET', 'cmdb/vpn.ipsec/phase2-interface', vdom=vdom)
-        return result.get('results', [])
+        return self._results(self._make_request('GET', 'cmdb/vpn.ipsec/phase2-interface', vdom=vdom, params=self._cmdb_params(fields=fields)), [])
 
     def create_ipsec_phase2(self, phase2_data: Dict, vdom: str = 'root') -> Dict:
         """Create IPSec phase 2 interface"""
@@ -398,19 +803,17 @@ class FortigateAPI:
         """Delete IPSec phase 2 interface"""
         return self._make_request('DELETE', f'cmdb/vpn.ipsec/phase2-interface/{interface_name}', vdom=vdom)
 
-    def get_ssl_vpn_settings(self, vdom: str = 'root') -> Dict:
+    def get_ssl_vpn_settings(self, vdom: str = 'root', fields: List[str] = None) -> Dict:
         """Get SSL VPN settings"""
-        result = self._make_request('GET', 'cmdb/vpn.ssl/settings', vdom=vdom)
-        return result.get('results', {})
+        return self._results(self._make_request('GET', 'cmdb/vpn.ssl/settings', vdom=vdom, params=self._cmdb_params(fields=fields)), {})
 
     def update_ssl_vpn_settings(self, settings_data: Dict, vdom: str = 'root') -> Dict:
         """Update SSL VPN settings"""
         return self._make_request('PUT', 'cmdb/vpn.ssl/settings', vdom=vdom, data=settings_data)
 
-    def get_ssl_vpn_portals(self, vdom: str = 'root') -> List[Dict]:
+    def get_ssl_vpn_portals(self, vdom: str = 'root', fields: List[str] = None) -> List[Dict]:
         """Get SSL VPN portals"""
-        result = self._make_request('GET', 'cmdb/vpn.ssl.web/portal', vdom=vdom)
-        return result.get('results', [])
+        return self._results(self._make_request('GET', 'cmdb/vpn.ssl.web/portal', vdom=vdom, params=self._cmdb_params(fields=fields)), [])
 
     def create_ssl_vpn_portal(self, portal_data: Dict, vdom: str = 'root') -> Dict:
         """Create SSL VPN portal"""
@@ -420,20 +823,17 @@ class FortigateAPI:
         """Delete SSL VPN portal"""
         return self._make_request('DELETE', f'cmdb/vpn.ssl.web/portal/{portal_name}', vdom=vdom)
 
-    def get_vpn_certificates(self, vdom: str = 'root') -> List[Dict]:
+    def get_vpn_certificates(self, vdom: str = 'root', fields: List[str] = None) -> List[Dict]:
         """Get VPN certificates"""
-        result = self._make_request('GET', 'cmdb/vpn.certificate/local', vdom=vdom)
-        return result.get('results', [])
+        return self._results(self._make_request('GET', 'cmdb/vpn.certificate/local', vdom=vdom, params=self._cmdb_params(fields=fields)), [])
 
     def get_ipsec_tunnels_status(self, vdom: str = 'root') -> List[Dict]:
         """Get IPSec tunnel status"""
-        result = self._make_request('GET', 'monitor/vpn/ipsec', vdom=vdom)
-        return result.get('results', [])
+        return self._results(self._make_request('GET', 'monitor/vpn/ipsec', vdom=vdom), [])
 
     def get_ssl_vpn_status(self, vdom: str = 'root') -> Dict:
         """Get SSL VPN status"""
-        result = self._make_request('GET', 'monitor/vpn/ssl', vdom=vdom)
-        return result.get('results', {})
+        return self._results(self._make_request('GET', 'monitor/vpn/ssl', vdom=vdom), {})
 
 ### System Administration
     def backup_config(self, scope: str = 'global') -> Dict:
@@ -448,31 +848,26 @@ class FortigateAPI:
 
     def get_system_performance(self, vdom: str = 'root') -> Dict:
         """Get system performance metrics"""
-        result = self._make_request('GET', 'monitor/system/resource/usage', vdom=vdom)
-        return result.get('results', {})
+        return self._results(self._make_request('GET', 'monitor/system/resource/usage', vdom=vdom), {})
 
     def get_license_info(self) -> Dict:
         """Get license information"""
-        result = self._make_request('GET', 'monitor/license/status')
-        return result.get('results', {})
+        return self._results(self._make_request('GET', 'monitor/license/status'), {})
 
     def get_system_logs(self, lines: int = 100, level: str = 'information') -> List[Dict]:
         """Get system logs"""
         params = {'lines': lines, 'level': level}
-        result = self._make_request('GET', 'monitor/log/system', params=params)
-        return result.get('results', [])
+        return self._results(self._make_request('GET', 'monitor/log/system', params=params), [])
 
     def get_traffic_logs(self, count: int = 100, vdom: str = 'root') -> List[Dict]:
         """Get traffic logs"""
         params = {'count': count}
-        result = self._make_request('GET', 'monitor/log/traffic', vdom=vdom, params=params)
-        return result.get('results', [])
+        return self._results(self._make_request('GET', 'monitor/log/traffic', vdom=vdom, params=params), [])
 
     def get_security_logs(self, count: int = 100, vdom: str = 'root') -> List[Dict]:
         """Get security logs"""
         params = {'count': count}
-        result = self._make_request('GET', 'monitor/log/attack', vdom=vdom, params=params)
-        return result.get('results', [])
+        return self._results(self._make_request('GET', 'monitor/log/attack', vdom=vdom, params=params), [])
 
     def reboot_system(self, event_log_message: str = "System reboot via API") -> Dict:
         """Reboot system"""
@@ -487,29 +882,30 @@ class FortigateAPI:
     def get_session_table(self, count: int = 100, vdom: str = 'root') -> List[Dict]:
         """Get session table"""
         params = {'count': count}
-        result = self._make_request('GET', 'monitor/firewall/session', vdom=vdom, params=params)
-        return result.get('results', [])
+        return self._results(self._make_request('GET', 'monitor/firewall/session', vdom=vdom, params=params), [])
+
+    def iter_session_table(self, vdom: str = 'root', limit: int = None,
+                           page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[Dict]:
+        """Iterate over the session table (at most limit sessions), fetching it page by page"""
+        return self._iter_results('monitor/firewall/session', vdom=vdom,
+                                  page_size=page_size, limit=limit)
 
     def get_bandwidth_usage(self, vdom: str = 'root') -> Dict:
         """Get bandwidth usage statistics"""
-        result = self._make_request('GET', 'monitor/system/interface/bandwidth', vdom=vdom)
-        return result.get('results', {})
+        return self._results(self._make_request('GET', 'monitor/system/interface/bandwidth', vdom=vdom), {})
 
     def get_firmware_info(self) -> Dict:
         """Get firmware information"""
-        result = self._make_request('GET', 'monitor/system/firmware')
-        return result.get('results', {})
+        return self._results(self._make_request('GET', 'monitor/system/firmware'), {})
 
     def get_disk_usage(self) -> Dict:
         """Get disk usage information"""
-        result = self._make_request('GET', 'monitor/system/storage')
-        return result.get('results', {})
+        return self._results(self._make_request('GET', 'monitor/system/storage'), {})
 
 ### High Availability
     def get_ha_status(self) -> Dict:
         """Get HA status"""
-        result = self._make_request('GET', 'monitor/system/ha-peer')
-        return result.get('results', {})
+        return self._results(self._make_request('GET', 'monitor/system/ha-peer'), {})
 
     def configure_ha(self, ha_data: Dict, vdom: str = 'root') -> Dict:
         """Configure HA settings"""
@@ -520,51 +916,334 @@ class FortigateAPI:
         return self._make_request('POST', 'monitor/system/ha-peer/disconnect')
 
 ### SD-WAN
-    def get_sdwan_zones(self, vdom: str = 'root') -> List[Dict]:
+    def get_sdwan_zones(self, vdom: str = 'root', fields: List[str] = None) -> List[Dict]:
         """Get SD-WAN zones"""
-        result = self._make_request('GET', 'cmdb/system/sdwan/zone', vdom=vdom)
-        return result.get('results', [])
+        return self._results(self._make_request('GET', 'cmdb/system/sdwan/zone', vdom=vdom, params=self._cmdb_params(fields=fields)), [])
 
     def create_sdwan_zone(self, zone_data: Dict, vdom: str = 'root') -> Dict:
         """Create SD-WAN zone"""
         return self._make_request('POST', 'cmdb/system/sdwan/zone', vdom=vdom, data=zone_data)
 
-    def get_sdwan_members(self, vdom: str = 'root') -> List[Dict]:
+    def get_sdwan_members(self, vdom: str = 'root', fields: List[str] = None) -> List[Dict]:
         """Get SD-WAN members"""
-        result = self._make_request('GET', 'cmdb/system/sdwan/members', vdom=vdom)
-        return result.get('results', [])
+        return self._results(self._make_request('GET', 'cmdb/system/sdwan/members', vdom=vdom, params=self._cmdb_params(fields=fields)), [])
+
+    def get_sdwan_rules(self, vdom: str = 'root', fields: List[str] = None) -> List[Dict]:
+        """Get SD-WAN rules"""
+        return self._results(self._make_request('GET', 'cmdb/system/sdwan/service', vdom=vdom, params=self._cmdb_params(fields=fields)), [])
 
     def get_sdwan_performance(self, vdom: str = 'root') -> Dict:
         """Get SD-WAN performance SLA"""
-        result = self._make_request('GET', 'monitor/system/sdwan/sla-log', vdom=vdom)
-        return result.get('results', {})
+        return self._results(self._make_request('GET', 'monitor/system/sdwan/sla-log', vdom=vdom), {})
 
     def get_sdwan_health_check(self, vdom: str = 'root') -> List[Dict]:
         """Get SD-WAN health check status"""
-        result = self._make_request('GET', 'monitor/system/sdwan/health-check', vdom=vdom)
-        return result.get('results', [])
+        return self._results(self._make_request('GET', 'monitor/system/sdwan/health-check', vdom=vdom), [])
 
 ### Advanced Monitoring
     def get_fortiview_statistics(self, chart_type: str = 'top-sources', vdom: str = 'root') -> Dict:
         """Get FortiView statistics"""
         params = {'chart_type': chart_type}
-        result = self._make_request('GET', 'monitor/fortiview/statistics', vdom=vdom, params=params)
-        return result.get('results', {})
+        return self._results(self._make_request('GET', 'monitor/fortiview/statistics', vdom=vdom, params=params), {})
 
     def get_threat_dashboard(self, vdom: str = 'root') -> Dict:
         """Get threat dashboard data"""
-        result = self._make_request('GET', 'monitor/system/security-rating', vdom=vdom)
-        return result.get('results', {})
+        return self._results(self._make_request('GET', 'monitor/system/security-rating', vdom=vdom), {})
 
     def get_policy_usage(self, vdom: str = 'root') -> List[Dict]:
         """Get firewall policy usage statistics"""
-        result = self._make_request('GET', 'monitor/firewall/policy/usage', vdom=vdom)
-        return result.get('results', [])
+        return self._results(self._make_request('GET', 'monitor/firewall/policy/usage', vdom=vdom), [])
 
     def get_application_statistics(self, vdom: str = 'root') -> Dict:
         """Get application control statistics"""
-        result = self._make_request('GET', 'monitor/application/name', vdom=vdom)
-        return result.get('results', {})
+        return self._results(self._make_request('GET', 'monitor/application/name', vdom=vdom), {})
+
+
+class AsyncFortigateAPI(FortigateAPI):
+    """Asynchronous variant of FortigateAPI built on httpx.AsyncClient
+
+    Exposes the same methods as FortigateAPI, each returning an awaitable,
+    so many requests to one or more devices can be in flight concurrently
+    on a single event loop.
+    """
+
+    def __init__(self, host: str, token: str, cache: Dict = None, connection: Dict = None,
+                 limits: Dict = None, retry: Dict = None, circuit_breaker: Dict = None,
+                 timeouts: Dict = None):
+        self._setup(host, token, cache, connection, limits, retry, circuit_breaker, timeouts)
+        self.inflight = AsyncSingleFlight()
+        if self.connection.http2 and not http2_available():
+            logger.warning("HTTP/2 requested for %s but the 'h2' package is not installed, using HTTP/1.1",
+                           self.host)
+            self.connection.http2 = False
+        self.client = httpx.AsyncClient(
+            headers={
+                'Authorization': f'Bearer {self.token}',
+                'Content-Type': 'application/json'
+            },
+            verify=False,
+            timeout=self.timeouts.default,
+            limits=self.connection.limits(),
+            http2=self.connection.http2
+        )
+        # Counts the TCP connections opened by the pool
+        self._extensions = {'trace': self.connection_stats.trace}
+
+    def _timeout(self, endpoint: str) -> httpx.Timeout:
+        connect, read = self.timeouts.get(endpoint)
+        return httpx.Timeout(read, connect=connect)
+
+    def _connection_stats(self) -> Dict:
+        return self.connection_stats.stats(self.connection)
+
+    async def _make_request(self, method: str, endpoint: str, vdom: str = 'root',
+                            params: Dict = None, data: Dict = None) -> Dict:
+        """Executes API request with VDOM handling"""
+        if method == 'GET' and is_multi_vdom(vdom):
+            return await self._multi_vdom_request(endpoint, vdom, params)
+        return await self._request(method, endpoint, vdom, params, data)
+
+    async def _multi_vdom_request(self, endpoint: str, vdom: str, params: Dict = None) -> List[Dict]:
+        """GETs an endpoint for several VDOMs, returning one response object per VDOM
+
+        Uses a single multi-VDOM query ('vdom=a,b' or 'vdom=*') and falls back to
+        concurrent per-VDOM requests on devices that do not support it.
+        """
+        if self.multi_vdom_query is not False:
+            try:
+                result = await self._request('GET', endpoint, vdom, dict(params or {}))
+                if isinstance(result, list):
+                    self.multi_vdom_query = True
+                    return result
+            except httpx.HTTPStatusError:
+                if self.multi_vdom_query:
+                    raise
+        responses = await self.per_vdom(vdom, lambda name: self._request('GET', endpoint, name, dict(params or {})))
+        self.multi_vdom_query = False
+        return [_vdom_response(name, response) for name, response in responses.items()]
+
+    async def vdom_names(self, vdom: str) -> List[str]:
+        """Expands a VDOM selector ('root', 'vdom1,vdom2' or '*') into VDOM names"""
+        if vdom == '*':
+            return [item['name'] for item in await self.get_vdoms(fields=['name'])]
+        return [name.strip() for name in vdom.split(',') if name.strip()]
+
+    async def per_vdom(self, vdom: str, func: Callable[[str], Any]) -> Any:
+        """Calls func(vdom), or func for each VDOM of a multi-VDOM selector concurrently
+
+        func may return an awaitable or an async iterator (collected into a list).
+        Multi-VDOM results are returned as a dict keyed by VDOM.
+        """
+        if not is_multi_vdom(vdom):
+            return await collect(func(vdom))
+        vdoms = await self.vdom_names(vdom)
+        results = await asyncio.gather(*(collect(func(name)) for name in vdoms))
+        return dict(zip(vdoms, results))
+
+    async def _request(self, method: str, endpoint: str, vdom: str = 'root',
+                       params: Dict = None, data: Dict = None) -> Any:
+        """Executes a request through the response cache and request coalescing"""
+        key = self._cache_key(method, endpoint, vdom, params)
+        cached = await self._cache_lookup(key, vdom)
+        if cached is not None:
+            return cached
+
+        if method == 'GET':
+            # Identical concurrent GETs share a single request to the device
+            result, size = await self.inflight.run(
+                (method,) + cache_key(endpoint, vdom, params),
+                lambda: self._send(method, endpoint, vdom, params, data)
+            )
+        else:
+            try:
+                result, size = await self._send(method, endpoint, vdom, params, data)
+            finally:
+                self._invalidate_after_write(method, endpoint, vdom, data)
+
+        if key is not None:
+            # Multi-VDOM responses (lists) carry a revision per VDOM and are not revalidated
+            revision = result.get('revision') if isinstance(result, dict) else None
+            self._cache_store(key, vdom, result, size, revision)
+        return result
+
+    async def _send(self, method: str, endpoint: str, vdom: str, params: Dict = None,
+                    data: Dict = None) -> tuple:
+        """Sends a request to the device, retrying transient failures of idempotent requests"""
+        attempt = 0
+        while True:
+            attempt += 1
+            self.breaker.before_request(self.host)
+            try:
+                result = await self._send_once(method, endpoint, vdom, params, data)
+            except httpx.HTTPError as e:
+                delay = self._after_failure(method, endpoint, attempt, e)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+            else:
+                self.breaker.record()
+                return result
+
+    async def _send_once(self, method: str, endpoint: str, vdom: str, params: Dict = None,
+                         data: Dict = None) -> tuple:
+        """Sends a request to the device, returns the decoded body and its size in bytes"""
+        url, params = self._prepare_request(endpoint, vdom, params)
+
+        try:
+            request_log.request(method, endpoint, vdom, params, data)
+            async with self.throttle.aslot():
+                self.connection_stats.record_request()
+                started = time.monotonic()
+                response = await self.client.request(
+                    method=method,
+                    url=url,
+                    params=params,
+                    content=None if data is None else codec.dumpb(data),
+                    timeout=self._timeout(endpoint),
+                    extensions=self._extensions
+                )
+            elapsed = time.monotonic() - started
+            self.timeouts.observe(endpoint, elapsed)
+            self.connection_stats.record_http_version(response.http_version)
+            request_log.response(method, endpoint, response.status_code,
+                                 elapsed, lambda: response.content)
+            response.raise_for_status()
+            return codec.loads(response.content), len(response.content)
+        except httpx.HTTPError as e:
+            request_log.failure(method, endpoint, e)
+            raise
+
+    async def _cache_lookup(self, key: Optional[tuple], vdom: str) -> Optional[Any]:
+        """Returns a cached response, revalidating expired entries against the config revision"""
+        if key is None:
+            return None
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        revision = self.cache.stale_revision(key)
+        if revision is not None and await self._config_revision(vdom) == revision:
+            return self.cache.renew(key)
+        self.cache.record_miss()
+        return None
+
+    async def _config_revision(self, vdom: str) -> Optional[str]:
+        """Returns the current config revision of a VDOM, probing the device if needed"""
+        revision = self.cache.known_revision(vdom)
+        if revision is None:
+            try:
+                response = await self._make_request('GET', self.cache.revision_endpoint, vdom=vdom,
+                                                    params=dict(REVISION_PROBE_PARAMS))
+            except (httpx.HTTPError, CircuitOpenError):
+                return None
+            revision = response.get('revision')
+            self.cache.note_revision(vdom, revision, probed=True)
+        return revision
+
+    async def _results(self, response, default: Any) -> Any:
+        """Awaits an API response and extracts its 'results' member"""
+        return _extract_results(await response, default)
+
+    async def _stream_results(self, endpoint: str, vdom: str = 'root',
+                              params: Dict = None) -> AsyncIterator[Dict]:
+        """Executes a GET request and yields its 'results' items, decoded as they come off the socket
+
+        The page is decoded while the request holds its throttle slot and its
+        items are yielded once the slot is released, so a slow consumer does
+        not keep other requests, or the followers sharing the page, waiting.
+        """
+        key = self._cache_key('GET', endpoint, vdom, params)
+        if key is not None:
+            # Streamed pages are cached as item lists, apart from full responses
+            key += ('items',)
+        cached = await self._cache_lookup(key, vdom)
+        if cached is not None:
+            for item in cached:
+                yield item
+            return
+
+        # Identical concurrent page requests share the leader's stream
+        flight_key = ('STREAM',) + cache_key(endpoint, vdom, params)
+        shared = self.inflight.join(flight_key)
+        if shared is not None:
+            try:
+                items = await asyncio.shield(shared)
+            except asyncio.CancelledError:
+                if not shared.cancelled():
+                    raise
+                # The leader abandoned its stream: fetch the page ourselves
+                items = None
+            if items is not None:
+                for item in items:
+                    yield item
+                return
+
+        future = self.inflight.lead(flight_key)
+        url, params = self._prepare_request(endpoint, vdom, params)
+        items = None
+        error = None
+
+        try:
+            attempt = 0
+            while True:
+                attempt += 1
+                self.breaker.before_request(self.host)
+                try:
+                    request_log.request('GET', endpoint, vdom, params)
+                    async with self.throttle.aslot():
+                        self.connection_stats.record_request()
+                        started = time.monotonic()
+                        async with self.client.stream('GET', url, params=params, timeout=self._timeout(endpoint),
+                                                      extensions=self._extensions) as response:
+                            elapsed = time.monotonic() - started
+                            self.timeouts.observe(endpoint, elapsed)
+                            self.connection_stats.record_http_version(response.http_version)
+                            request_log.response('GET', endpoint, response.status_code, elapsed)
+                            response.raise_for_status()
+                            self.breaker.record()
+                            parser = ResultsStreamParser()
+                            # The decoded page (bounded by the page size) is kept for followers and the cache
+                            page = []
+                            size = 0
+                            async for chunk in response.aiter_bytes(STREAM_CHUNK_SIZE):
+                                size += len(chunk)
+                                page.extend(parser.feed(chunk))
+                            page.extend(parser.close())
+                    items = page
+                    if key is not None:
+                        self._cache_store(key, vdom, items, size, parser.metadata.get('revision'))
+                    break
+                except httpx.HTTPError as e:
+                    request_log.failure('GET', endpoint, e)
+                    delay = self._after_failure('GET', endpoint, attempt, e)
+                    if delay is None:
+                        error = e
+                        raise
+                await asyncio.sleep(delay)
+        finally:
+            self.inflight.finish(flight_key, future, result=items, error=error)
+        for item in items:
+            yield item
+
+    async def _iter_results(self, endpoint: str, vdom: str = 'root', params: Dict = None,
+                            page_size: int = DEFAULT_PAGE_SIZE, limit: int = None) -> AsyncIterator[Dict]:
+        """Yields the results of a table endpoint page by page using start/count"""
+        if is_multi_vdom(vdom):
+            raise ValueError("Paged iteration takes a single VDOM, use per_vdom() for several")
+        start = 0
+        while limit is None or start < limit:
+            count = page_size if limit is None else min(page_size, limit - start)
+            page_params = dict(params or {}, start=start, count=count)
+            received = 0
+            async for item in self._stream_results(endpoint, vdom=vdom, params=page_params):
+                received += 1
+                yield item
+            if received < count:
+                return
+            start += received
+
+    async def aclose(self):
+        """Closes the underlying HTTP client"""
+        await self.client.aclose()
 
 
 class FortigateManager:
@@ -572,17 +1251,46 @@ class FortigateManager:
 
     def __init__(self):
         self.devices: Dict[str, FortigateAPI] = {}
+        self.async_devices: Dict[str, AsyncFortigateAPI] = {}
         self.device_configs: Dict[str, Dict] = {}
-
-    def add_device(self, device_id: str, host: str, token: str, vdoms: List[str] = None):
-        """Add a new device"""
-        api = FortigateAPI(host, token)
+        self.fleet_concurrency = DEFAULT_FLEET_CONCURRENCY
+        self.fleet_timeout = DEFAULT_FLEET_TIMEOUT
+
+    def configure_fleet(self, concurrency: int = None, timeout: float = None):
+        """Sets the fan-out defaults (devices queried at once, seconds per device)"""
+        if concurrency is not None:
+            self.fleet_concurrency = max(1, int(concurrency))
+        if timeout is not None:
+            self.fleet_timeout = float(timeout)
+
+    def add_device(self, device_id: str, host: str, token: str, vdoms: List[str] = None,
+                   cache: Dict = None, connection: Dict = None, limits: Dict = None,
+                   retry: Dict = None, circuit_breaker: Dict = None, timeouts: Dict = None):
+        """Add a new device
+
+        cache: Response cache settings ('ttl' in seconds, 'max_bytes')
+        connection: Connection pool settings ('pool_size', 'keepalive',
+            'keepalive_expiry' in seconds, 'http2')
+        limits: Request limits ('max_in_flight', 'rate' per second, 'burst')
+        retry: Retry settings ('attempts', 'backoff', 'max_backoff' in seconds, 'methods')
+        circuit_breaker: Circuit breaker settings ('failures', 'reset_timeout' in seconds)
+        timeouts: Timeout settings ('default', 'connect', 'min', 'max', 'multiplier',
+            'endpoints' overrides)
+        """
+        api = FortigateAPI(host, token, cache=cache, connection=connection, limits=limits,
+                           retry=retry, circuit_breaker=circuit_breaker, timeouts=timeouts)
         self.devices[device_id] = api
+        # Both clients share one cache so writes through either invalidate it,
+        # and one throttle, circuit breaker and latency history so they hold across both
+        self.async_devices[device_id] = AsyncFortigateAPI(host, token, cache=api.cache,
+                                                          connection=connection, limits=api.throttle,
+                                                          retry=api.retry, circuit_breaker=api.breaker,
+                                                          timeouts=api.timeouts)
         self.device_configs[device_id] = {
             'host': host,
             'vdoms': vdoms or ['root']
         }
-        logger.info(f"Added device {device_id} at {host}")
+        logger.info("Added device %s at %s", device_id, host)
 
     def get_device(self, device_id: str) -> FortigateAPI:
         """Get API instance for device"""
@@ -590,6 +1298,12 @@ class FortigateManager:
             raise ValueError(f"Device {device_id} not found")
         return self.devices[device_id]
 
+    def get_async_device(self, device_id: str) -> AsyncFortigateAPI:
+        """Get async API instance for device"""
+        if device_id not in self.async_devices:
+            raise ValueError(f"Device {device_id} not found")
+        return self.async_devices[device_id]
+
     def list_devices(self) -> List[Dict]:
         """List all configured devices"""
         return [
@@ -599,4 +1313,68 @@ class FortigateManager:
                 'vdoms': config['vdoms']
             }
             for device_id, config in self.device_configs.items()
-        ]
\ No newline at end of file
+        ]
+
+    async def fan_out(self, method: str, device_ids: List[str] = None, vdoms: List[str] = None,
+                      concurrency: int = None, timeout: float = None, **kwargs) -> Dict:
+        """Runs an AsyncFortigateAPI method on several devices concurrently
+
+        device_ids: Devices to query (default: all)
+        vdoms: VDOMs to query on each device; ['*'] selects each device's configured
+            VDOMs and None calls the method once per device without a vdom argument
+        concurrency: Maximum number of calls in flight (default: fleet_concurrency)
+        timeout: Seconds allowed for each device call (default: fleet_timeout)
+
+        Returns partial results: {'results': ..., 'errors': ..., 'summary': ...}, with
+        results and errors keyed by device_id (then by VDOM when vdoms is given).
+        """
+        device_ids = list(device_ids or self.device_configs)
+        limit = asyncio.Semaphore(max(1, int(concurrency or self.fleet_concurrency)))
+        timeout = float(timeout or self.fleet_timeout)
+        results: Dict[str, Any] = {}
+        errors: Dict[str, Any] = {}
+
+        async def call(device_id: str, vdom: Optional[str]):
+            call_kwargs = dict(kwargs)
+            if vdom is not None:
+                call_kwargs['vdom'] = vdom
+            async with limit:
+                try:
+                    api = self.get_async_device(device_id)
+                    result = await asyncio.wait_for(collect(getattr(api, method)(**call_kwargs)), timeout)
+                except asyncio.TimeoutError:
+                    return device_id, vdom, None, f"Timed out after {timeout:g}s"
+                except Exception as e:
+                    return device_id, vdom, None, str(e) or type(e).__name__
+            return device_id, vdom, result, None
+
+        calls = []
+        for device_id in device_ids:
+            if vdoms is None:
+                calls.append(call(device_id, None))
+                continue
+            targets = vdoms
+            if '*' in vdoms:
+                targets = self.device_configs.get(device_id, {}).get('vdoms', ['root'])
+            calls.extend(call(device_id, vdom) for vdom in targets)
+
+        started = time.monotonic()
+        failed = 0
+        for device_id, vdom, result, error in await asyncio.gather(*calls):
+            target, value = (errors, error) if error is not None else (results, result)
+            failed += error is not None
+            if vdom is None:
+                target[device_id] = value
+            else:
+                target.setdefault(device_id, {})[vdom] = value
+
+        return {
+            'results': results,
+            'errors': errors,
+            'summary': {
+                'devices': len(device_ids),
+                'calls': len(calls),
+                'failed_calls': failed,
+                'elapsed': round(time.monotonic() - started, 3)
+            }
+        }
@@ -0,0 +1,279 @@
+"""
+Policy hit-count history
+
+A background sampler polls monitor/firewall/policy/usage of every device
+and VDOM on a schedule and records how much each policy's hit counter grew
+since the previous sample. Growth is accumulated per policy into fixed-width
+time buckets kept in a ring: one array of 32-bit counts per policy that was
+ever hit, plus one array of bucket start times per device and VDOM, so the
+history costs bucket count x 4 bytes per active policy however often the
+device is polled. Queries (policies without hits, top policies, hit rate
+trend) read only this memory.
+"""
+
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from .references import policy_hit_counts
+
+DEFAULT_SAMPLE_INTERVAL = 300
+DEFAULT_BUCKET_SECONDS = 3600
+DEFAULT_BUCKETS = 720
+# Largest count a bucket holds
+MAX_BUCKET_HITS = 2 ** 32 - 1
+# Consecutive samples a policy must be missing from before its history is dropped
+MISSING_SAMPLES_BEFORE_DROP = 3
+
+
+class HitHistory:
+    """Per-policy hit counts of one device and VDOM, in a ring of time buckets"""
+
+    def __init__(self, bucket_seconds: int = DEFAULT_BUCKET_SECONDS, buckets: int = DEFAULT_BUCKETS):
+        self.bucket_seconds = max(1, int(bucket_seconds))
+        self.capacity = max(1, int(buckets))
+        # Start time of the bucket in each slot, 0 for slots never used
+        self.starts = array('d', [0.0]) * self.capacity
+        self.current = -1
+        self.columns: Dict[int, array] = {}
+        # Last raw counter of each policy, and when it last grew
+        self.counters: Dict[int, int] = {}
+        self.last_hit: Dict[int, float] = {}
+        # Consecutive samples each policy has been missing from
+        self.missing: Dict[int, int] = {}
+        self.first_sample: Optional[float] = None
+        self.last_sample: Optional[float] = None
+        self.samples = 0
+        self._lock = threading.Lock()
+
+    def _advance(self, now: float) -> int:
+        """Returns the slot of the bucket holding now, opening new buckets as needed"""
+        start = now - now % self.bucket_seconds
+        if self.current >= 0 and self.starts[self.current] == start:
+            return self.current
+        if self.current >= 0 and start < self.starts[self.current]:
+            # The clock went back: keep counting into the newest bucket
+            return self.current
+        # Open the buckets up to now, so that buckets without samples count as no hits
+        elapsed = (1 if self.current < 0 else
+                   min(self.capacity, int((start - self.starts[self.current]) // self.bucket_seconds)))
+        for step in range(elapsed, 0, -1):
+            self.current = (self.current + 1) % self.capacity
+            self.starts[self.current] = start - (step - 1) * self.bucket_seconds
+            for column in self.columns.values():
+                column[self.current] = 0
+        return self.current
+
+    def record(self, hits: Dict[int, int], now: float = None):
+        """Adds a sample of raw policy hit counters
+
+        A policy missing from MISSING_SAMPLES_BEFORE_DROP samples in a row was
+        deleted and leaves the history; an empty sample (a failed or truncated
+        usage response) drops nothing.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            slot = self._advance(now)
+            for policy, count in hits.items():
+                self.missing.pop(policy, None)
+                previous = self.counters.get(policy)
+                self.counters[policy] = count
+                if previous is None:
+                    # First sight of the policy: its counter is the baseline
+                    continue
+                # A lower counter was reset (reboot, policy edit): all its hits are new
+                delta = count - previous if count >= previous else count
+                if delta <= 0:
+                    continue
+                column = self.columns.get(policy)
+                if column is None:
+                    column = self.columns[policy] = array('I', [0]) * self.capacity
+                column[slot] = min(column[slot] + delta, MAX_BUCKET_HITS)
+                self.last_hit[policy] = now
+            for policy in ([policy for policy in self.counters if policy not in hits] if hits else ()):
+                self.missing[policy] = self.missing.get(policy, 0) + 1
+                if self.missing[policy] >= MISSING_SAMPLES_BEFORE_DROP:
+                    del self.counters[policy], self.missing[policy]
+                    self.columns.pop(policy, None)
+                    self.last_hit.pop(policy, None)
+            if self.first_sample is None:
+                self.first_sample = now
+            self.last_sample = now
+            self.samples += 1
+
+    def _slots(self, since: float) -> List[int]:
+        """Returns the used slots of buckets ending after since, oldest first"""
+        slots = [(self.starts[slot], slot) for slot in range(self.capacity)
+                 if self.starts[slot] and self.starts[slot] + self.bucket_seconds > since]
+        return [slot for _, slot in sorted(slots)]
+
+    def _coverage(self) -> float:
+        if self.first_sample is None:
+            return 0.0
+        return self.last_sample - self.first_sample
+
+    def coverage(self) -> float:
+        """Returns the seconds between the first and the last sample"""
+        with self._lock:
+            return self._coverage()
+
+    def tracks(self, policy: int) -> bool:
+        """Tells whether a policy is in the history"""
+        with self._lock:
+            return policy in self.counters
+
+    def last_hit_at(self, policy: int) -> Optional[float]:
+        """Returns when the counter of a policy last grew, None if it has not since sampling started"""
+        with self._lock:
+            return self.last_hit.get(policy)
+
+    def zero_hits(self, seconds: float, now: float = None) -> Dict:
+        """Returns the policies without hits during the last seconds"""
+        now = time.time() if now is None else now
+        with self._lock:
+            since = now - seconds
+            policies = sorted(policy for policy in self.counters
+                              if self.last_hit.get(policy, 0) < since)
+            return {
+                'policies': policies,
+                'never_hit_while_sampled': [policy for policy in policies if policy not in self.last_hit],
+                'complete': self.first_sample is not None and self.first_sample <= since,
+                'covered_seconds': round(self._coverage()),
+            }
+
+    def top(self, seconds: float, limit: int = 10, now: float = None) -> List[Tuple[int, int]]:
+        """Returns the policies with the most hits during the last seconds, as (policy, hits)"""
+        now = time.time() if now is None else now
+        with self._lock:
+            slots = self._slots(now - seconds)
+            totals = [(policy, sum(column[slot] for slot in slots)) for policy, column in self.columns.items()]
+        totals = [item for item in totals if item[1]]
+        totals.sort(key=lambda item: (-item[1], item[0]))
+        return totals[:limit]
+
+    def series(self, policy: int, seconds: float, now: float = None) -> List[Tuple[float, int]]:
+        """Returns (bucket start, hits) of a policy for the buckets of the last seconds"""
+        now = time.time() if now is None else now
+        with self._lock:
+            column = self.columns.get(policy)
+            return [(self.starts[slot], column[slot] if column is not None else 0)
+                    for slot in self._slots(now - seconds)]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'samples': self.samples,
+                'policies': len(self.counters),
+                'policies_with_hits': len(self.columns),
+                'buckets_used': sum(1 for start in self.starts if start),
+                'bucket_seconds': self.bucket_seconds,
+                'capacity_buckets': self.capacity,
+                'covered_seconds': round(self._coverage()),
+                'memory_bytes': (len(self.columns) * self.capacity * 4) + self.capacity * 8,
+            }
+
+
+def trend(series: List[Tuple[float, int]], bucket_seconds: int) -> Dict:
+    """Summarizes a hit series: hits per minute per bucket and the least-squares slope"""
+    points = [{'start': time.strftime('%Y-%m-%dT%H:%M:%S%z', time.localtime(start)), 'hits': hits,
+               'hits_per_minute': round(hits * 60 / bucket_seconds, 3)} for start, hits in series]
+    slope = None
+    if len(series) >= 2:
+        xs = [start for start, _ in series]
+        ys = [hits * 60 / bucket_seconds for _, hits in series]
+        mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+        spread = sum((x - mean_x) ** 2 for x in xs)
+        if spread:
+            # Change of the hits-per-minute rate per day
+            slope = round(sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / spread * 86400, 3)
+    return {
+        'points': points,
+        'total_hits': sum(hits for _, hits in series),
+        'rate_change_per_day': slope,
+        'direction': (None if slope is None else
+                      'rising' if slope > 0 else 'falling' if slope < 0 else 'flat'),
+    }
+
+
+class HitSampler:
+    """Background thread polling the policy usage of every device and VDOM"""
+
+    def __init__(self, manager, interval: float = DEFAULT_SAMPLE_INTERVAL,
+                 bucket_seconds: int = DEFAULT_BUCKET_SECONDS, buckets: int = DEFAULT_BUCKETS):
+        self.manager = manager
+        self.interval = float(interval)
+        self.bucket_seconds = bucket_seconds
+        self.buckets = buckets
+        self.histories: Dict[Tuple[str, str], HitHistory] = {}
+        self.errors: Dict[Tuple[str, str], str] = {}
+        self.last_run: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def configure(self, interval: float = None, bucket_seconds: int = None, buckets: int = None):
+        """Changes the schedule; bucket changes only apply to histories started afterwards"""
+        if interval is not None:
+            self.interval = max(1.0, float(interval))
+        if bucket_seconds is not None:
+            self.bucket_seconds = int(bucket_seconds)
+        if buckets is not None:
+            self.buckets = int(buckets)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='hit-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self.sample()
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def targets(self) -> List[Tuple[str, str]]:
+        return [(device['device_id'], vdom) for device in self.manager.list_devices()
+                for vdom in device['vdoms']]
+
+    def sample(self):
+        """Polls every device and VDOM once"""
+        for device_id, vdom in self.targets():
+            key = (device_id, vdom)
+            try:
+                usage = self.manager.get_device(device_id).get_policy_usage(vdom)
+                self.history(device_id, vdom, create=True).record(policy_hit_counts(usage))
+                self.errors.pop(key, None)
+            except Exception as e:
+                self.errors[key] = str(e)
+        self.last_run = time.time()
+
+    def history(self, device_id: str, vdom: str = 'root', create: bool = False) -> Optional[HitHistory]:
+        with self._lock:
+            key = (device_id, vdom)
+            if key not in self.histories and create:
+                self.histories[key] = HitHistory(self.bucket_seconds, self.buckets)
+            return self.histories.get(key)
+
+    def stats(self) -> Dict:
+        return {
+            'running': self.running,
+            'interval': self.interval,
+            'last_run': (time.strftime('%Y-%m-%dT%H:%M:%S%z', time.localtime(self.last_run))
+                         if self.last_run else None),
+            'histories': {f"{device_id}/{vdom}": history.stats()
+                          for (device_id, vdom), history in list(self.histories.items())},
+            'errors': {f"{device_id}/{vdom}": error for (device_id, vdom), error in list(self.errors.items())},
+        }
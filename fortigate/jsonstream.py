@@ -0,0 +1,180 @@
+"""
+Incremental decoding of FortiOS REST API responses
+
+FortiOS wraps table data in a JSON object whose 'results' member is an
+array. ResultsStreamParser consumes the raw response body chunk by chunk
+and returns each element of that array as soon as it is complete, so large
+tables never have to be held as one decoded string plus one object graph.
+
+Items are decoded with the standard library whatever the configured codec:
+finding where an item ends needs a decoder that reports the end of the
+value it read (json.JSONDecoder.raw_decode). orjson only reports it through
+an error, as a UTF-8 byte offset into text the parser holds as str, and
+decoding each item a second time with it measured slower than raw_decode.
+"""
+
+import codecs
+import json
+from typing import Any, Dict, Iterator, List
+
+# Size of the chunks read from the socket when streaming a response
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = ' \t\n\r'
+
+# Parser states
+_START = 'start'
+_KEY = 'key'
+_COLON = 'colon'
+_VALUE = 'value'
+_AFTER_VALUE = 'after_value'
+_ITEM = 'item'
+_AFTER_ITEM = 'after_item'
+_DONE = 'done'
+
+# Marker returned when the buffer does not yet hold a complete value
+_NEED_MORE = object()
+
+
+class ResultsStreamParser:
+    """Push parser yielding the items of a FortiOS response 'results' array
+
+    Feed it raw bytes with feed() and call close() once the body is
+    exhausted. A 'results' object, as single-object endpoints return, is
+    yielded as the only item. Top-level members other than 'results'
+    (status, vdom, revision...) are collected in the metadata attribute.
+    """
+
+    def __init__(self):
+        self.metadata: Dict[str, Any] = {}
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._state = _START
+        self._key = None
+        # Buffer length below which an incomplete value is not re-parsed
+        self._retry_at = 0
+
+    def feed(self, data: bytes) -> List[Any]:
+        """Consumes a chunk of the body and returns the items it completed"""
+        self._append(self._decoder.decode(data))
+        return list(self._parse(final=False))
+
+    def close(self) -> List[Any]:
+        """Flushes the parser at end of body and returns the remaining items"""
+        self._append(self._decoder.decode(b'', final=True))
+        items = list(self._parse(final=True))
+        if self._state != _DONE:
+            raise ValueError("Truncated JSON response")
+        return items
+
+    def _append(self, text: str):
+        # Drop the consumed prefix so the buffer only holds unparsed data
+        self._buffer = self._buffer[self._pos:] + text
+        self._retry_at -= self._pos
+        self._pos = 0
+
+    def _skip_whitespace(self) -> bool:
+        """Advances past whitespace, returns False if the buffer is exhausted"""
+        buffer = self._buffer
+        pos = self._pos
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+        self._pos = pos
+        return pos < len(buffer)
+
+    def _decode_value(self, final: bool) -> Any:
+        """Decodes one JSON value at the current position"""
+        if not final and len(self._buffer) < self._retry_at:
+            return _NEED_MORE
+        try:
+            value, end = self._json.raw_decode(self._buffer, self._pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            # Wait for the buffer to double before retrying, keeping the
+            # cost of re-parsing one large value linear
+            self._retry_at = 2 * len(self._buffer)
+            return _NEED_MORE
+        # A number ending at the buffer boundary may continue in the next chunk
+        if (not final and end == len(self._buffer)
+                and isinstance(value, (int, float)) and not isinstance(value, bool)):
+            return _NEED_MORE
+        self._pos = end
+        self._retry_at = 0
+        return value
+
+    def _expect(self, char: str):
+        found = self._buffer[self._pos]
+        if found != char:
+            raise ValueError(f"Unexpected character {found!r} in JSON response, expected {char!r}")
+        self._pos += 1
+
+    def _parse(self, final: bool) -> Iterator[Any]:
+        while self._state != _DONE:
+            if not self._skip_whitespace():
+                return
+
+            char = self._buffer[self._pos]
+            state = self._state
+
+            if state == _START:
+                self._expect('{')
+                self._state = _KEY
+
+            elif state == _KEY:
+                if char == '}':
+                    self._pos += 1
+                    self._state = _DONE
+                    continue
+                key = self._decode_value(final)
+                if key is _NEED_MORE:
+                    return
+                self._key = key
+                self._state = _COLON
+
+            elif state == _COLON:
+                self._expect(':')
+                self._state = _VALUE
+
+            elif state == _VALUE:
+                if self._key == 'results' and char == '[':
+                    self._pos += 1
+                    self._state = _ITEM
+                    continue
+                value = self._decode_value(final)
+                if value is _NEED_MORE:
+                    return
+                self._state = _AFTER_VALUE
+                if self._key == 'results' and isinstance(value, dict):
+                    yield value
+                else:
+                    self.metadata[self._key] = value
+
+            elif state == _AFTER_VALUE:
+                if char == ',':
+                    self._pos += 1
+                    self._state = _KEY
+                else:
+                    self._expect('}')
+                    self._state = _DONE
+
+            elif state == _ITEM:
+                if char == ']':
+                    self._pos += 1
+                    self._state = _AFTER_VALUE
+                    continue
+                item = self._decode_value(final)
+                if item is _NEED_MORE:
+                    return
+                self._state = _AFTER_ITEM
+                yield item
+
+            elif state == _AFTER_ITEM:
+                if char == ',':
+                    self._pos += 1
+                    self._state = _ITEM
+                else:
+                    self._expect(']')
+                    self._state = _AFTER_VALUE
@@ -0,0 +1,371 @@
+"""
+Shadowed, redundant and correlated firewall policy detection
+
+Each compiled policy is a box over five dimensions: source and destination
+interfaces, source and destination addresses, and services (protocol and
+destination port, or ICMP type and code, folded into one integer space).
+Because some parts of a policy cannot be resolved offline, every dimension
+holds two interval sets: 'over', everything the policy could match, and
+'under', what it certainly matches. Relations are only reported when they
+hold for both bounds, so unresolved objects never produce false findings.
+
+Instead of comparing every pair of policies, each dimension gets a range
+index over the interval boundaries of all policies. One query returns, as a
+bitmask, the policies overlapping or containing an interval; ANDing the
+dimensions gives the related policies of one policy in O(log n) big-integer
+operations per interval. Full masks are only kept per block of boundaries,
+not per boundary, so the indexes of 10,000 policies take megabytes.
+
+Relations (i before j in policy order):
+
+- shadowed: j is contained in an earlier policy with another action, it never matches
+- redundant: j is contained in an earlier policy with the same action, or
+  i is contained in a later policy j with the same action and no policy
+  between them with another action overlaps i
+- correlated: i and j overlap, neither contains the other and their actions differ
+- unmatchable: j matches nothing (an empty dimension, e.g. a negated 'all')
+"""
+
+import bisect
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from .policy_engine import (ALL_PORTS, FULL_IPV4, IPV4_MAX, PORT_MAX, PORT_PROTOCOLS, CompiledPolicy,
+                            IntervalSet, PolicyEngine)
+
+# Service space: protocol number * SERVICE_STRIDE + destination port (or ICMP type * 256 + code)
+SERVICE_STRIDE = PORT_MAX + 1
+SERVICE_MAX = 256 * SERVICE_STRIDE - 1
+FULL_SERVICES = IntervalSet([(0, SERVICE_MAX)])
+# Correlated policies listed per policy
+MAX_LISTED_CORRELATIONS = 10
+# Query results kept for reuse, each a mask as wide as the policy set
+MAX_CACHED_QUERIES = 4096
+
+DIMENSIONS = ('srcintf', 'dstintf', 'srcaddr', 'dstaddr', 'service')
+EMPTY = IntervalSet()
+
+
+class _RangeIndex:
+    """Interval boundaries of one dimension over all policies
+
+    Each boundary point toggles the policies whose intervals start or stop
+    there, and the policies covering the segment starting at a point are
+    the XOR of the toggles up to it. Rather than a mask per point, the
+    points are grouped in blocks of at most BLOCK toggles, a point toggling
+    more being a block of its own: the mask of the first point of each
+    block is kept and the others are rebuilt from it. A segment tree over
+    the blocks (the policies with a boundary in each) answers, for a range
+    of segments, which policies start or stop in it.
+    """
+
+    # Toggles per block: memory falls as 1/BLOCK, rebuilding a mask replays up to BLOCK toggles
+    BLOCK = 16
+
+    def __init__(self, sets: List[IntervalSet]):
+        events: Dict[int, List[int]] = {0: []}
+        for bit, intervals in enumerate(sets):
+            for start, end in intervals.intervals():
+                events.setdefault(start, []).append(bit)
+                events.setdefault(end + 1, []).append(bit)
+        self.points = sorted(events)
+        self.toggles = [events[point] for point in self.points]
+        # Per block: its first point, the mask there and the policies it toggles
+        self.starts, self.checkpoints, blocks = [], [], []
+        current = pending = 0
+        for k, toggles in enumerate(self.toggles):
+            mask = 0
+            for bit in toggles:
+                mask |= 1 << bit
+            current ^= mask
+            pending += len(toggles)
+            if not self.starts or pending > self.BLOCK or len(toggles) >= self.BLOCK or \
+                    len(self.toggles[k - 1]) >= self.BLOCK:
+                self.starts.append(k)
+                self.checkpoints.append(current)
+                blocks.append(mask)
+                pending = len(toggles)
+            else:
+                blocks[-1] |= mask
+        self.size = len(blocks)
+        # Block of each point
+        self.block_of = [0] * len(self.points)
+        for block, start in enumerate(self.starts):
+            end = self._end(block)
+            self.block_of[start:end + 1] = [block] * (end + 1 - start)
+        self.tree = [0] * self.size + blocks
+        for i in range(self.size - 1, 0, -1):
+            self.tree[i] = self.tree[2 * i] | self.tree[2 * i + 1]
+
+    def _end(self, block: int) -> int:
+        """Returns the last point of a block"""
+        return self.starts[block + 1] - 1 if block + 1 < self.size else len(self.points) - 1
+
+    def _mask(self, k: int) -> int:
+        """Returns the policies covering segment k"""
+        block = self.block_of[k]
+        mask = self.checkpoints[block]
+        for toggles in self.toggles[self.starts[block] + 1:k + 1]:
+            for bit in toggles:
+                mask ^= 1 << bit
+        return mask
+
+    def _toggled(self, first: int, last: int) -> int:
+        """Returns the policies toggled at points first..last, scanning them"""
+        result = 0
+        for toggles in self.toggles[first:last + 1]:
+            for bit in toggles:
+                result |= 1 << bit
+        return result
+
+    def _blocks(self, first: int, last: int) -> int:
+        """Returns the policies with a boundary in blocks first..last"""
+        result = 0
+        first += self.size
+        last += self.size + 1
+        while first < last:
+            if first & 1:
+                result |= self.tree[first]
+                first += 1
+            if last & 1:
+                last -= 1
+                result |= self.tree[last]
+            first >>= 1
+            last >>= 1
+        return result
+
+    def _events(self, first: int, last: int) -> int:
+        """Returns the policies with a boundary in segments first..last"""
+        if first > last:
+            return 0
+        head, tail = self.block_of[first], self.block_of[last]
+        whole_head, whole_tail = first == self.starts[head], last == self._end(tail)
+        if head == tail and not (whole_head and whole_tail):
+            return self._toggled(first, last)
+        # Partial blocks hold several points, so none toggling BLOCK policies or more
+        result = 0
+        if not whole_head:
+            result |= self._toggled(first, self._end(head))
+            head += 1
+        if not whole_tail:
+            result |= self._toggled(self.starts[tail], last)
+            tail -= 1
+        return result | self._blocks(head, tail)
+
+    def _segments(self, start: int, end: int) -> Tuple[int, int]:
+        return (bisect.bisect_right(self.points, start) - 1,
+                bisect.bisect_right(self.points, end) - 1)
+
+    def overlapping(self, intervals: IntervalSet) -> int:
+        """Returns the policies sharing at least one value with the intervals"""
+        result = 0
+        for start, end in zip(intervals.starts, intervals.ends):
+            first, last = self._segments(start, end)
+            result |= self._mask(first) | self._events(first + 1, last)
+        return result
+
+    def containing(self, intervals: IntervalSet, everyone: int) -> int:
+        """Returns the policies covering all values of the intervals"""
+        result = everyone
+        for start, end in zip(intervals.starts, intervals.ends):
+            first, last = self._segments(start, end)
+            # A policy covering the first segment and no boundary before the last covers them all
+            result &= self._mask(first) & ~self._events(first + 1, last)
+        return result
+
+
+def _service_sets(policy: CompiledPolicy) -> Tuple[IntervalSet, IntervalSet]:
+    """Returns the over and under approximations of a policy's services"""
+    over, under = [], []
+    for number, first, second in policy.service.entries:
+        base = number * SERVICE_STRIDE
+        whole = (base, base + PORT_MAX)
+        if number == 0:
+            over.append((0, SERVICE_MAX))
+            under.append((0, SERVICE_MAX))
+        elif number == 1 and first is not None:
+            low = base + first * 256
+            span = (low, low + 255) if second is None else (low + second, low + second)
+            over.append(span)
+            under.append(span)
+        elif number in PORT_PROTOCOLS and first is not None:
+            ports = [(base + start, base + end) for start, end in first.intervals()]
+            over.extend(ports)
+            # Source port ranges are not a dimension: such entries are only 'could match'
+            if second is None or second.intervals() == ALL_PORTS.intervals():
+                under.extend(ports)
+        else:
+            over.append(whole)
+            under.append(whole)
+    over_set = FULL_SERVICES if policy.service.unknown else IntervalSet(over)
+    under_set = IntervalSet(under)
+    if policy.service_negate:
+        return under_set.complement(SERVICE_MAX), over_set.complement(SERVICE_MAX)
+    return over_set, under_set
+
+
+def _address_sets(policy: CompiledPolicy, attribute: str) -> Tuple[IntervalSet, IntervalSet]:
+    """Returns the over and under approximations of a policy's source or destination"""
+    matcher = getattr(policy, attribute)
+    negate = getattr(policy, f"{attribute}_negate")
+    known = matcher.intervals
+    if matcher.plain:
+        intervals = known.complement(IPV4_MAX) if negate else known
+        return intervals, intervals
+    if negate:
+        return known.complement(IPV4_MAX), EMPTY
+    return FULL_IPV4, known
+
+
+def _same(first: List[IntervalSet], second: List[IntervalSet]) -> bool:
+    return all(a is b or (a.starts == b.starts and a.ends == b.ends) for a, b in zip(first, second))
+
+
+def _interface_sets(interfaces: Optional[frozenset], codes: Dict[str, int]) -> IntervalSet:
+    if interfaces is None:
+        return IntervalSet([(0, len(codes))])
+    return IntervalSet((codes[name], codes[name]) for name in interfaces)
+
+
+class PolicyAnalyzer:
+    """Finds shadowed, redundant, correlated and unmatchable policies of a compiled policy set"""
+
+    def __init__(self, engine: PolicyEngine):
+        self.engine = engine
+        self.policies = engine.policies
+        count = len(self.policies)
+        self.everyone = (1 << count) - 1
+
+        # Interface names as points; the last point stands for interfaces no policy names
+        names = sorted({name for policy in self.policies for interfaces in (policy.srcintf, policy.dstintf)
+                        if interfaces for name in interfaces})
+        codes = {name: i for i, name in enumerate(names)}
+
+        self.over: Dict[str, List[IntervalSet]] = {dimension: [] for dimension in DIMENSIONS}
+        self.under: Dict[str, List[IntervalSet]] = {dimension: [] for dimension in DIMENSIONS}
+        for policy in self.policies:
+            sets = {
+                'srcintf': (_interface_sets(policy.srcintf, codes),) * 2,
+                'dstintf': (_interface_sets(policy.dstintf, codes),) * 2,
+                'srcaddr': _address_sets(policy, 'srcaddr'),
+                'dstaddr': _address_sets(policy, 'dstaddr'),
+                'service': _service_sets(policy),
+            }
+            for dimension, (over, under) in sets.items():
+                self.over[dimension].append(over)
+                # Schedules and users: the policy matches nothing for certain
+                self.under[dimension].append(EMPTY if policy.device_conditions else under)
+        self.maximum = {'srcintf': len(codes), 'dstintf': len(codes), 'srcaddr': IPV4_MAX,
+                        'dstaddr': IPV4_MAX, 'service': SERVICE_MAX}
+
+        self.over_index = {dimension: _RangeIndex(sets) for dimension, sets in self.over.items()}
+        # Without unresolved parts both approximations are equal and share their index
+        self.under_index = {
+            dimension: (self.over_index[dimension] if _same(sets, self.over[dimension]) else _RangeIndex(sets))
+            for dimension, sets in self.under.items()
+        }
+        self.actions: Dict[str, int] = {}
+        for bit, policy in enumerate(self.policies):
+            self.actions[policy.action] = self.actions.get(policy.action, 0) | 1 << bit
+        self._cache: "OrderedDict[Tuple, int]" = OrderedDict()
+
+    def _query(self, kind: str, dimension: str, intervals: IntervalSet) -> int:
+        if kind == 'overlapping_under' and self.under_index[dimension] is self.over_index[dimension]:
+            # Same index, same answer: share the cached result
+            kind = 'overlapping_over'
+        key = (kind, dimension, tuple(intervals.starts), tuple(intervals.ends))
+        result = self._cache.get(key)
+        if result is not None:
+            self._cache.move_to_end(key)
+            return result
+        if kind == 'containing':
+            result = self.under_index[dimension].containing(intervals, self.everyone)
+        elif kind == 'overlapping_under':
+            result = self.under_index[dimension].overlapping(intervals)
+        else:
+            result = self.over_index[dimension].overlapping(intervals)
+        # Shared objects (interfaces, 'all', common groups) repeat, most other queries do not
+        self._cache[key] = result
+        if len(self._cache) > MAX_CACHED_QUERIES:
+            self._cache.popitem(last=False)
+        return result
+
+    def _all(self, kind: str, sets: Dict[str, List[IntervalSet]], bit: int) -> int:
+        result = self.everyone
+        for dimension in DIMENSIONS:
+            result &= self._query(kind, dimension, sets[dimension][bit])
+            if not result:
+                break
+        return result
+
+    def _contained(self, bit: int) -> int:
+        """Returns the policies whose over-approximation lies inside this policy's under-approximation"""
+        result = self.everyone
+        for dimension in DIMENSIONS:
+            outside = self.under[dimension][bit].complement(self.maximum[dimension])
+            if outside:
+                result &= ~self._query('overlapping_over', dimension, outside)
+        return result
+
+    def _summary(self, policy: CompiledPolicy) -> Dict:
+        return {'policy_id': policy.policyid, 'name': policy.name, 'action': policy.action}
+
+    def analyze(self) -> Dict:
+        shadowed, redundant, correlated, unmatchable = [], [], [], []
+        for bit, policy in enumerate(self.policies):
+            if any(not self.over[dimension][bit] for dimension in DIMENSIONS):
+                unmatchable.append(self._summary(policy))
+                continue
+            earlier = (1 << bit) - 1
+            later = self.everyone & ~earlier & ~(1 << bit)
+            same = self.actions[policy.action]
+            containers = self._all('containing', self.over, bit)
+
+            before = containers & earlier
+            if before:
+                cover = self.policies[(before & -before).bit_length() - 1]
+                entry = dict(self._summary(policy), covered_by=cover.policyid)
+                (redundant if cover.action == policy.action else shadowed).append(entry)
+                continue
+
+            # Covered by a later policy with the same action, before any policy with
+            # another action that overlaps it
+            conflicts = self._all('overlapping_over', self.over, bit) & ~same & later
+            after = containers & same & later
+            if conflicts:
+                after &= (conflicts & -conflicts) - 1
+            if after:
+                cover = self.policies[(after & -after).bit_length() - 1]
+                redundant.append(dict(self._summary(policy), covered_by=cover.policyid))
+
+            overlaps = self._all('overlapping_under', self.under, bit) & earlier & ~same & ~containers
+            if overlaps:
+                # Only worth its queries, never cached, when some policy overlaps
+                overlaps &= ~self._contained(bit)
+            if overlaps:
+                listed = []
+                rest = overlaps
+                while rest and len(listed) < MAX_LISTED_CORRELATIONS:
+                    lowest = rest & -rest
+                    listed.append(self.policies[lowest.bit_length() - 1].policyid)
+                    rest ^= lowest
+                correlated.append(dict(self._summary(policy), count=overlaps.bit_count(), correlated_with=listed))
+
+        return {
+            'policies': len(self.policies),
+            'shadowed': shadowed,
+            'redundant': redundant,
+            'correlated': correlated,
+            'unmatchable': unmatchable,
+            'partially_resolved': [policy.policyid for policy in self.policies if policy.conditions],
+            'revision': self.engine.revision,
+        }
+
+
+def analyze_policies(engine: PolicyEngine) -> Dict:
+    """Returns the shadowed, redundant, correlated and unmatchable policies of a compiled policy set"""
+    started = time.perf_counter()
+    result = PolicyAnalyzer(engine).analyze()
+    result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return result
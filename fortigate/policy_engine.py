@@ -0,0 +1,731 @@
+"""
+Offline firewall policy lookup
+
+A PolicyEngine is compiled from the CMDB tables of one VDOM (policies,
+addresses and address groups, VIPs, services and service groups, zones)
+plus its routing table. Every policy dimension is turned into sets of
+integer intervals: IPv4 ranges for addresses, port ranges per protocol for
+services. The intervals of all policies are then swept into segment
+indexes whose entries are bitmasks of the policies covering each segment,
+so the policies a flow can match are found with a few binary searches and
+a bitwise AND, and the first match in policy order is the lowest set bit.
+
+Objects the engine cannot evaluate locally (FQDN and geography addresses,
+user or schedule conditions, proxy services...) keep the policies using
+them as candidates; when such a policy comes before the match, the result
+is flagged as not exact and lists it, instead of guessing.
+"""
+
+import bisect
+import ipaddress
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+IPV4_MAX = 2 ** 32 - 1
+PORT_MAX = 65535
+# Protocol names accepted in flows, and the protocols whose ports are indexed
+PROTOCOL_NUMBERS = {'icmp': 1, 'tcp': 6, 'udp': 17, 'sctp': 132}
+PORT_PROTOCOLS = (6, 17, 132)
+# Default ICMP type and code of a looked up flow (echo request)
+DEFAULT_ICMP_TYPE = 8
+DEFAULT_ICMP_CODE = 0
+# Undecidable policies listed in a lookup result
+MAX_REPORTED_UNCERTAIN = 10
+
+Interval = Tuple[int, int]
+
+
+def ipv4(value: str) -> int:
+    """Converts a dotted IPv4 address to an integer"""
+    try:
+        return int(ipaddress.IPv4Address(value.strip()))
+    except ipaddress.AddressValueError:
+        raise ValueError(f"{value} is not an IPv4 address, only IPv4 flows can be looked up offline")
+
+
+def protocol_number(protocol) -> int:
+    """Converts a protocol name (tcp, udp, sctp, icmp) or number to its number"""
+    if isinstance(protocol, int):
+        return protocol
+    name = str(protocol).strip().lower()
+    if name.isdigit():
+        return int(name)
+    if name not in PROTOCOL_NUMBERS:
+        raise ValueError(f"Unknown protocol {protocol}")
+    return PROTOCOL_NUMBERS[name]
+
+
+def _names(entries: Any) -> List[str]:
+    """Returns the names of a CMDB reference list such as [{'name': 'all'}]"""
+    if not entries:
+        return []
+    if isinstance(entries, str):
+        return entries.split()
+    return [entry.get('name', entry.get('interface-name')) if isinstance(entry, dict) else str(entry)
+            for entry in entries]
+
+
+def _enabled(record: Dict, field: str) -> bool:
+    return record.get(field) == 'enable'
+
+
+class IntervalSet:
+    """Sorted, disjoint and non-adjacent closed integer intervals"""
+
+    __slots__ = ('starts', 'ends')
+
+    def __init__(self, intervals: Iterable[Interval] = ()):
+        merged: List[List[int]] = []
+        for start, end in sorted(intervals):
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        self.starts = [start for start, _ in merged]
+        self.ends = [end for _, end in merged]
+
+    def __contains__(self, value: int) -> bool:
+        i = bisect.bisect_right(self.starts, value) - 1
+        return i >= 0 and value <= self.ends[i]
+
+    def __bool__(self) -> bool:
+        return bool(self.starts)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def intervals(self) -> List[Interval]:
+        return list(zip(self.starts, self.ends))
+
+    def union(self, other: "IntervalSet") -> "IntervalSet":
+        return IntervalSet(self.intervals() + other.intervals())
+
+    def complement(self, maximum: int) -> "IntervalSet":
+        gaps, position = [], 0
+        for start, end in self.intervals():
+            if start > position:
+                gaps.append((position, start - 1))
+            position = end + 1
+        if position <= maximum:
+            gaps.append((position, maximum))
+        return IntervalSet(gaps)
+
+    def difference(self, other: "IntervalSet", maximum: int) -> "IntervalSet":
+        keep = other.complement(maximum)
+        result, j = [], 0
+        for start, end in self.intervals():
+            while j < len(keep.starts) and keep.ends[j] < start:
+                j += 1
+            k = j
+            while k < len(keep.starts) and keep.starts[k] <= end:
+                result.append((max(start, keep.starts[k]), min(end, keep.ends[k])))
+                k += 1
+        return IntervalSet(result)
+
+
+FULL_IPV4 = IntervalSet([(0, IPV4_MAX)])
+ALL_PORTS = IntervalSet([(0, PORT_MAX)])
+
+
+class SegmentIndex:
+    """Maps each point of an integer space to the bitmask of the policies covering it
+
+    Built by sweeping the interval boundaries of all policies once; a lookup
+    is one binary search.
+    """
+
+    def __init__(self, policy_sets: Iterable[Tuple[int, IntervalSet]], everywhere: int = 0):
+        events: Dict[int, int] = {0: 0}
+        for bit, intervals in policy_sets:
+            mask = 1 << bit
+            # Intervals of one policy never touch, so toggling the bit is enough
+            for start, end in intervals.intervals():
+                events[start] = events.get(start, 0) ^ mask
+                events[end + 1] = events.get(end + 1, 0) ^ mask
+        self.points = sorted(events)
+        self.masks = []
+        current = 0
+        for point in self.points:
+            current ^= events[point]
+            self.masks.append(current | everywhere)
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def lookup(self, value: int) -> int:
+        return self.masks[bisect.bisect_right(self.points, value) - 1]
+
+
+class AddressSet:
+    """Resolved address object: IPv4 intervals, wildcard masks and unresolvable parts"""
+
+    def __init__(self, intervals: IntervalSet = None, wildcards: List[Tuple[int, int]] = None,
+                 unknown: List[str] = None):
+        self.intervals = intervals or IntervalSet()
+        self.wildcards = wildcards or []
+        self.unknown = unknown or []
+
+    @property
+    def plain(self) -> bool:
+        """True when the set is made of intervals only"""
+        return not self.wildcards and not self.unknown
+
+    def check(self, ip: int) -> Optional[bool]:
+        """Returns True or False, or None when the answer depends on unresolvable objects"""
+        if ip in self.intervals or any(ip & mask == address for address, mask in self.wildcards):
+            return True
+        return None if self.unknown else False
+
+    def cidrs(self) -> List[str]:
+        """Returns the intervals as collapsed CIDR blocks"""
+        return [str(network) for start, end in self.intervals.intervals()
+                for network in ipaddress.summarize_address_range(ipaddress.IPv4Address(start),
+                                                                 ipaddress.IPv4Address(end))]
+
+    @classmethod
+    def union(cls, sets: Iterable["AddressSet"]) -> "AddressSet":
+        intervals, wildcards, unknown = [], [], []
+        for item in sets:
+            intervals.extend(item.intervals.intervals())
+            wildcards.extend(item.wildcards)
+            unknown.extend(item.unknown)
+        return cls(IntervalSet(intervals), wildcards, unknown)
+
+
+def _subnet(value: Any) -> Tuple[int, int]:
+    """Parses a CMDB subnet ('10.0.0.0 255.255.255.0' or '10.0.0.0/24') to (address, mask)"""
+    if isinstance(value, list):
+        value = ' '.join(value)
+    network = ipaddress.IPv4Network(str(value).strip().replace(' ', '/'), strict=False)
+    return int(network.network_address), int(network.netmask)
+
+
+def _ip_range(value: str) -> Interval:
+    """Parses '1.2.3.4' or '1.2.3.4-1.2.3.9'"""
+    start, _, end = str(value).partition('-')
+    return ipv4(start), ipv4(end or start)
+
+
+# CMDB tables an AddressBook is built from
+ADDRESS_TABLES = ('address', 'addrgrp', 'vip')
+
+
+class AddressBook:
+    """Resolves address, address group and VIP names to AddressSets
+
+    Names form a DAG, groups pointing to their members. The flattened set of
+    each node is memoized; update(), remove() and sync() drop the memoized
+    sets of the changed nodes and of the groups above them only.
+    """
+
+    def __init__(self, addresses: Iterable[Dict] = (), groups: Iterable[Dict] = (), vips: Iterable[Dict] = ()):
+        self.addresses: Dict[str, Dict] = {}
+        self.groups: Dict[str, Dict] = {}
+        self.vips: Dict[str, Dict] = {}
+        self.tables = {'address': self.addresses, 'addrgrp': self.groups, 'vip': self.vips}
+        # Groups referencing each name, as member or excluded member
+        self._parents: Dict[str, set] = {}
+        self._resolved: Dict[str, AddressSet] = {}
+        for table, records in (('address', addresses), ('addrgrp', groups), ('vip', vips)):
+            for record in records:
+                self._store(table, record)
+
+    @staticmethod
+    def _members(group: Dict) -> List[str]:
+        return _names(group.get('member')) + _names(group.get('exclude-member'))
+
+    def _store(self, table: str, record: Dict):
+        name = record['name']
+        self._unlink(table, name)
+        self.tables[table][name] = record
+        if table == 'addrgrp':
+            for member in self._members(record):
+                self._parents.setdefault(member, set()).add(name)
+
+    def _unlink(self, table: str, name: str):
+        old = self.tables[table].pop(name, None)
+        if old is not None and table == 'addrgrp':
+            for member in self._members(old):
+                parents = self._parents.get(member)
+                if parents:
+                    parents.discard(name)
+
+    def invalidate(self, name: str) -> set:
+        """Drops the memoized sets of a name and of every group above it, returns those names"""
+        dropped, pending = set(), [name]
+        while pending:
+            current = pending.pop()
+            if current in dropped:
+                continue
+            dropped.add(current)
+            self._resolved.pop(current, None)
+            pending.extend(self._parents.get(current, ()))
+        return dropped
+
+    def update(self, table: str, record: Dict) -> set:
+        """Adds or replaces an address, addrgrp or vip record"""
+        self._store(table, record)
+        return self.invalidate(record['name'])
+
+    def remove(self, table: str, name: str) -> set:
+        """Removes an address, addrgrp or vip record"""
+        self._unlink(table, name)
+        return self.invalidate(name)
+
+    def sync(self, addresses: List[Dict], groups: List[Dict], vips: List[Dict]) -> set:
+        """Brings the book to fresh table contents, re-resolving only what changed"""
+        dropped = set()
+        for table, records in (('address', addresses), ('addrgrp', groups), ('vip', vips)):
+            current = self.tables[table]
+            fresh = {record['name']: record for record in records}
+            for name in [name for name in current if name not in fresh]:
+                dropped |= self.remove(table, name)
+            for name, record in fresh.items():
+                if current.get(name) != record:
+                    dropped |= self.update(table, record)
+        return dropped
+
+    @property
+    def memoized(self) -> int:
+        return len(self._resolved)
+
+    def resolve(self, name: str, _seen: Tuple = ()) -> AddressSet:
+        resolved = self._resolved.get(name)
+        if resolved is None:
+            if name in _seen:
+                return AddressSet(unknown=[name])
+            resolved = self._resolve(name, _seen + (name,))
+            self._resolved[name] = resolved
+        return resolved
+
+    def resolve_all(self, names: List[str]) -> AddressSet:
+        return AddressSet.union(self.resolve(name) for name in names)
+
+    def _resolve(self, name: str, seen: Tuple) -> AddressSet:
+        if name in self.groups:
+            group = self.groups[name]
+            members = AddressSet.union(self.resolve(member, seen) for member in _names(group.get('member')))
+            if _enabled(group, 'exclude'):
+                excluded = AddressSet.union(self.resolve(member, seen)
+                                            for member in _names(group.get('exclude-member')))
+                if not members.plain or not excluded.plain:
+                    return AddressSet(unknown=[name])
+                return AddressSet(members.intervals.difference(excluded.intervals, IPV4_MAX))
+            return members
+        if name in self.vips:
+            return self._vip(self.vips[name])
+        if name in self.addresses:
+            return self._address(self.addresses[name])
+        if name == 'all':
+            return AddressSet(FULL_IPV4)
+        return AddressSet(unknown=[name])
+
+    def _address(self, address: Dict) -> AddressSet:
+        kind = address.get('type') or 'ipmask'
+        try:
+            if kind in ('ipmask', 'interface-subnet'):
+                network, mask = _subnet(address.get('subnet', '0.0.0.0 0.0.0.0'))
+                return AddressSet(IntervalSet([(network, network | (~mask & IPV4_MAX))]))
+            if kind == 'iprange':
+                return AddressSet(IntervalSet([(ipv4(address['start-ip']), ipv4(address['end-ip']))]))
+            if kind == 'wildcard':
+                # Wildcard masks need not be contiguous: compare the masked bits
+                network, mask = (ipv4(part) for part in str(address['wildcard']).split())
+                return AddressSet(wildcards=[(network & mask, mask)])
+        except (KeyError, ValueError):
+            pass
+        # fqdn, geography, dynamic, mac...: only the device can tell
+        return AddressSet(unknown=[address['name']])
+
+    def _vip(self, vip: Dict) -> AddressSet:
+        if _enabled(vip, 'portforward') or not vip.get('extip'):
+            return AddressSet(unknown=[vip['name']])
+        try:
+            return AddressSet(IntervalSet([_ip_range(vip['extip'])]))
+        except ValueError:
+            return AddressSet(unknown=[vip['name']])
+
+    def vip_translations(self) -> List[Tuple[int, int, int]]:
+        """Returns (external start, external end, mapped start) of the static NAT VIPs"""
+        translations = []
+        for vip in self.vips.values():
+            mapped = vip.get('mappedip')
+            if _enabled(vip, 'portforward') or not vip.get('extip') or not mapped:
+                continue
+            try:
+                start, end = _ip_range(vip['extip'])
+                mapped_start, _ = _ip_range(mapped[0]['range'] if isinstance(mapped, list) else mapped)
+            except (KeyError, IndexError, ValueError):
+                continue
+            translations.append((start, end, mapped_start))
+        return translations
+
+
+# A service entry: (protocol, destination ports, source ports) for port protocols,
+# (1, icmp type, icmp code) for ICMP (None: any) and (number, None, None) otherwise;
+# protocol 0 stands for every protocol
+ServiceEntry = Tuple[int, Any, Any]
+
+
+def _port_ranges(value: str, protocol: int) -> List[ServiceEntry]:
+    """Parses a CMDB port range list such as '80 443 8000-8080:1024-65535'"""
+    entries = []
+    for token in str(value or '').split():
+        destination, _, source = token.partition(':')
+        low, _, high = destination.partition('-')
+        source_low, _, source_high = source.partition('-')
+        entries.append((
+            protocol,
+            IntervalSet([(int(low), int(high or low))]),
+            IntervalSet([(int(source_low), int(source_high or source_low))]) if source else ALL_PORTS,
+        ))
+    return entries
+
+
+class ServiceSet:
+    """Resolved service object: protocol/port entries and unresolvable parts"""
+
+    def __init__(self, entries: List[ServiceEntry] = None, unknown: List[str] = None):
+        self.entries = entries or []
+        self.unknown = unknown or []
+
+    @property
+    def plain(self) -> bool:
+        return not self.unknown
+
+    def check(self, protocol: int, source_port: int, dest_port: int, icmp_type: int,
+              icmp_code: int) -> Optional[bool]:
+        for number, first, second in self.entries:
+            if number == 0:
+                return True
+            if number != protocol:
+                continue
+            if first is None and second is None:
+                return True
+            if protocol == 1:
+                if (first is None or first == icmp_type) and (second is None or second == icmp_code):
+                    return True
+            # Port 0 means the flow does not specify that port
+            elif (not dest_port or dest_port in first) and (not source_port or source_port in second):
+                return True
+        return None if self.unknown else False
+
+    @classmethod
+    def union(cls, sets: Iterable["ServiceSet"]) -> "ServiceSet":
+        entries, unknown = [], []
+        for item in sets:
+            entries.extend(item.entries)
+            unknown.extend(item.unknown)
+        return cls(entries, unknown)
+
+
+def _optional_int(value: Any) -> Optional[int]:
+    return int(value) if value not in (None, '') else None
+
+
+class ServiceBook:
+    """Resolves custom service and service group names to ServiceSets"""
+
+    def __init__(self, services: List[Dict], groups: List[Dict]):
+        self.services = {item['name']: item for item in services}
+        self.groups = {item['name']: item for item in groups}
+        self._resolved: Dict[str, ServiceSet] = {}
+
+    def resolve(self, name: str, _seen: Tuple = ()) -> ServiceSet:
+        resolved = self._resolved.get(name)
+        if resolved is None:
+            if name in _seen:
+                return ServiceSet(unknown=[name])
+            resolved = self._resolve(name, _seen + (name,))
+            self._resolved[name] = resolved
+        return resolved
+
+    def resolve_all(self, names: List[str]) -> ServiceSet:
+        return ServiceSet.union(self.resolve(name) for name in names)
+
+    def _resolve(self, name: str, seen: Tuple) -> ServiceSet:
+        if name in self.groups:
+            return ServiceSet.union(self.resolve(member, seen) for member in _names(self.groups[name].get('member')))
+        if name in self.services:
+            return self._service(self.services[name])
+        if name == 'ALL':
+            return ServiceSet([(0, None, None)])
+        return ServiceSet(unknown=[name])
+
+    def _service(self, service: Dict) -> ServiceSet:
+        protocol = service.get('protocol') or 'TCP/UDP/SCTP'
+        try:
+            if protocol == 'TCP/UDP/SCTP':
+                return ServiceSet(_port_ranges(service.get('tcp-portrange'), 6)
+                                  + _port_ranges(service.get('udp-portrange'), 17)
+                                  + _port_ranges(service.get('sctp-portrange'), 132))
+            if protocol == 'ICMP':
+                return ServiceSet([(1, _optional_int(service.get('icmptype')),
+                                    _optional_int(service.get('icmpcode')))])
+            if protocol in ('IP', 'ALL'):
+                return ServiceSet([(int(service.get('protocol-number') or 0), None, None)])
+        except ValueError:
+            pass
+        # ICMP6 and explicit proxy services (HTTP, FTP, CONNECT, SOCKS...)
+        return ServiceSet(unknown=[service['name']])
+
+
+class RouteTable:
+    """Longest-prefix match over the IPv4 routing table"""
+
+    def __init__(self, routes: List[Dict]):
+        best: Dict[Tuple[int, int], Tuple] = {}
+        for route in routes:
+            try:
+                network = ipaddress.IPv4Network(route['ip_mask'], strict=False)
+            except (KeyError, ValueError):
+                continue
+            key = (network.prefixlen, int(network.network_address))
+            rank = (route.get('distance', 0), route.get('metric', 0))
+            if key not in best or rank < best[key][0]:
+                best[key] = (rank, route.get('interface'))
+        self.prefixes: Dict[int, Dict[int, str]] = {}
+        for (length, network), (_, interface) in best.items():
+            self.prefixes.setdefault(length, {})[network] = interface
+        self.lengths = sorted(self.prefixes, reverse=True)
+        self.size = len(best)
+
+    def lookup(self, ip: int) -> Optional[str]:
+        """Returns the egress interface for a destination, None without a route"""
+        for length in self.lengths:
+            mask = (IPV4_MAX << (32 - length)) & IPV4_MAX
+            interface = self.prefixes[length].get(ip & mask)
+            if interface is not None:
+                return interface
+        return None
+
+
+class CompiledPolicy:
+    """One enabled policy with its resolved matchers"""
+
+    def __init__(self, policy: Dict, addresses: AddressBook, services: ServiceBook,
+                 zones: Dict[str, List[str]]):
+        self.policyid = policy.get('policyid')
+        self.name = policy.get('name', '')
+        self.action = policy.get('action', 'deny')
+        self.srcintf = self._interfaces(_names(policy.get('srcintf')), zones)
+        self.dstintf = self._interfaces(_names(policy.get('dstintf')), zones)
+        # Internet service (ISDB) policies match addresses only the device knows
+        self.srcaddr = (AddressSet(unknown=['internet-service-src']) if _enabled(policy, 'internet-service-src')
+                        else addresses.resolve_all(_names(policy.get('srcaddr'))))
+        self.dstaddr = (AddressSet(unknown=['internet-service']) if _enabled(policy, 'internet-service')
+                        else addresses.resolve_all(_names(policy.get('dstaddr'))))
+        self.service = services.resolve_all(_names(policy.get('service')))
+        self.srcaddr_negate = _enabled(policy, 'srcaddr-negate')
+        self.dstaddr_negate = _enabled(policy, 'dstaddr-negate')
+        self.service_negate = _enabled(policy, 'service-negate')
+        # Conditions other than addresses and services that only the device can evaluate
+        self.device_conditions = []
+        if policy.get('schedule', 'always') != 'always':
+            self.device_conditions.append(f"schedule {policy['schedule']}")
+        if policy.get('users') or policy.get('groups'):
+            self.device_conditions.append('user or group')
+
+    @property
+    def conditions(self) -> List[str]:
+        """Returns what keeps this policy from being evaluated offline"""
+        return self.device_conditions + self.srcaddr.unknown + self.dstaddr.unknown + self.service.unknown
+
+    @staticmethod
+    def _interfaces(names: List[str], zones: Dict[str, List[str]]) -> Optional[frozenset]:
+        """Returns the interface names matched, None for 'any'"""
+        if not names or 'any' in names:
+            return None
+        interfaces = set(names)
+        for name in names:
+            interfaces.update(zones.get(name, ()))
+        return frozenset(interfaces)
+
+    def address_intervals(self, matcher: AddressSet, negate: bool) -> Optional[IntervalSet]:
+        """Returns the indexable intervals of an address matcher, None if it must be checked everywhere"""
+        if not matcher.plain:
+            return None
+        return matcher.intervals.complement(IPV4_MAX) if negate else matcher.intervals
+
+    def check(self, srcintf: str, dstintf: Optional[str], source_ip: int, dest_ip: int, protocol: int,
+              source_port: int, dest_port: int, icmp_type: int, icmp_code: int) -> Optional[bool]:
+        """Returns True or False, or None when the answer depends on conditions only the device knows"""
+        if self.srcintf is not None and srcintf not in self.srcintf:
+            return False
+        if self.dstintf is not None and dstintf not in self.dstintf:
+            return False
+        results = [
+            _negate(self.srcaddr.check(source_ip), self.srcaddr_negate),
+            _negate(self.dstaddr.check(dest_ip), self.dstaddr_negate),
+            _negate(self.service.check(protocol, source_port, dest_port, icmp_type, icmp_code),
+                    self.service_negate),
+        ]
+        if False in results:
+            return False
+        if None in results or self.device_conditions:
+            return None
+        return True
+
+
+def _negate(result: Optional[bool], negate: bool) -> Optional[bool]:
+    if result is None or not negate:
+        return result
+    return not result
+
+
+class PolicyEngine:
+    """First-match firewall policy lookup over the compiled tables of one VDOM"""
+
+    def __init__(self, policies: List[Dict], addresses: List[Dict] = None, address_groups: List[Dict] = None,
+                 vips: List[Dict] = None, services: List[Dict] = None, service_groups: List[Dict] = None,
+                 zones: List[Dict] = None, routes: List[Dict] = None, revision: str = None,
+                 address_book: AddressBook = None):
+        started = time.perf_counter()
+        self.revision = revision
+        self.compiled_at = time.time()
+        # A shared address book replaces the address, group and VIP tables
+        if address_book is None:
+            address_book = AddressBook(addresses or [], address_groups or [], vips or [])
+        service_book = ServiceBook(services or [], service_groups or [])
+        zone_members = {zone['name']: _names(zone.get('interface')) for zone in zones or []}
+        self.policies = [CompiledPolicy(policy, address_book, service_book, zone_members)
+                         for policy in policies if policy.get('status', 'enable') != 'disable']
+        self.routes = RouteTable(routes or [])
+        self.vips = sorted(address_book.vip_translations())
+        self._build_indexes()
+        self.compile_time = time.perf_counter() - started
+
+    def _build_indexes(self):
+        src_unindexed = dst_unindexed = 0
+        src_sets, dst_sets = [], []
+        for bit, policy in enumerate(self.policies):
+            src = policy.address_intervals(policy.srcaddr, policy.srcaddr_negate)
+            dst = policy.address_intervals(policy.dstaddr, policy.dstaddr_negate)
+            if src is None:
+                src_unindexed |= 1 << bit
+            else:
+                src_sets.append((bit, src))
+            if dst is None:
+                dst_unindexed |= 1 << bit
+            else:
+                dst_sets.append((bit, dst))
+        self.source_index = SegmentIndex(src_sets, src_unindexed)
+        self.destination_index = SegmentIndex(dst_sets, dst_unindexed)
+
+        # Interfaces: policies naming an interface (or its zone), plus those on 'any'
+        self.any_srcintf = self.any_dstintf = 0
+        self.srcintf_masks: Dict[str, int] = {}
+        self.dstintf_masks: Dict[str, int] = {}
+        for bit, policy in enumerate(self.policies):
+            for interfaces, masks, attribute in ((policy.srcintf, self.srcintf_masks, 'any_srcintf'),
+                                                 (policy.dstintf, self.dstintf_masks, 'any_dstintf')):
+                if interfaces is None:
+                    setattr(self, attribute, getattr(self, attribute) | 1 << bit)
+                    continue
+                for name in interfaces:
+                    masks[name] = masks.get(name, 0) | 1 << bit
+
+        # Services: destination ports per port protocol, protocol numbers otherwise
+        port_sets: Dict[int, List[Tuple[int, IntervalSet]]] = {number: [] for number in PORT_PROTOCOLS}
+        self.any_protocol = 0
+        self.protocol_masks: Dict[int, int] = {}
+        for bit, policy in enumerate(self.policies):
+            if policy.service_negate or not policy.service.plain:
+                self.any_protocol |= 1 << bit
+                continue
+            ports: Dict[int, IntervalSet] = {}
+            for number, first, _ in policy.service.entries:
+                if number == 0:
+                    self.any_protocol |= 1 << bit
+                elif number in PORT_PROTOCOLS and first is not None:
+                    ports[number] = ports.get(number, IntervalSet()).union(first)
+                else:
+                    self.protocol_masks[number] = self.protocol_masks.get(number, 0) | 1 << bit
+            for number, intervals in ports.items():
+                port_sets[number].append((bit, intervals))
+        self.port_indexes = {number: SegmentIndex(sets, self.any_protocol) for number, sets in port_sets.items()}
+        # Flows without a destination port match any port of the protocol
+        self.port_any = {number: self.any_protocol | sum(1 << bit for bit, _ in sets)
+                         for number, sets in port_sets.items()}
+
+    def stats(self) -> Dict:
+        return {
+            'policies': len(self.policies),
+            'source_segments': len(self.source_index),
+            'destination_segments': len(self.destination_index),
+            'port_segments': {str(number): len(index) for number, index in self.port_indexes.items()},
+            'routes': self.routes.size,
+            'vips': len(self.vips),
+            'unresolved_policies': sum(1 for policy in self.policies if policy.conditions),
+            'revision': self.revision,
+            'compiled_at': time.strftime('%Y-%m-%dT%H:%M:%S%z', time.localtime(self.compiled_at)),
+            'compile_ms': round(self.compile_time * 1000, 2),
+        }
+
+    def _route_destination(self, dest_ip: int) -> int:
+        """Returns the address routed for a destination, translated if it is a VIP"""
+        i = bisect.bisect_right(self.vips, (dest_ip, IPV4_MAX, IPV4_MAX)) - 1
+        if i >= 0:
+            start, end, mapped = self.vips[i]
+            if start <= dest_ip <= end:
+                return mapped + (dest_ip - start)
+        return dest_ip
+
+    def _service_mask(self, protocol: int, dest_port: int) -> int:
+        # protocol_masks holds whole-protocol entries (IP services, ICMP)
+        mask = self.any_protocol | self.protocol_masks.get(protocol, 0)
+        if protocol in self.port_indexes:
+            mask |= self.port_indexes[protocol].lookup(dest_port) if dest_port else self.port_any[protocol]
+        return mask
+
+    def lookup(self, srcintf: str, source_ip: str, protocol, dest: str, source_port: int = 0,
+               dest_port: int = 0, icmp_type: int = DEFAULT_ICMP_TYPE, icmp_code: int = DEFAULT_ICMP_CODE,
+               dstintf: str = None) -> Dict:
+        """Returns the first policy matching a flow, like monitor/firewall/policy-lookup
+
+        The egress interface comes from the routing table unless dstintf is
+        given. policy_id 0 is the implicit deny.
+        """
+        source = ipv4(source_ip)
+        destination = ipv4(dest)
+        number = protocol_number(protocol)
+        source_port, dest_port = int(source_port or 0), int(dest_port or 0)
+        if dstintf is None:
+            dstintf = self.routes.lookup(self._route_destination(destination))
+        candidates = (self.source_index.lookup(source)
+                      & self.destination_index.lookup(destination)
+                      & self._service_mask(number, dest_port)
+                      & (self.srcintf_masks.get(srcintf, 0) | self.any_srcintf)
+                      & (self.dstintf_masks.get(dstintf, 0) | self.any_dstintf))
+        uncertain = []
+        while candidates:
+            lowest = candidates & -candidates
+            policy = self.policies[lowest.bit_length() - 1]
+            candidates ^= lowest
+            matched = policy.check(srcintf, dstintf, source, destination, number,
+                                   source_port, dest_port, icmp_type, icmp_code)
+            if matched:
+                return self._result(policy, dstintf, uncertain)
+            if matched is None:
+                uncertain.append(policy)
+        return self._result(None, dstintf, uncertain)
+
+    def _result(self, policy: Optional[CompiledPolicy], dstintf: Optional[str],
+                uncertain: List[CompiledPolicy]) -> Dict:
+        result = {
+            'policy_id': policy.policyid if policy else 0,
+            'policy_name': policy.name if policy else 'Implicit Deny',
+            'action': policy.action if policy else 'deny',
+            'dstintf': dstintf,
+            'exact': not uncertain,
+        }
+        if uncertain:
+            # Policies before the match that may match too, depending on what only the device knows
+            result['uncertain_count'] = len(uncertain)
+            result['uncertain_policies'] = [
+                {'policy_id': item.policyid, 'conditions': item.conditions}
+                for item in uncertain[:MAX_REPORTED_UNCERTAIN]
+            ]
+        if dstintf is None:
+            result['note'] = 'No route to the destination'
+        return result
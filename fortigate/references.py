@@ -0,0 +1,237 @@
+"""
+Inverted index of configuration object references
+
+Maps each object, as (kind, name), to the records that name it: firewall,
+IPv6, local-in, proxy, DoS and shaping policies, the central SNAT map,
+address, service and VIP groups, VIPs, profile groups, zones, static and
+policy routes, SD-WAN rules, IPsec phase 2 selectors and user groups.
+Kinds are namespaces: 'address' covers addresses, address groups, VIPs and
+VIP groups (they share the policy srcaddr/dstaddr namespace), 'address6'
+the IPv6 objects, each security profile type is its own kind. Tables are
+indexed independently, so a table whose contents did not change is not
+indexed again.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# Security profile fields shared by policies and profile groups
+PROFILE_FIELDS = {
+    'av-profile': 'av-profile', 'webfilter-profile': 'webfilter-profile',
+    'ips-sensor': 'ips-sensor', 'dnsfilter-profile': 'dnsfilter-profile',
+    'application-list': 'application-list', 'ssl-ssh-profile': 'ssl-ssh-profile',
+}
+# Fields of each CMDB table that name other objects, with the kind of object named
+REFERENCE_FIELDS: Dict[str, Dict[str, str]] = {
+    'firewall/policy': {
+        'srcaddr': 'address', 'dstaddr': 'address', 'srcaddr6': 'address6', 'dstaddr6': 'address6',
+        'service': 'service', 'srcintf': 'interface', 'dstintf': 'interface', 'schedule': 'schedule',
+        'users': 'user', 'groups': 'user-group', 'poolname': 'ippool', 'profile-group': 'profile-group',
+        **PROFILE_FIELDS,
+    },
+    'firewall/policy6': {
+        'srcaddr': 'address6', 'dstaddr': 'address6', 'service': 'service',
+        'srcintf': 'interface', 'dstintf': 'interface', 'schedule': 'schedule',
+        'users': 'user', 'groups': 'user-group', 'profile-group': 'profile-group',
+        **PROFILE_FIELDS,
+    },
+    'firewall/local-in-policy': {
+        'intf': 'interface', 'srcaddr': 'address', 'dstaddr': 'address',
+        'service': 'service', 'schedule': 'schedule',
+    },
+    'firewall/central-snat-map': {
+        'srcintf': 'interface', 'dstintf': 'interface', 'orig-addr': 'address',
+        'dst-addr': 'address', 'nat-ippool': 'ippool',
+    },
+    'firewall/proxy-policy': {
+        'srcintf': 'interface', 'dstintf': 'interface', 'srcaddr': 'address', 'dstaddr': 'address',
+        'service': 'service', 'schedule': 'schedule', 'users': 'user', 'groups': 'user-group',
+        'profile-group': 'profile-group', **PROFILE_FIELDS,
+    },
+    'firewall/DoS-policy': {'interface': 'interface', 'srcaddr': 'address', 'dstaddr': 'address',
+                            'service': 'service'},
+    'firewall/shaping-policy': {
+        'srcintf': 'interface', 'dstintf': 'interface', 'srcaddr': 'address', 'dstaddr': 'address',
+        'service': 'service', 'schedule': 'schedule', 'users': 'user', 'groups': 'user-group',
+    },
+    'firewall/addrgrp': {'member': 'address', 'exclude-member': 'address'},
+    'firewall.service/group': {'member': 'service'},
+    'firewall/vip': {'extintf': 'interface'},
+    'firewall/vipgrp': {'member': 'address', 'interface': 'interface'},
+    'firewall/profile-group': dict(PROFILE_FIELDS),
+    'system/zone': {'interface': 'interface'},
+    'system/sdwan/service': {
+        'src': 'address', 'dst': 'address', 'src6': 'address6', 'dst6': 'address6',
+        'input-device': 'interface', 'users': 'user', 'groups': 'user-group',
+    },
+    'vpn.ipsec/phase2-interface': {'src-name': 'address', 'dst-name': 'address',
+                                   'src-name6': 'address6', 'dst-name6': 'address6'},
+    'router/static': {'dstaddr': 'address', 'device': 'interface'},
+    'router/policy': {
+        'srcaddr': 'address', 'dstaddr': 'address',
+        'input-device': 'interface', 'output-device': 'interface',
+    },
+    'user/group': {'member': 'user'},
+}
+# Every kind of referenced object
+KINDS = sorted({kind for fields in REFERENCE_FIELDS.values() for kind in fields.values()})
+# Field identifying the records of a table, 'name' when not listed
+TABLE_KEYS = {
+    'firewall/policy': 'policyid', 'firewall/policy6': 'policyid', 'firewall/local-in-policy': 'policyid',
+    'firewall/central-snat-map': 'policyid', 'firewall/proxy-policy': 'policyid',
+    'firewall/DoS-policy': 'policyid', 'firewall/shaping-policy': 'id', 'system/sdwan/service': 'id',
+    'router/static': 'seq-num', 'router/policy': 'seq-num',
+}
+
+# Tables whose records are objects themselves, with the kind they are referenced as
+GROUP_TABLES = {'firewall/addrgrp': 'address', 'firewall.service/group': 'service',
+                'firewall/vipgrp': 'address', 'firewall/profile-group': 'profile-group'}
+
+ObjectKey = Tuple[str, str]
+
+
+def _referenced_names(value: Any) -> List[str]:
+    """Returns the names in a reference field: 'name' or [{'name': ...}, ...]"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [value]
+    names = []
+    for entry in value:
+        name = entry.get('name', entry.get('interface-name')) if isinstance(entry, dict) else entry
+        if name:
+            names.append(str(name))
+    return names
+
+
+class ReferenceIndex:
+    """Object (kind, name) -> records referencing it"""
+
+    def __init__(self):
+        self._index: Dict[ObjectKey, List[Dict]] = {}
+        # Per table: the records last indexed and the objects they reference
+        self._records: Dict[str, List[Dict]] = {}
+        self._keys: Dict[str, Set[ObjectKey]] = {}
+
+    def update_table(self, table: str, records: List[Dict]) -> bool:
+        """Indexes the records of a table, replacing its previous references
+
+        Returns False when the records did not change.
+        """
+        if self._records.get(table) == records:
+            return False
+        self.drop_table(table)
+
+        fields = REFERENCE_FIELDS[table]
+        id_field = TABLE_KEYS.get(table, 'name')
+        keys = set()
+        for record in records:
+            for field, kind in fields.items():
+                for name in _referenced_names(record.get(field)):
+                    reference = {'table': table, 'id': record.get(id_field), 'field': field}
+                    if id_field != 'name' and record.get('name'):
+                        reference['name'] = record['name']
+                    self._index.setdefault((kind, name), []).append(reference)
+                    keys.add((kind, name))
+        self._records[table] = records
+        self._keys[table] = keys
+        return True
+
+    def drop_table(self, table: str):
+        """Removes a table and its references, it is no longer listed in tables"""
+        self._records.pop(table, None)
+        for key in self._keys.pop(table, ()):
+            remaining = [reference for reference in self._index[key] if reference['table'] != table]
+            if remaining:
+                self._index[key] = remaining
+            else:
+                del self._index[key]
+
+    def where_used(self, name: str, kind: Optional[str] = None) -> List[Dict]:
+        """Returns the records referencing an object, of any kind unless one is given"""
+        if kind is not None:
+            return [dict(reference, kind=kind) for reference in self._index.get((kind, name), ())]
+        return [dict(reference, kind=kind) for kind in KINDS
+                for reference in self._index.get((kind, name), ())]
+
+    def referenced(self, kind: str) -> Set[str]:
+        """Returns the names of the objects of a kind referenced at least once"""
+        return {name for key_kind, name in self._index if key_kind == kind}
+
+    @property
+    def tables(self) -> List[str]:
+        return sorted(self._records)
+
+    def records(self, table: str) -> List[Dict]:
+        """Returns the records of an indexed table"""
+        return self._records.get(table, [])
+
+    def stats(self) -> Dict:
+        return {
+            'tables': {table: len(records) for table, records in sorted(self._records.items())},
+            'objects': len(self._index),
+            'references': sum(len(references) for references in self._index.values()),
+        }
+
+
+def policy_hit_counts(usage: Iterable[Dict]) -> Dict[int, int]:
+    """Returns the hit count of each policy in a monitor/firewall/policy usage response"""
+    hits = {}
+    for entry in usage or ():
+        count = entry.get('hit_count', entry.get('hits'))
+        if entry.get('policyid') is not None and count is not None:
+            hits[entry['policyid']] = int(count)
+    return hits
+
+
+def find_unused(index: ReferenceIndex, objects: Dict[str, Tuple[str, Iterable[str]]],
+                hits: Optional[Dict[int, int]] = None) -> Dict[str, Dict[str, List[str]]]:
+    """Finds the objects no record uses
+
+    objects maps a category to (kind, object names). Per category, returns
+    the objects nothing references ('unreferenced') and, when policy hit
+    counts are given, the objects only referenced by policies without hits,
+    directly or through groups that are themselves unused ('zero_hit_only').
+    Policies missing from hits count as used.
+    """
+    live: Dict[ObjectKey, bool] = {}
+    visiting: Set[ObjectKey] = set()
+
+    def in_use(key: ObjectKey) -> Tuple[bool, bool]:
+        """Returns whether an object is used, and whether that answer is final
+
+        Inside a group cycle, an object still being visited counts as unused
+        for this path only: answers depending on it are not kept.
+        """
+        if key in live:
+            return live[key], True
+        if key in visiting:
+            return False, False
+        visiting.add(key)
+        used, final = False, True
+        for reference in index.where_used(key[1], key[0]):
+            used, done = _record_in_use(reference)
+            final = final and done
+            if used:
+                break
+        visiting.discard(key)
+        if used or final:
+            live[key] = used
+        return used, used or final
+
+    def _record_in_use(reference: Dict) -> Tuple[bool, bool]:
+        if reference['table'] == 'firewall/policy':
+            return hits is None or hits.get(reference['id'], 1) > 0, True
+        if reference['table'] in GROUP_TABLES:
+            return in_use((GROUP_TABLES[reference['table']], reference['id']))
+        return True, True
+
+    result = {}
+    for category, (kind, names) in objects.items():
+        unreferenced, zero_hit_only = [], []
+        for name in sorted(set(names)):
+            if not index.where_used(name, kind):
+                unreferenced.append(name)
+            elif not in_use((kind, name))[0]:
+                zero_hit_only.append(name)
+        result[category] = {'unreferenced': unreferenced, 'zero_hit_only': zero_hit_only}
+    return result
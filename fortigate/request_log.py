@@ -0,0 +1,112 @@
+"""
+Bounded, lazily formatted logging of FortiOS API requests and responses
+
+Request and response lines are emitted as key=value records. Payloads and
+bodies are only serialized when a record is actually going to be emitted,
+are cut to a configurable size, can be sampled, and the verbosity can be
+raised or lowered per endpoint (e.g. to silence monitor/system/config/backup).
+"""
+
+import logging
+import random
+from typing import Any, Callable, Dict, Optional
+
+from . import codec
+
+# Default maximum number of body characters written per log record
+DEFAULT_MAX_BODY = 2048
+
+
+class _Truncated:
+    """Defers rendering of a payload until the log record is formatted"""
+
+    __slots__ = ('_source', '_limit')
+
+    def __init__(self, source: Callable[[], Any], limit: int):
+        self._source = source
+        self._limit = limit
+
+    def __str__(self) -> str:
+        value = self._source()
+        if value is None:
+            return '-'
+        if isinstance(value, (bytes, bytearray)):
+            text = bytes(value[:self._limit]).decode('utf-8', 'replace')
+            size = len(value)
+        else:
+            text = value if isinstance(value, str) else codec.dumps(value, default=str)
+            size = len(text)
+            text = text[:self._limit]
+        if size > self._limit:
+            return f"{text}...[truncated {size - self._limit} of {size} chars]"
+        return text
+
+
+class RequestLogger:
+    """Structured request/response logger shared by the FortiGate API clients"""
+
+    def __init__(self, logger: logging.Logger, max_body: int = DEFAULT_MAX_BODY,
+                 sample_rate: float = 1.0, endpoint_levels: Dict[str, Any] = None):
+        self.logger = logger
+        self.configure(max_body=max_body, sample_rate=sample_rate,
+                       endpoint_levels=endpoint_levels or {})
+
+    def configure(self, max_body: Optional[int] = None, sample_rate: Optional[float] = None,
+                  endpoint_levels: Optional[Dict[str, Any]] = None):
+        """Updates settings; endpoint_levels maps endpoint prefixes to log levels"""
+        if max_body is not None:
+            self.max_body = max(0, int(max_body))
+        if sample_rate is not None:
+            self.sample_rate = min(1.0, max(0.0, float(sample_rate)))
+        if endpoint_levels is not None:
+            # Longest prefix first so the most specific override wins
+            self.endpoint_levels = sorted(
+                ((prefix.strip('/'), logging.getLevelName(level.upper()) if isinstance(level, str) else level)
+                 for prefix, level in endpoint_levels.items()),
+                key=lambda item: len(item[0]), reverse=True
+            )
+
+    def _enabled(self, endpoint: str, level: int = logging.DEBUG) -> bool:
+        for prefix, threshold in self.endpoint_levels:
+            if endpoint.startswith(prefix):
+                if level < threshold:
+                    return False
+                break
+        return self.logger.isEnabledFor(level)
+
+    def _sampled(self) -> bool:
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def request(self, method: str, endpoint: str, vdom: str, params: Dict = None, data: Any = None):
+        """Logs an outgoing request"""
+        if not self._enabled(endpoint):
+            return
+        self.logger.debug(
+            "request method=%s endpoint=%s vdom=%s params=%s data=%s",
+            method, endpoint, vdom, params, _Truncated(lambda: data, self.max_body),
+            extra={'fortigate': {'event': 'request', 'method': method,
+                                 'endpoint': endpoint, 'vdom': vdom}}
+        )
+
+    def response(self, method: str, endpoint: str, status: int, elapsed: float,
+                 body: Callable[[], Any] = None):
+        """Logs a received response; body is a callable returning the raw body"""
+        if not self._enabled(endpoint):
+            return
+        if body is None or not self._sampled():
+            body = lambda: None
+        self.logger.debug(
+            "response method=%s endpoint=%s status=%s elapsed_ms=%.1f body=%s",
+            method, endpoint, status, elapsed * 1000, _Truncated(body, self.max_body),
+            extra={'fortigate': {'event': 'response', 'method': method, 'endpoint': endpoint,
+                                 'status': status, 'elapsed': elapsed}}
+        )
+
+    def failure(self, method: str, endpoint: str, error: Exception):
+        """Logs a failed request"""
+        if not self._enabled(endpoint, logging.ERROR):
+            return
+        self.logger.error(
+            "request failed method=%s endpoint=%s error=%s", method, endpoint, error,
+            extra={'fortigate': {'event': 'failure', 'method': method, 'endpoint': endpoint}}
+        )
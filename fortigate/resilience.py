@@ -0,0 +1,170 @@
+"""
+Retries and circuit breaking for requests to one device
+
+Transient failures (connection errors, timeouts, 429/502/503/504) of
+idempotent requests are retried with jittered exponential backoff. A
+per-device circuit breaker opens after consecutive transient failures and
+fails calls immediately until a trial request succeeds again, so callers
+do not pile up full timeouts on an unreachable appliance. Both are shared
+by the blocking and the asynchronous client of a device.
+"""
+
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+import httpx
+import requests
+
+# Default number of attempts per request (1: no retries)
+DEFAULT_RETRY_ATTEMPTS = 3
+# Backoff before the first retry and upper bound of any backoff, in seconds
+DEFAULT_RETRY_BACKOFF = 0.5
+DEFAULT_RETRY_MAX_BACKOFF = 8.0
+# Methods retried by default: only those that are safe to repeat
+DEFAULT_RETRY_METHODS = ('GET',)
+# Response statuses treated as transient failures
+TRANSIENT_STATUSES = frozenset({429, 502, 503, 504})
+# Consecutive transient failures opening the circuit, and seconds it stays open
+DEFAULT_BREAKER_FAILURES = 5
+DEFAULT_BREAKER_RESET = 30.0
+
+
+class CircuitOpenError(Exception):
+    """Raised without contacting the device while its circuit breaker is open"""
+
+
+def _status(error: BaseException) -> Optional[int]:
+    response = getattr(error, 'response', None)
+    return getattr(response, 'status_code', None)
+
+
+def is_transient(error: BaseException) -> bool:
+    """Tells whether a request failure is worth retrying (device unreachable or overloaded)"""
+    status = _status(error)
+    if status is not None:
+        return status in TRANSIENT_STATUSES
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                              httpx.TransportError))
+
+
+class RetryPolicy:
+    """Jittered exponential backoff for idempotent requests"""
+
+    def __init__(self, attempts: int = DEFAULT_RETRY_ATTEMPTS, backoff: float = DEFAULT_RETRY_BACKOFF,
+                 max_backoff: float = DEFAULT_RETRY_MAX_BACKOFF, methods=DEFAULT_RETRY_METHODS):
+        self.attempts = max(1, int(attempts))
+        self.backoff = float(backoff)
+        self.max_backoff = float(max_backoff)
+        self.methods = frozenset(method.upper() for method in methods)
+        self._lock = threading.Lock()
+        self.retries = 0
+
+    @classmethod
+    def from_config(cls, config: Dict = None) -> "RetryPolicy":
+        """Builds a policy from the 'retry' section of a device configuration"""
+        config = config or {}
+        return cls(
+            attempts=config.get('attempts', DEFAULT_RETRY_ATTEMPTS),
+            backoff=config.get('backoff', DEFAULT_RETRY_BACKOFF),
+            max_backoff=config.get('max_backoff', DEFAULT_RETRY_MAX_BACKOFF),
+            methods=config.get('methods', DEFAULT_RETRY_METHODS)
+        )
+
+    def delay(self, method: str, attempt: int, error: BaseException) -> Optional[float]:
+        """Returns the seconds to wait before retrying, or None if the request must not be retried
+
+        attempt is the number of attempts already made.
+        """
+        if (method.upper() not in self.methods or attempt >= self.attempts
+                or isinstance(error, CircuitOpenError) or not is_transient(error)):
+            return None
+        with self._lock:
+            self.retries += 1
+        retry_after = getattr(getattr(error, 'response', None), 'headers', {}).get('Retry-After')
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.max_backoff)
+        # Full jitter keeps retries from many callers from arriving in lockstep
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'attempts': self.attempts, 'methods': sorted(self.methods), 'retries': self.retries}
+
+
+class CircuitBreaker:
+    """Closed / open / half-open circuit breaker of one device"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failures: int = DEFAULT_BREAKER_FAILURES, reset_timeout: float = DEFAULT_BREAKER_RESET):
+        self.threshold = int(failures)
+        self.reset_timeout = float(reset_timeout)
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        # Start time of the trial request while half open (0: none)
+        self._trial = 0.0
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.opened = 0
+
+    @classmethod
+    def from_config(cls, config: Dict = None) -> "CircuitBreaker":
+        """Builds a breaker from the 'circuit_breaker' section of a device configuration"""
+        config = config or {}
+        return cls(
+            failures=config.get('failures', DEFAULT_BREAKER_FAILURES),
+            reset_timeout=config.get('reset_timeout', DEFAULT_BREAKER_RESET)
+        )
+
+    def before_request(self, host: str):
+        """Raises CircuitOpenError if requests to the device must fail fast"""
+        if self.threshold <= 0:
+            return
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            now = time.monotonic()
+            remaining = self._opened_at + self.reset_timeout - now
+            if self.state == self.OPEN and remaining <= 0:
+                # Let a single trial request find out whether the device is back
+                self.state = self.HALF_OPEN
+            # A trial that never reported back (e.g. cancelled) is replaced after reset_timeout
+            if self.state == self.HALF_OPEN and now - self._trial > self.reset_timeout:
+                self._trial = now
+                return
+            self.rejected += 1
+        raise CircuitOpenError(
+            f"Device {host} is unreachable (circuit open), retry in {max(0.0, remaining):.1f}s"
+        )
+
+    def record(self, error: Optional[BaseException] = None):
+        """Records the outcome of a request (error None for success)"""
+        if self.threshold <= 0 or isinstance(error, CircuitOpenError):
+            return
+        with self._lock:
+            self._trial = 0.0
+            if error is None or not is_transient(error):
+                # The device answered: it is reachable
+                self._failures = 0
+                self.state = self.CLOSED
+                return
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.threshold:
+                if self.state != self.OPEN:
+                    self.opened += 1
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self._failures,
+                'opened': self.opened,
+                'rejected': self.rejected,
+            }
@@ -0,0 +1,186 @@
+"""
+Per-device request throttling
+
+A DeviceThrottle caps how many requests are in flight to one appliance and
+how many are started per second (token bucket). It is shared by the
+blocking and the asynchronous client of a device, so both kinds of callers
+wait in the same first-in first-out queue. Time spent waiting is recorded
+so queueing can be observed in the client statistics.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Callable, Dict
+
+# Default maximum number of requests in flight per device (0: unlimited)
+DEFAULT_MAX_IN_FLIGHT = 10
+# Default sustained request rate per device, in requests per second (0: unlimited)
+DEFAULT_RATE = 0.0
+
+
+class ConcurrencyLimiter:
+    """FIFO semaphore usable from threads and from asyncio tasks"""
+
+    def __init__(self, limit: int):
+        self.limit = int(limit)
+        self.active = 0
+        self._waiters: "deque[Callable[[], None]]" = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def acquire(self):
+        """Blocks until a slot is free"""
+        with self._lock:
+            if self._free():
+                self.active += 1
+                return
+            event = threading.Event()
+            self._waiters.append(event.set)
+        # The releasing caller hands its slot over before waking us
+        event.wait()
+
+    async def acquire_async(self):
+        """Waits without blocking the event loop until a slot is free"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(self._handover, future)
+
+        with self._lock:
+            if self._free():
+                self.active += 1
+                return
+            self._waiters.append(wake)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if wake in self._waiters:
+                    self._waiters.remove(wake)
+            # A slot handed over concurrently is passed on by _handover
+            raise
+
+    def _handover(self, future: asyncio.Future):
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+    def release(self):
+        """Frees a slot, handing it to the oldest waiter if any"""
+        with self._lock:
+            if self._waiters:
+                wake = self._waiters.popleft()
+            else:
+                self.active -= 1
+                return
+        wake()
+
+    def _free(self) -> bool:
+        return self.limit <= 0 or (self.active < self.limit and not self._waiters)
+
+
+class TokenBucket:
+    """Token bucket handing out start times to callers in arrival order"""
+
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst if burst is not None else max(self.rate, 1.0)))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Takes a token and returns how many seconds to wait before using it"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Tokens may go negative: later callers queue behind earlier reservations
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+
+class DeviceThrottle:
+    """Concurrency limit plus token bucket for one device, with queue-time metrics"""
+
+    def __init__(self, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT, rate: float = DEFAULT_RATE,
+                 burst: float = None):
+        self.limiter = ConcurrencyLimiter(max_in_flight)
+        self.bucket = TokenBucket(rate, burst)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.queued = 0
+        self.queue_time_total = 0.0
+        self.queue_time_max = 0.0
+
+    @classmethod
+    def from_config(cls, config: Dict = None) -> "DeviceThrottle":
+        """Builds a throttle from the 'limits' section of a device configuration"""
+        config = config or {}
+        return cls(
+            max_in_flight=config.get('max_in_flight', DEFAULT_MAX_IN_FLIGHT),
+            rate=config.get('rate', DEFAULT_RATE),
+            burst=config.get('burst')
+        )
+
+    @contextmanager
+    def slot(self):
+        """Holds a request slot for a blocking caller"""
+        started = time.monotonic()
+        self.limiter.acquire()
+        try:
+            delay = self.bucket.reserve()
+            if delay:
+                time.sleep(delay)
+            self._record(time.monotonic() - started)
+            yield
+        finally:
+            self.limiter.release()
+
+    @asynccontextmanager
+    async def aslot(self):
+        """Holds a request slot for an asyncio caller"""
+        started = time.monotonic()
+        await self.limiter.acquire_async()
+        try:
+            delay = self.bucket.reserve()
+            if delay:
+                await asyncio.sleep(delay)
+            self._record(time.monotonic() - started)
+            yield
+        finally:
+            self.limiter.release()
+
+    def _record(self, waited: float):
+        with self._lock:
+            self.requests += 1
+            # Sub-millisecond waits are lock overhead, not queueing
+            if waited >= 0.001:
+                self.queued += 1
+            self.queue_time_total += waited
+            self.queue_time_max = max(self.queue_time_max, waited)
+
+    def stats(self) -> Dict:
+        """Returns limits, current load and queue-time counters"""
+        with self._lock:
+            return {
+                'max_in_flight': self.limiter.limit,
+                'rate': self.bucket.rate,
+                'burst': self.bucket.burst,
+                'in_flight': self.limiter.active,
+                'waiting': self.limiter.waiting,
+                'requests': self.requests,
+                'queued': self.queued,
+                'queue_time_avg': round(self.queue_time_total / self.requests, 4) if self.requests else 0.0,
+                'queue_time_max': round(self.queue_time_max, 4),
+            }
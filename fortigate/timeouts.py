@@ -0,0 +1,138 @@
+"""
+Adaptive request timeouts derived from observed latency
+
+Instead of one fixed timeout for every call, each device keeps a window of
+recent response times per endpoint (CMDB table or monitor path). Once an
+endpoint has enough samples its read timeout becomes a multiple of its
+99th percentile latency, bounded by a minimum and a maximum; the connect
+timeout follows the device's median latency. Fast endpoints therefore fail
+quickly on a hung device, while slow ones (configuration backups, large
+tables) get the time they usually need. Configured per-endpoint overrides
+always take precedence.
+"""
+
+import math
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple, Union
+
+from .cache import table_path
+
+# Timeouts used until an endpoint has enough samples, in seconds
+DEFAULT_READ_TIMEOUT = 30.0
+DEFAULT_CONNECT_TIMEOUT = 10.0
+# Bounds of adaptive timeouts, in seconds
+DEFAULT_MIN_TIMEOUT = 2.0
+DEFAULT_MAX_TIMEOUT = 120.0
+# Adaptive timeout = multiplier x latency percentile
+DEFAULT_TIMEOUT_MULTIPLIER = 3.0
+# Samples needed before an endpoint's timeout adapts, and samples kept
+DEFAULT_MIN_SAMPLES = 20
+DEFAULT_WINDOW = 200
+# Endpoints known to be slow regardless of what has been observed so far
+DEFAULT_ENDPOINT_TIMEOUTS = {
+    'monitor/system/config/backup': 300.0,
+    'monitor/system/config/restore': 300.0,
+}
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Returns the nearest-rank percentile of a non-empty sample list"""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class AdaptiveTimeouts:
+    """Per-endpoint latency windows and the timeouts derived from them"""
+
+    def __init__(self, default: float = DEFAULT_READ_TIMEOUT, connect: float = DEFAULT_CONNECT_TIMEOUT,
+                 minimum: float = DEFAULT_MIN_TIMEOUT, maximum: float = DEFAULT_MAX_TIMEOUT,
+                 multiplier: float = DEFAULT_TIMEOUT_MULTIPLIER, min_samples: int = DEFAULT_MIN_SAMPLES,
+                 window: int = DEFAULT_WINDOW, adaptive: bool = True,
+                 endpoints: Dict[str, Union[float, Dict]] = None):
+        self.default = float(default)
+        self.connect = float(connect)
+        self.minimum = float(minimum)
+        self.maximum = float(maximum)
+        self.multiplier = float(multiplier)
+        self.min_samples = max(1, int(min_samples))
+        self.window = max(self.min_samples, int(window))
+        self.adaptive = bool(adaptive)
+        overrides = dict(DEFAULT_ENDPOINT_TIMEOUTS, **(endpoints or {}))
+        # Longest prefix first so the most specific override wins
+        self.overrides = sorted(
+            ((prefix.strip('/'), value if isinstance(value, dict) else {'read': value})
+             for prefix, value in overrides.items()),
+            key=lambda item: len(item[0]), reverse=True
+        )
+        self._samples: Dict[str, Deque[float]] = {}
+        self._all: Deque[float] = deque(maxlen=self.window)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict = None) -> "AdaptiveTimeouts":
+        """Builds timeouts from the 'timeouts' section of a device configuration"""
+        config = config or {}
+        return cls(
+            default=config.get('default', DEFAULT_READ_TIMEOUT),
+            connect=config.get('connect', DEFAULT_CONNECT_TIMEOUT),
+            minimum=config.get('min', DEFAULT_MIN_TIMEOUT),
+            maximum=config.get('max', DEFAULT_MAX_TIMEOUT),
+            multiplier=config.get('multiplier', DEFAULT_TIMEOUT_MULTIPLIER),
+            min_samples=config.get('min_samples', DEFAULT_MIN_SAMPLES),
+            window=config.get('window', DEFAULT_WINDOW),
+            adaptive=config.get('adaptive', True),
+            endpoints=config.get('endpoints')
+        )
+
+    def _override(self, endpoint: str) -> Optional[Dict]:
+        endpoint = endpoint.strip('/')
+        for prefix, value in self.overrides:
+            if endpoint.startswith(prefix):
+                return value
+        return None
+
+    def _bounded(self, value: float, ceiling: float) -> float:
+        return min(max(value, self.minimum), ceiling)
+
+    def get(self, endpoint: str) -> Tuple[float, float]:
+        """Returns the (connect, read) timeouts for a request to endpoint"""
+        override = self._override(endpoint) or {}
+        connect = override.get('connect')
+        read = override.get('read')
+        if self.adaptive and (connect is None or read is None):
+            with self._lock:
+                samples = self._samples.get(table_path(endpoint))
+                if read is None and samples is not None and len(samples) >= self.min_samples:
+                    read = self._bounded(self.multiplier * percentile(list(samples), 0.99), self.maximum)
+                if connect is None and len(self._all) >= self.min_samples:
+                    # A TCP/TLS handshake costs a few round trips, like a fast API call
+                    connect = self._bounded(self.multiplier * percentile(list(self._all), 0.5), self.connect)
+        return (self.connect if connect is None else float(connect),
+                self.default if read is None else float(read))
+
+    def observe(self, endpoint: str, elapsed: float):
+        """Records the latency of a completed request (or the timeout it hit)"""
+        with self._lock:
+            key = table_path(endpoint)
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(elapsed)
+            self._all.append(elapsed)
+
+    def stats(self) -> Dict:
+        """Returns latency percentiles and current timeouts per endpoint"""
+        with self._lock:
+            windows = {key: list(samples) for key, samples in self._samples.items()}
+        endpoints = {}
+        for key, samples in sorted(windows.items()):
+            connect, read = self.get(key)
+            endpoints[key] = {
+                'samples': len(samples),
+                'p50': round(percentile(samples, 0.5), 4),
+                'p99': round(percentile(samples, 0.99), 4),
+                'read_timeout': round(read, 3),
+                'connect_timeout': round(connect, 3),
+            }
+        return {'adaptive': self.adaptive, 'default': self.default, 'endpoints': endpoints}
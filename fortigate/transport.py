@@ -0,0 +1,144 @@
+"""
+HTTP connection pooling for the FortiGate API clients
+
+Every device has its own connection pool, for the blocking client (a
+requests HTTPAdapter) as for the asynchronous one (httpx limits). Pool
+size, keep-alive and idle eviction are configurable per device, HTTP/2
+can be enabled when the optional 'h2' package is installed, and the
+clients count new connections so the connection reuse rate can be reported.
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+
+import httpx
+from requests.adapters import HTTPAdapter
+
+# Maximum number of connections opened to one device
+DEFAULT_POOL_SIZE = 10
+# Maximum number of idle connections kept open (0 disables keep-alive)
+DEFAULT_KEEPALIVE = 10
+# Seconds an idle connection is kept before it is closed
+DEFAULT_KEEPALIVE_EXPIRY = 30.0
+
+
+def http2_available() -> bool:
+    """Tells whether the optional HTTP/2 support of httpx is installed"""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class ConnectionSettings:
+    """Connection pool settings of one device"""
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, keepalive: int = DEFAULT_KEEPALIVE,
+                 keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY, http2: bool = False):
+        self.pool_size = max(1, int(pool_size))
+        self.keepalive = max(0, min(int(keepalive), self.pool_size))
+        self.keepalive_expiry = float(keepalive_expiry)
+        self.http2 = bool(http2)
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict] = None) -> "ConnectionSettings":
+        """Builds settings from the 'connection' section of a device configuration"""
+        config = config or {}
+        return cls(
+            pool_size=config.get('pool_size', DEFAULT_POOL_SIZE),
+            keepalive=config.get('keepalive', DEFAULT_KEEPALIVE),
+            keepalive_expiry=config.get('keepalive_expiry', DEFAULT_KEEPALIVE_EXPIRY),
+            http2=config.get('http2', False)
+        )
+
+    def limits(self) -> httpx.Limits:
+        """Returns the httpx pool limits"""
+        return httpx.Limits(
+            max_connections=self.pool_size,
+            max_keepalive_connections=self.keepalive,
+            keepalive_expiry=self.keepalive_expiry
+        )
+
+    def adapter(self) -> HTTPAdapter:
+        """Returns a requests adapter with a pool sized for concurrent calls"""
+        return HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+
+
+class ConnectionStats:
+    """Counts requests and newly opened connections of one client
+
+    Requests are counted as they are sent, failed ones included, since the
+    connections they open are counted too.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self.http_version: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def record_http_version(self, http_version: Optional[str]):
+        """Records the HTTP version a response came with"""
+        if http_version:
+            with self._lock:
+                self.http_version = http_version
+
+    def record_connections(self, count: int = 1):
+        with self._lock:
+            self.connections += count
+
+    async def trace(self, event: str, info: Dict):
+        """httpcore trace hook counting TCP connections"""
+        if event == 'connection.connect_tcp.complete':
+            self.record_connections()
+
+    def stats(self, settings: ConnectionSettings, connections: int = 0) -> Dict:
+        """Returns pool settings and counters; connections adds ones counted elsewhere"""
+        with self._lock:
+            opened = self.connections + connections
+            return {
+                'pool_size': settings.pool_size,
+                'keepalive': settings.keepalive,
+                'keepalive_expiry': settings.keepalive_expiry,
+                'http2': settings.http2,
+                'http_version': self.http_version,
+                'requests': self.requests,
+                'connections_opened': opened,
+                'reuse_rate': round(max(0.0, 1 - opened / self.requests), 3) if self.requests else 0.0,
+            }
+
+
+class IdleEviction:
+    """Closes the pooled connections of a requests adapter after an idle period
+
+    urllib3 keeps connections until the server drops them; a device that was
+    idle longer than keepalive_expiry gets a fresh pool on its next request.
+    """
+
+    def __init__(self, adapter: HTTPAdapter, stats: ConnectionStats, expiry: float):
+        self.adapter = adapter
+        self.stats = stats
+        self.expiry = expiry
+        self._last_used = time.monotonic()
+        self._lock = threading.Lock()
+
+    def live_connections(self) -> int:
+        """Returns the number of connections opened by the current pools"""
+        manager = self.adapter.poolmanager
+        return sum(manager.pools[key].num_connections for key in manager.pools.keys())
+
+    def touch(self):
+        """Records a request, evicting the pools first if they were idle too long"""
+        with self._lock:
+            now = time.monotonic()
+            if self.expiry > 0 and now - self._last_used > self.expiry:
+                # Keep the counters of the pools about to be dropped
+                self.stats.record_connections(self.live_connections())
+                self.adapter.poolmanager.clear()
+            self._last_used = now
@@ -1,4 +1,5 @@
 from .base import *
+from .output import *
 from .policy import *
 from .routing import *
 from .system import *
@@ -6,4 +7,8 @@ from .security import *
 from .users import *
 from .vpn import *
 from .sysadmin import *
-from .advanced import *
\ No newline at end of file
+from .advanced import *
+from .fleet import *
+from .simulation import *
+from .references import *
+from .history import *
\ No newline at end of file
@@ -1,12 +1,13 @@
-import json
 from typing import Dict, List, Optional, Any
 
 from mcptool.base import mcp, fortigate_manager
+from mcptool.output import output_options, render
 
 # === HIGH AVAILABILITY ===
 
 @mcp.tool()
-def fortigate_get_ha_status(device_id: str) -> str:
+@output_options
+async def fortigate_get_ha_status(device_id: str) -> str:
     """
     Get High Availability status
 
@@ -17,15 +18,15 @@ def fortigate_get_ha_status(device_id: str) -> str:
         HA cluster status and peer information
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        ha_status = api.get_ha_status()
-        return json.dumps(ha_status, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        ha_status = await api.get_ha_status()
+        return render(ha_status)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_configure_ha(device_id: str, 
+async def fortigate_configure_ha(device_id: str, 
                          mode: str = "a-p",
                          group_id: int = 1,
                          group_name: Optional[str] = None,
@@ -72,15 +73,15 @@ def fortigate_configure_ha(device_id: str,
         if hbdev:
             ha_data["hbdev"] = " ".join(hbdev)
 
-        api = fortigate_manager.get_device(device_id)
-        result = api.configure_ha(ha_data, vdom)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.configure_ha(ha_data, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_ha_failover(device_id: str) -> str:
+async def fortigate_ha_failover(device_id: str) -> str:
     """
     Trigger HA failover
 
@@ -91,9 +92,9 @@ def fortigate_ha_failover(device_id: str) -> str:
         Result of failover operation
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        result = api.ha_failover()
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.ha_failover()
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
@@ -101,27 +102,28 @@ def fortigate_ha_failover(device_id: str) -> str:
 # === SD-WAN ===
 
 @mcp.tool()
-def fortigate_get_sdwan_zones(device_id: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_sdwan_zones(device_id: str, vdom: str = "root") -> str:
     """
     Get SD-WAN zones
 
     Args:
         device_id: Device ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
 
     Returns:
         List of SD-WAN zones
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        zones = api.get_sdwan_zones(vdom)
-        return json.dumps(zones, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        zones = await api.get_sdwan_zones(vdom)
+        return render(zones)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_create_sdwan_zone(device_id: str, name: str,
+async def fortigate_create_sdwan_zone(device_id: str, name: str,
                                service_sla_tie_break: str = "zone",
                                minimum_sla_meet_members: int = 1,
                                comments: Optional[str] = None,
@@ -150,69 +152,72 @@ def fortigate_create_sdwan_zone(device_id: str, name: str,
         if comments:
             zone_data["comment"] = comments
 
-        api = fortigate_manager.get_device(device_id)
-        result = api.create_sdwan_zone(zone_data, vdom)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.create_sdwan_zone(zone_data, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_get_sdwan_members(device_id: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_sdwan_members(device_id: str, vdom: str = "root") -> str:
     """
     Get SD-WAN members
 
     Args:
         device_id: Device ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
 
     Returns:
         List of SD-WAN member interfaces
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        members = api.get_sdwan_members(vdom)
-        return json.dumps(members, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        members = await api.get_sdwan_members(vdom)
+        return render(members)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_get_sdwan_performance(device_id: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_sdwan_performance(device_id: str, vdom: str = "root") -> str:
     """
     Get SD-WAN performance SLA statistics
 
     Args:
         device_id: Device ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
 
     Returns:
         SD-WAN performance and SLA metrics
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        performance = api.get_sdwan_performance(vdom)
-        return json.dumps(performance, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        performance = await api.get_sdwan_performance(vdom)
+        return render(performance)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_get_sdwan_health_check(device_id: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_sdwan_health_check(device_id: str, vdom: str = "root") -> str:
     """
     Get SD-WAN health check status
 
     Args:
         device_id: Device ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
 
     Returns:
         SD-WAN health check status for all members
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        health_check = api.get_sdwan_health_check(vdom)
-        return json.dumps(health_check, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        health_check = await api.get_sdwan_health_check(vdom)
+        return render(health_check)
     except Exception as e:
         return f"Error: {str(e)}"
 
@@ -220,7 +225,8 @@ def fortigate_get_sdwan_health_check(device_id: str, vdom: str = "root") -> str:
 # === ADVANCED MONITORING ===
 
 @mcp.tool()
-def fortigate_get_fortiview_statistics(device_id: str, 
+@output_options
+async def fortigate_get_fortiview_statistics(device_id: str, 
                                      chart_type: str = "top-sources",
                                      vdom: str = "root") -> str:
     """
@@ -229,74 +235,77 @@ def fortigate_get_fortiview_statistics(device_id: str,
     Args:
         device_id: Device ID
         chart_type: Chart type (top-sources, top-destinations, top-applications, top-websites)
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
 
     Returns:
         FortiView statistical data
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        statistics = api.get_fortiview_statistics(chart_type, vdom)
-        return json.dumps(statistics, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        statistics = await api.get_fortiview_statistics(chart_type, vdom)
+        return render(statistics)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_get_threat_dashboard(device_id: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_threat_dashboard(device_id: str, vdom: str = "root") -> str:
     """
     Get threat dashboard data
 
     Args:
         device_id: Device ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
 
     Returns:
         Security rating and threat intelligence data
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        threat_data = api.get_threat_dashboard(vdom)
-        return json.dumps(threat_data, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        threat_data = await api.get_threat_dashboard(vdom)
+        return render(threat_data)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_get_policy_usage(device_id: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_policy_usage(device_id: str, vdom: str = "root") -> str:
     """
     Get firewall policy usage statistics
 
     Args:
         device_id: Device ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
 
     Returns:
         Policy usage statistics (hit counts, last used)
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        usage = api.get_policy_usage(vdom)
-        return json.dumps(usage, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        usage = await api.get_policy_usage(vdom)
+        return render(usage)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_get_application_statistics(device_id: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_application_statistics(device_id: str, vdom: str = "root") -> str:
     """
     Get application control statistics
 
     Args:
         device_id: Device ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
 
     Returns:
         Application usage and control statistics
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        app_stats = api.get_application_statistics(vdom)
-        return json.dumps(app_stats, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        app_stats = await api.get_application_statistics(vdom)
+        return render(app_stats)
     except Exception as e:
         return f"Error: {str(e)}"
\ No newline at end of file
@@ -1,4 +1,3 @@
-import json
 from mcp.server import FastMCP
 
 from typing import Dict, List, Optional, Any
@@ -8,14 +7,18 @@ from fortigate.fortigate import FortigateManager
 fortigate_manager = FortigateManager()
 mcp = FastMCP("Fortigate MCP Server")
 
+# The output layer registers its own tools on mcp, so it is imported once mcp exists
+from mcptool.output import output_options, render
+
 
 
 @mcp.tool()
+@output_options
 def fortigate_list_devices() -> str:
 	"""List all configured Fortigate devices"""
 	try:
 		devices = fortigate_manager.list_devices()
-		return json.dumps(devices, indent=2)
+		return render(devices)
 	except Exception as e:
 		return f"Errore: {str(e)}"
 
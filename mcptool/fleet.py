@@ -0,0 +1,116 @@
+from typing import Dict, List, Optional, Any
+
+from fortigate.fortigate import AsyncFortigateAPI
+from mcptool.base import mcp, fortigate_manager
+from mcptool.output import output_options, render
+
+# === FLEET ===
+
+def _read_method(method: str) -> str:
+    """Validates that a fleet call targets a read-only API method"""
+    if not (method.startswith('get_') or method.startswith('iter_')):
+        raise ValueError(f"Only get_* and iter_* methods can be run fleet-wide, not {method}")
+    if not callable(getattr(AsyncFortigateAPI, method, None)):
+        raise ValueError(f"Unknown API method {method}")
+    return method
+
+
+@mcp.tool()
+@output_options
+async def fortigate_fleet_call(method: str, device_ids: List[str] = None, vdoms: List[str] = None,
+                               arguments: Dict[str, Any] = None, concurrency: Optional[int] = None,
+                               timeout: Optional[float] = None) -> str:
+    """
+    Run a read-only API method on several devices concurrently
+
+    Args:
+        method: API method name (get_* or iter_*, e.g. get_interfaces)
+        device_ids: Devices to query (default: all configured devices)
+        vdoms: VDOMs to query on each device, ['*'] for every configured VDOM
+               (default: the method is called once per device without a VDOM)
+        arguments: Extra keyword arguments for the method (optional)
+        concurrency: Maximum number of calls in flight (optional)
+        timeout: Seconds allowed for each device call (optional)
+
+    Returns:
+        Results and errors keyed by device (and VDOM), plus a summary
+    """
+    try:
+        result = await fortigate_manager.fan_out(
+            _read_method(method), device_ids, vdoms,
+            concurrency=concurrency, timeout=timeout, **(arguments or {})
+        )
+        return render(result)
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+
+@mcp.tool()
+@output_options
+async def fortigate_fleet_system_status(device_ids: List[str] = None,
+                                        timeout: Optional[float] = None) -> str:
+    """
+    Get system status of several devices concurrently
+
+    Args:
+        device_ids: Devices to query (default: all configured devices)
+        timeout: Seconds allowed for each device (optional)
+
+    Returns:
+        System status keyed by device, per-device errors and a summary
+    """
+    try:
+        result = await fortigate_manager.fan_out('get_system_status', device_ids, timeout=timeout)
+        return render(result)
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+
+@mcp.tool()
+@output_options
+async def fortigate_fleet_firewall_policies(device_ids: List[str] = None, vdoms: List[str] = None,
+                                            fields: List[str] = None,
+                                            timeout: Optional[float] = None) -> str:
+    """
+    Get firewall policies of several devices and VDOMs concurrently
+
+    Args:
+        device_ids: Devices to query (default: all configured devices)
+        vdoms: VDOMs to query (default: ['*'], every configured VDOM)
+        fields: Policy fields to return (optional, default: all)
+        timeout: Seconds allowed for each device and VDOM (optional)
+
+    Returns:
+        Policies keyed by device and VDOM, per-device errors and a summary
+    """
+    try:
+        result = await fortigate_manager.fan_out(
+            'iter_firewall_policies', device_ids, vdoms or ['*'], timeout=timeout, fields=fields
+        )
+        return render(result)
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+
+@mcp.tool()
+@output_options
+async def fortigate_fleet_ipsec_tunnels_status(device_ids: List[str] = None, vdoms: List[str] = None,
+                                               timeout: Optional[float] = None) -> str:
+    """
+    Get IPSec tunnel status of several devices and VDOMs concurrently
+
+    Args:
+        device_ids: Devices to query (default: all configured devices)
+        vdoms: VDOMs to query (default: ['*'], every configured VDOM)
+        timeout: Seconds allowed for each device and VDOM (optional)
+
+    Returns:
+        Tunnel status keyed by device and VDOM, per-device errors and a summary
+    """
+    try:
+        result = await fortigate_manager.fan_out(
+            'get_ipsec_tunnels_status', device_ids, vdoms or ['*'], timeout=timeout
+        )
+        return render(result)
+    except Exception as e:
+        return f"Error: {str(e)}"
@@ -0,0 +1,135 @@
+import time
+from typing import Dict, Optional
+
+from mcptool.base import mcp, fortigate_manager
+from mcptool.output import output_options, render
+from fortigate.hit_history import (DEFAULT_BUCKET_SECONDS, DEFAULT_BUCKETS, DEFAULT_SAMPLE_INTERVAL, HitHistory,
+                                   HitSampler, trend)
+
+# Samples the policy hit counters of every device and VDOM in the background
+hit_sampler = HitSampler(fortigate_manager)
+
+
+def configure_hit_sampler(config: Dict = None):
+    """Applies the optional 'hit_sampler' section of the configuration and starts the sampler if enabled"""
+    config = config or {}
+    hit_sampler.configure(
+        interval=config.get('interval', DEFAULT_SAMPLE_INTERVAL),
+        bucket_seconds=config.get('bucket', DEFAULT_BUCKET_SECONDS),
+        buckets=config.get('buckets', DEFAULT_BUCKETS)
+    )
+    if config.get('enabled', False):
+        hit_sampler.start()
+
+
+def _history(device_id: str, vdom: str) -> HitHistory:
+    fortigate_manager.get_device(device_id)
+    history = hit_sampler.history(device_id, vdom)
+    if history is None or not history.samples:
+        raise ValueError(f"No hit history for {device_id}/{vdom} yet; "
+                         "enable the sampler with fortigate_configure_hit_sampler")
+    return history
+
+
+# === HIT HISTORY ===
+
+@mcp.tool()
+async def fortigate_configure_hit_sampler(enabled: Optional[bool] = None,
+                                          interval: Optional[float] = None) -> str:
+    """
+    Start, stop or reschedule the background policy hit-count sampler
+
+    Args:
+        enabled: True starts sampling every device and VDOM, False stops it (optional)
+        interval: Seconds between samples (optional)
+
+    Returns:
+        Sampler state, per device and VDOM history sizes and sampling errors
+    """
+    try:
+        hit_sampler.configure(interval=interval)
+        if enabled is True:
+            hit_sampler.start()
+        elif enabled is False:
+            hit_sampler.stop()
+        return render(hit_sampler.stats())
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+
+@mcp.tool()
+@output_options
+async def fortigate_get_zero_hit_policies(device_id: str, days: float = 30, vdom: str = "root") -> str:
+    """
+    List the policies without hits during the last days, from the sampled hit history
+
+    Args:
+        device_id: Device ID
+        days: Length of the period (default: 30)
+        vdom: Target VDOM (default: root)
+
+    Returns:
+        Policy IDs without hits, those never hit while sampled, and whether the
+        history covers the whole period
+    """
+    try:
+        return render(_history(device_id, vdom).zero_hits(days * 86400))
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+
+@mcp.tool()
+@output_options
+async def fortigate_get_top_policies_by_hits(device_id: str, hours: float = 24, limit: int = 10,
+                                             vdom: str = "root") -> str:
+    """
+    List the policies with the most hits during the last hours, from the sampled hit history
+
+    Args:
+        device_id: Device ID
+        hours: Length of the period (default: 24)
+        limit: Number of policies to return (default: 10)
+        vdom: Target VDOM (default: root)
+
+    Returns:
+        Policy IDs with their hits, most hit first
+    """
+    try:
+        history = _history(device_id, vdom)
+        top = history.top(hours * 3600, limit)
+        return render({
+            'policies': [{'policy_id': policy, 'hits': hits} for policy, hits in top],
+            'covered_seconds': round(history.coverage()),
+        })
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+
+@mcp.tool()
+@output_options
+async def fortigate_get_policy_hit_trend(device_id: str, policy_id: int, hours: float = 24,
+                                         vdom: str = "root") -> str:
+    """
+    Get the hit rate of a policy over the last hours, from the sampled hit history
+
+    Args:
+        device_id: Device ID
+        policy_id: Policy ID
+        hours: Length of the period (default: 24)
+        vdom: Target VDOM (default: root)
+
+    Returns:
+        Hits and hits per minute per time bucket, total hits, and the change of
+        the rate per day (least-squares slope) with its direction
+    """
+    try:
+        history = _history(device_id, vdom)
+        if not history.tracks(policy_id):
+            raise ValueError(f"Policy {policy_id} is not in the hit history of {device_id}/{vdom}")
+        result = trend(history.series(policy_id, hours * 3600), history.bucket_seconds)
+        last_hit = history.last_hit_at(policy_id)
+        result['last_hit'] = (time.strftime('%Y-%m-%dT%H:%M:%S%z', time.localtime(last_hit))
+                              if last_hit else None)
+        return render(result)
+    except Exception as e:
+        return f"Error: {str(e)}"
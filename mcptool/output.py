@@ -0,0 +1,368 @@
+"""
+Shared output layer of the MCP tools
+
+Tool results are encoded compactly by default, can be reduced to selected
+fields, and are bounded by a size budget. A result over budget is not cut
+mid-record: it is split into pages of whole list items (long strings are
+split into chunks), the first page is returned with a summary, and the
+rest is kept in a server-side snapshot that fortigate_get_next_page reads
+with the continuation cursor. Table tools can also page by record count:
+their first call returns page 1 and a cursor, and later pages are read
+from the snapshot instead of being fetched from the device again.
+"""
+
+import functools
+import inspect
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from fortigate import codec
+from mcptool.base import mcp
+
+# Encodings: compact JSON, indented JSON, or compact JSON with lists of records as column tables
+OUTPUT_FORMATS = ('compact', 'pretty', 'table')
+DEFAULT_OUTPUT_FORMAT = 'compact'
+# Default maximum response size, in characters (0: unlimited)
+DEFAULT_MAX_CHARS = 60000
+# Default records per page of the tools that page by record count (0: no paging)
+DEFAULT_PAGE_SIZE = 500
+# Seconds a paged result is kept, and number of paged results kept
+DEFAULT_SNAPSHOT_TTL = 600.0
+DEFAULT_MAX_SNAPSHOTS = 32
+
+OUTPUT_PARAMETERS = [
+    inspect.Parameter('fields', inspect.Parameter.KEYWORD_ONLY, default=None, annotation=Optional[List[str]]),
+    inspect.Parameter('output_format', inspect.Parameter.KEYWORD_ONLY, default=None, annotation=Optional[str]),
+    inspect.Parameter('max_chars', inspect.Parameter.KEYWORD_ONLY, default=None, annotation=Optional[int]),
+]
+OUTPUT_PARAMETER_DOCS = {
+    'fields': "Record fields to return (optional, default: all)",
+    'output_format': "compact, pretty or table (optional, default: compact)",
+    'max_chars': "Maximum response size, larger results are paged (optional)",
+}
+
+# Output options of the tool call being served
+_call_options: ContextVar[Dict] = ContextVar('output_options', default={})
+
+
+class OutputSettings:
+    """Server-wide output defaults, from the 'output' section of the configuration"""
+
+    def __init__(self, format: str = DEFAULT_OUTPUT_FORMAT, max_chars: int = DEFAULT_MAX_CHARS,
+                 page_size: int = DEFAULT_PAGE_SIZE, snapshot_ttl: float = DEFAULT_SNAPSHOT_TTL,
+                 max_snapshots: int = DEFAULT_MAX_SNAPSHOTS):
+        self.format = _check_format(format)
+        self.max_chars = max(0, int(max_chars))
+        self.page_size = max(0, int(page_size))
+        self.snapshot_ttl = float(snapshot_ttl)
+        self.max_snapshots = max(1, int(max_snapshots))
+
+
+def _check_format(output_format: str) -> str:
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format {output_format}, expected one of {', '.join(OUTPUT_FORMATS)}")
+    return output_format
+
+
+settings = OutputSettings()
+
+
+def configure_output(config: Dict = None):
+    """Applies the optional 'output' section of the configuration"""
+    global settings
+    config = config or {}
+    settings = OutputSettings(
+        format=config.get('format', DEFAULT_OUTPUT_FORMAT),
+        max_chars=config.get('max_chars', DEFAULT_MAX_CHARS),
+        page_size=config.get('page_size', DEFAULT_PAGE_SIZE),
+        snapshot_ttl=config.get('snapshot_ttl', DEFAULT_SNAPSHOT_TTL),
+        max_snapshots=config.get('max_snapshots', DEFAULT_MAX_SNAPSHOTS)
+    )
+
+
+# === ENCODING ===
+
+def select_fields(value: Any, fields: List[str]) -> Any:
+    """Keeps only the given fields of the records in a result
+
+    Dicts inside lists are records. A dict outside a list (a single object,
+    or a container such as results keyed by VDOM) is treated as a record
+    only if it has one of the fields; otherwise its values are searched.
+    """
+    wanted = set(fields)
+
+    def select(item: Any, in_list: bool) -> Any:
+        if isinstance(item, list):
+            return [select(element, True) for element in item]
+        if isinstance(item, dict):
+            if in_list or wanted.intersection(item):
+                return {key: item[key] for key in item if key in wanted}
+            return {key: select(element, False) for key, element in item.items()}
+        return item
+
+    return select(value, False)
+
+
+def tabulate(value: Any) -> Any:
+    """Turns lists of records into {'columns': [...], 'rows': [[...], ...]} tables"""
+    if isinstance(value, dict):
+        return {key: tabulate(item) for key, item in value.items()}
+    if isinstance(value, list):
+        if value and all(isinstance(item, dict) for item in value):
+            columns = list(dict.fromkeys(key for item in value for key in item))
+            return {'columns': columns, 'rows': [[item.get(key) for key in columns] for item in value]}
+        return [tabulate(item) for item in value]
+    return value
+
+
+def encode(value: Any, output_format: str = DEFAULT_OUTPUT_FORMAT) -> str:
+    """Encodes a tool result as JSON text in the given format"""
+    if output_format == 'pretty':
+        return codec.dumps(value, indent=2)
+    if output_format == 'table':
+        value = tabulate(value)
+    return codec.dumps(value)
+
+
+# === PAGING ===
+
+# A paging unit: (kind, path, value) where kind is 'item' (element of the list
+# at path), 'chunk' (part of the string at path) or 'value' (anything else)
+Unit = Tuple[str, Tuple, Any]
+
+
+def _units(value: Any, chunk_size: int, path: Tuple = ()) -> List[Unit]:
+    """Splits a result into the units pages are made of, in document order"""
+    if isinstance(value, dict) and value:
+        units = []
+        for key, item in value.items():
+            units.extend(_units(item, chunk_size, path + (key,)))
+        return units
+    if isinstance(value, list) and value:
+        return [('item', path, item) for item in value]
+    if isinstance(value, str) and chunk_size and len(value) > chunk_size:
+        return [('chunk', path, value[start:start + chunk_size]) for start in range(0, len(value), chunk_size)]
+    return [('value', path, value)]
+
+
+def _assemble(units: List[Unit]) -> Any:
+    """Rebuilds the part of a result made of the given units"""
+    root: Dict = {}
+    for kind, path, value in units:
+        parent, key = root, 'result'
+        for step in path:
+            parent = parent.setdefault(key, {})
+            key = step
+        if kind == 'item':
+            parent.setdefault(key, []).append(value)
+        elif kind == 'chunk':
+            parent[key] = parent.get(key, '') + value
+        else:
+            parent[key] = value
+    return root.get('result')
+
+
+def _path_name(path: Tuple) -> str:
+    return '.'.join(str(step) for step in path)
+
+
+class Snapshot:
+    """A result kept server-side so it can be read page by page"""
+
+    def __init__(self, units: List[Unit], output_format: str, page_size: int = 0):
+        self.id = uuid.uuid4().hex[:12]
+        self.units = units
+        self.output_format = output_format
+        self.page_size = page_size
+        self.created = time.monotonic()
+        self.taken_at = time.strftime('%Y-%m-%dT%H:%M:%S%z')
+        # Compact size of each unit, to size pages without encoding them repeatedly
+        self.sizes = [len(codec.dumps(value)) + 1 for _, _, value in units]
+        self.lists = {}
+        for kind, path, _ in units:
+            if kind == 'item':
+                name = _path_name(path)
+                self.lists[name] = self.lists.get(name, 0) + 1
+
+    def page(self, offset: int, max_chars: int) -> str:
+        """Encodes the page starting at unit offset within max_chars"""
+        if offset < 0 or offset >= len(self.units):
+            raise ValueError(f"Cursor offset {offset} is out of range")
+        budget = (max_chars or float('inf')) - 300
+        last = min(len(self.units), offset + self.page_size) if self.page_size else len(self.units)
+        end, used = offset, 0
+        while end < last and (end == offset or used + self.sizes[end] <= budget):
+            used += self.sizes[end]
+            end += 1
+        while True:
+            text = self._encode(offset, end)
+            if not max_chars or len(text) <= max_chars or end - offset <= 1:
+                return text
+            # Indentation or table layout made the estimate too low
+            end = offset + max(1, int((end - offset) * max_chars / len(text) * 0.9))
+
+    def _encode(self, offset: int, end: int) -> str:
+        remaining = len(self.units) - end
+        returned = {}
+        for kind, path, _ in self.units[offset:end]:
+            if kind == 'item':
+                name = _path_name(path)
+                returned[name] = returned.get(name, 0) + 1
+        envelope = {
+            'truncated': remaining > 0,
+            'summary': {
+                'total_units': len(self.units),
+                'offset': offset,
+                'returned_units': end - offset,
+                'remaining_units': remaining,
+                'snapshot_taken_at': self.taken_at,
+                'list_items': self.lists,
+                'returned_list_items': returned,
+            },
+            'next_cursor': f"{self.id}.{end}" if remaining else None,
+            'result': _assemble(self.units[offset:end]),
+        }
+        return encode(envelope, self.output_format)
+
+
+class SnapshotStore:
+    """Bounded, expiring store of paged results"""
+
+    def __init__(self):
+        self._snapshots: "OrderedDict[str, Snapshot]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, snapshot: Snapshot):
+        with self._lock:
+            self._expire()
+            self._snapshots[snapshot.id] = snapshot
+            while len(self._snapshots) > settings.max_snapshots:
+                self._snapshots.popitem(last=False)
+
+    def get(self, snapshot_id: str) -> Snapshot:
+        with self._lock:
+            self._expire()
+            snapshot = self._snapshots.get(snapshot_id)
+        if snapshot is None:
+            raise ValueError("Cursor expired or unknown, call the original tool again")
+        return snapshot
+
+    def _expire(self):
+        deadline = time.monotonic() - settings.snapshot_ttl
+        while self._snapshots and next(iter(self._snapshots.values())).created < deadline:
+            self._snapshots.popitem(last=False)
+
+
+snapshots = SnapshotStore()
+
+
+def _max_chars(max_chars: Optional[int]) -> int:
+    if max_chars is None:
+        max_chars = _call_options.get().get('max_chars')
+    return settings.max_chars if max_chars is None else max(0, max_chars)
+
+
+def render(result: Any, fields: List[str] = None, output_format: str = None,
+           max_chars: int = None, page_size: int = 0) -> str:
+    """Encodes a tool result, applying field selection and the size budget
+
+    Arguments left to None come from the options of the tool call, then
+    from the server settings. A result larger than max_chars, or with more
+    than page_size list items, is stored as a snapshot and its first page
+    is returned.
+    """
+    options = _call_options.get()
+    fields = fields if fields is not None else options.get('fields')
+    output_format = _check_format(output_format or options.get('output_format') or settings.format)
+    max_chars = _max_chars(max_chars)
+    if fields:
+        result = select_fields(result, fields)
+    if page_size:
+        units = _units(result, max_chars // 2)
+        if len(units) > page_size:
+            return _first_page(Snapshot(units, output_format, page_size), max_chars)
+    text = encode(result, output_format)
+    if not max_chars or len(text) <= max_chars:
+        return text
+    return _first_page(Snapshot(_units(result, max(1, max_chars // 2)), output_format), max_chars)
+
+
+def _first_page(snapshot: Snapshot, max_chars: int) -> str:
+    snapshots.add(snapshot)
+    return snapshot.page(0, max_chars)
+
+
+def page_size_option(page_size: Optional[int]) -> int:
+    """Returns the records per page of a table tool, the server default if None"""
+    return settings.page_size if page_size is None else max(0, page_size)
+
+
+def next_page(cursor: str, max_chars: int = None) -> str:
+    """Encodes the page of a stored result that a cursor points to"""
+    snapshot_id, _, offset = cursor.partition('.')
+    if not offset.isdigit():
+        raise ValueError(f"Invalid cursor {cursor}")
+    max_chars = _max_chars(max_chars)
+    return snapshots.get(snapshot_id).page(int(offset), max_chars)
+
+
+def output_options(func):
+    """Adds the fields, output_format and max_chars options to a tool
+
+    Place it under @mcp.tool(). The options are passed on to render() for
+    the duration of the call; a tool that has a parameter of the same name
+    still receives it.
+    """
+    signature = inspect.signature(func)
+    added = [parameter for parameter in OUTPUT_PARAMETERS if parameter.name not in signature.parameters]
+    names = [parameter.name for parameter in OUTPUT_PARAMETERS]
+
+    def enter(kwargs: Dict):
+        options = {name: kwargs.get(name) for name in names}
+        for parameter in added:
+            kwargs.pop(parameter.name, None)
+        return _call_options.set(options)
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            token = enter(kwargs)
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _call_options.reset(token)
+    else:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            token = enter(kwargs)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _call_options.reset(token)
+
+    wrapper.__signature__ = signature.replace(parameters=list(signature.parameters.values()) + added)
+    if added:
+        lines = '\n'.join(f"        {parameter.name}: {OUTPUT_PARAMETER_DOCS[parameter.name]}"
+                          for parameter in added)
+        wrapper.__doc__ = f"{(func.__doc__ or '').rstrip()}\n\n    Output options:\n{lines}\n    "
+    return wrapper
+
+
+# === OUTPUT ===
+@mcp.tool()
+def fortigate_get_next_page(cursor: str, max_chars: Optional[int] = None) -> str:
+    """
+    Gets the next page of a result that was too large for one response
+
+    Args:
+        cursor: next_cursor of the previous page
+        max_chars: Maximum response size (optional, default: server setting)
+    """
+    try:
+        return next_page(cursor, max_chars)
+    except Exception as e:
+        return f"Error: {str(e)}"
@@ -1,46 +1,71 @@
-import json
+import asyncio
+import ipaddress
 from typing import Dict, List, Optional, Any
 
+import httpx
+
 from mcptool.base import mcp, fortigate_manager
+from mcptool.output import next_page, output_options, page_size_option, render
+from mcptool.references import delete_guard
+from mcptool.simulation import address_book, policy_engine
+from fortigate.fortigate import logger
+from fortigate.policy_analysis import analyze_policies
+from fortigate.resilience import is_transient
+
+# Policy fields read by fortigate_get_policy_statistics
+POLICY_STATISTICS_FIELDS = [
+    'policyid', 'action', 'status', 'nat', 'logtraffic',
+    'utm-status', 'users', 'groups', 'comments'
+]
+
 
 # === FIREWALL OBJECTS ===
 @mcp.tool()
-def fortigate_get_firewall_policies(device_id: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_firewall_policies(device_id: str, vdom: str = "root",
+                                          page_size: Optional[int] = None, cursor: Optional[str] = None) -> str:
     """
     Gets list of firewall policies
 
     Args:
         device_id: Device ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
+        page_size: Records per page, 0 for all at once (optional, default: 500)
+        cursor: next_cursor of the previous page, to read the next page (optional)
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        policies = api.get_firewall_policies(vdom)
-        return json.dumps(policies, indent=2)
+        if cursor:
+            # Later pages come from the snapshot taken by the first call
+            return next_page(cursor)
+        api = fortigate_manager.get_async_device(device_id)
+        # Stream-decode the table instead of buffering the whole response body
+        policies = await api.per_vdom(vdom, api.iter_firewall_policies)
+        return render(policies, page_size=page_size_option(page_size))
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_get_policy_by_id(device_id: str, policy_id: int, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_policy_by_id(device_id: str, policy_id: int, vdom: str = "root") -> str:
     """
     Gets specific firewall policy by ID
 
     Args:
         device_id: Device ID
         policy_id: Policy ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        policy = api.get_policy_by_id(policy_id, vdom)
-        return json.dumps(policy, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        policy = await api.get_policy_by_id(policy_id, vdom)
+        return render(policy)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_delete_firewall_policy(device_id: str, policy_id: int, vdom: str = "root") -> str:
+async def fortigate_delete_firewall_policy(device_id: str, policy_id: int, vdom: str = "root") -> str:
     """
     Deletes firewall policy
 
@@ -50,15 +75,15 @@ def fortigate_delete_firewall_policy(device_id: str, policy_id: int, vdom: str =
         vdom: Target VDOM (default: root)
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        result = api.delete_firewall_policy(policy_id, vdom)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.delete_firewall_policy(policy_id, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_update_firewall_policy(device_id: str, policy_id: int, 
+async def fortigate_update_firewall_policy(device_id: str, policy_id: int, 
                                    name: Optional[str] = None,
                                    srcintf: Optional[List[str]] = None, 
                                    dstintf: Optional[List[str]] = None,
@@ -119,18 +144,18 @@ def fortigate_update_firewall_policy(device_id: str, policy_id: int,
         if not policy_data:
             return "Error: No fields provided to update"
 
-        api = fortigate_manager.get_device(device_id)
-        result = api.update_firewall_policy(policy_id, policy_data, vdom)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.update_firewall_policy(policy_id, policy_data, vdom)
+        return render(result)
 
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_validate_firewall_policy(device_id: str, srcintf: str, source_ip: str, 
+async def fortigate_validate_firewall_policy(device_id: str, srcintf: str, source_ip: str, 
                                      protocol: str, dest: str, source_port: int = 0, 
-                                     dest_port: int = 0, vdom: str = "root") -> str:
+                                     dest_port: int = 0, vdom: str = "root", offline: bool = False) -> str:
     """
     Validates firewall policy by simulating packet flow and checking which policy would match
 
@@ -143,13 +168,18 @@ def fortigate_validate_firewall_policy(device_id: str, srcintf: str, source_ip:
         source_port: Source port number (default: 0)
         dest_port: Destination port number (default: 0)
         vdom: Target VDOM (default: root)
+        offline: Evaluate against the compiled policy set instead of asking the
+                 device, also works while the device is unreachable (default: False)
 
     Returns:
         Policy lookup result showing which policy would match this traffic
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        result = api.lookup_firewall_policy(
+        if offline:
+            engine = await policy_engine(device_id, vdom)
+            return render(engine.lookup(srcintf, source_ip, protocol, dest, source_port, dest_port))
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.lookup_firewall_policy(
             srcintf=srcintf,
             source_ip=source_ip,
             protocol=protocol,
@@ -158,13 +188,13 @@ def fortigate_validate_firewall_policy(device_id: str, srcintf: str, source_ip:
             dest_port=dest_port,
             vdom=vdom
         )
-        return json.dumps(result, indent=2)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_create_firewall_policy(device_id: str, name: str,
+async def fortigate_create_firewall_policy(device_id: str, name: str,
                                     srcintf: List[str], dstintf: List[str],
                                     srcaddr: List[str], dstaddr: List[str], service: List[str],
                                     action: str, schedule: str = "always",
@@ -254,16 +284,55 @@ def fortigate_create_firewall_policy(device_id: str, name: str,
         if ssl_ssh_profile:
             policy_data["ssl-ssh-profile"] = ssl_ssh_profile
 
-        api = fortigate_manager.get_device(device_id)
-        result = api.create_firewall_policy(policy_data=policy_data, vdom=vdom)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.create_firewall_policy(policy_data=policy_data, vdom=vdom)
+        return render(result)
 
     except Exception as e:
         return f"Error: {str(e)}"
 
 
+def _pushdown_filter(field: str, operator: str, value: str) -> Optional[str]:
+    """
+    Builds a FortiOS filter expression, or None when the value cannot be
+    expressed safely (',' is the FortiOS OR separator)
+    """
+    if not value or ',' in value or '\\' in value:
+        return None
+    return f"{field}{operator}{value}"
+
+
+def _policy_matches(policy: Dict, name_filter: Optional[str], action_filter: Optional[str],
+                    status_filter: Optional[str], srcaddr_filter: Optional[str],
+                    dstaddr_filter: Optional[str], service_filter: Optional[str]) -> bool:
+    """Applies the search filters to a single policy locally"""
+    # Apply name filter
+    if name_filter and name_filter.lower() not in policy.get('name', '').lower():
+        return False
+
+    # Apply action filter
+    if action_filter and policy.get('action') != action_filter:
+        return False
+
+    # Apply status filter
+    if status_filter and policy.get('status') != status_filter:
+        return False
+
+    # Apply member filters (source address, destination address, service)
+    for member_filter, key in ((srcaddr_filter, 'srcaddr'),
+                               (dstaddr_filter, 'dstaddr'),
+                               (service_filter, 'service')):
+        if member_filter:
+            names = [item.get('name', '') for item in policy.get(key, [])]
+            if not any(member_filter.lower() in name.lower() for name in names):
+                return False
+
+    return True
+
+
 @mcp.tool()
-def fortigate_search_firewall_policies(device_id: str, 
+@output_options
+async def fortigate_search_firewall_policies(device_id: str, 
                                      name_filter: Optional[str] = None,
                                      action_filter: Optional[str] = None,
                                      status_filter: Optional[str] = None,
@@ -274,6 +343,9 @@ def fortigate_search_firewall_policies(device_id: str,
     """
     Search and filter firewall policies based on various criteria
 
+    Filters are sent to the device as FortiOS filter expressions so only
+    matching policies are transferred; results are re-checked locally.
+
     Args:
         device_id: Device ID
         name_filter: Filter by policy name (partial match)
@@ -282,125 +354,171 @@ def fortigate_search_firewall_policies(device_id: str,
         srcaddr_filter: Filter by source address (partial match)
         dstaddr_filter: Filter by destination address (partial match)
         service_filter: Filter by service (partial match)
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
 
     Returns:
         Filtered list of firewall policies
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        policies = api.get_firewall_policies(vdom)
-        
-        # Apply filters
-        filtered_policies = []
-        for policy in policies:
-            # Apply name filter
-            if name_filter and name_filter.lower() not in policy.get('name', '').lower():
-                continue
-            
-            # Apply action filter
-            if action_filter and policy.get('action') != action_filter:
-                continue
-            
-            # Apply status filter
-            if status_filter and policy.get('status') != status_filter:
-                continue
-            
-            # Apply source address filter
-            if srcaddr_filter:
-                srcaddr_names = [addr.get('name', '') for addr in policy.get('srcaddr', [])]
-                if not any(srcaddr_filter.lower() in name.lower() for name in srcaddr_names):
-                    continue
-            
-            # Apply destination address filter
-            if dstaddr_filter:
-                dstaddr_names = [addr.get('name', '') for addr in policy.get('dstaddr', [])]
-                if not any(dstaddr_filter.lower() in name.lower() for name in dstaddr_names):
-                    continue
-            
-            # Apply service filter
-            if service_filter:
-                service_names = [svc.get('name', '') for svc in policy.get('service', [])]
-                if not any(service_filter.lower() in name.lower() for name in service_names):
-                    continue
-            
-            filtered_policies.append(policy)
-        
-        return json.dumps({
-            "total_policies": len(policies),
-            "filtered_policies": len(filtered_policies),
-            "policies": filtered_policies
-        }, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+
+        # Translate filters into FortiOS filter expressions (ANDed by the API)
+        server_filters = [expression for expression in (
+            _pushdown_filter('name', '=@', name_filter),
+            _pushdown_filter('action', '==', action_filter),
+            _pushdown_filter('status', '==', status_filter),
+            _pushdown_filter('srcaddr', '=@', srcaddr_filter),
+            _pushdown_filter('dstaddr', '=@', dstaddr_filter),
+            _pushdown_filter('service', '=@', service_filter),
+        ) if expression]
+
+        async def collect(vdom: str, filters: List[str]) -> tuple:
+            # Stream policies page by page, keeping only the matching ones
+            total = 0
+            matched = []
+            async for policy in api.iter_firewall_policies(vdom, filters=filters or None):
+                total += 1
+                # Re-apply filters locally for expressions that could not be pushed down
+                if _policy_matches(policy, name_filter, action_filter, status_filter,
+                                   srcaddr_filter, dstaddr_filter, service_filter):
+                    matched.append(policy)
+            return total, matched
+
+        async def search(vdom: str) -> Dict:
+            filters = server_filters
+            try:
+                total_policies, filtered_policies = await collect(vdom, filters)
+            except httpx.HTTPStatusError as e:
+                # Only a rejected request (4xx) falls back, not an unreachable or overloaded device
+                if not filters or not 400 <= e.response.status_code < 500 or is_transient(e):
+                    raise
+                # Device rejected the filter expressions: fall back to local filtering
+                logger.warning("Server-side policy filter rejected (%s), filtering locally", e)
+                filters = []
+                total_policies, filtered_policies = await collect(vdom, filters)
+
+            result = {
+                "filtered_policies": len(filtered_policies),
+                "server_filters": filters,
+                "policies": filtered_policies
+            }
+            if not filters:
+                result["total_policies"] = total_policies
+            return result
+
+        return render(await api.per_vdom(vdom, search))
         
     except Exception as e:
         return f"Error: {str(e)}"
 
 
+async def _policy_statistics(api, vdom: str) -> Dict:
+    """Computes the policy statistics of one VDOM"""
+    # Only fetch the fields the statistics are computed from
+    policies = api.iter_firewall_policies(vdom, fields=POLICY_STATISTICS_FIELDS)
+    
+    # Calculate statistics
+    stats = {
+        "total_policies": 0,
+        "by_action": {},
+        "by_status": {},
+        "by_nat": {},
+        "by_logtraffic": {},
+        "with_utm": 0,
+        "with_users": 0,
+        "with_comments": 0
+    }
+    
+    async for policy in policies:
+        stats["total_policies"] += 1
+
+        # Count by action
+        action = policy.get('action', 'unknown')
+        stats["by_action"][action] = stats["by_action"].get(action, 0) + 1
+        
+        # Count by status
+        status = policy.get('status', 'unknown')
+        stats["by_status"][status] = stats["by_status"].get(status, 0) + 1
+        
+        # Count by NAT
+        nat = policy.get('nat', 'unknown')
+        stats["by_nat"][nat] = stats["by_nat"].get(nat, 0) + 1
+        
+        # Count by log traffic
+        logtraffic = policy.get('logtraffic', 'unknown')
+        stats["by_logtraffic"][logtraffic] = stats["by_logtraffic"].get(logtraffic, 0) + 1
+        
+        # Count UTM enabled policies
+        if policy.get('utm-status') == 'enable':
+            stats["with_utm"] += 1
+        
+        # Count policies with users
+        if policy.get('users') or policy.get('groups'):
+            stats["with_users"] += 1
+        
+        # Count policies with comments
+        if policy.get('comments'):
+            stats["with_comments"] += 1
+    
+    return stats
+
+
 @mcp.tool()
-def fortigate_get_policy_statistics(device_id: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_policy_statistics(device_id: str, vdom: str = "root") -> str:
     """
     Get statistics and summary of firewall policies
 
     Args:
         device_id: Device ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
 
     Returns:
         Policy statistics including counts by action, status, and other metrics
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        policies = api.get_firewall_policies(vdom)
-        
-        # Calculate statistics
-        stats = {
-            "total_policies": len(policies),
-            "by_action": {},
-            "by_status": {},
-            "by_nat": {},
-            "by_logtraffic": {},
-            "with_utm": 0,
-            "with_users": 0,
-            "with_comments": 0
-        }
-        
-        for policy in policies:
-            # Count by action
-            action = policy.get('action', 'unknown')
-            stats["by_action"][action] = stats["by_action"].get(action, 0) + 1
-            
-            # Count by status
-            status = policy.get('status', 'unknown')
-            stats["by_status"][status] = stats["by_status"].get(status, 0) + 1
-            
-            # Count by NAT
-            nat = policy.get('nat', 'unknown')
-            stats["by_nat"][nat] = stats["by_nat"].get(nat, 0) + 1
-            
-            # Count by log traffic
-            logtraffic = policy.get('logtraffic', 'unknown')
-            stats["by_logtraffic"][logtraffic] = stats["by_logtraffic"].get(logtraffic, 0) + 1
-            
-            # Count UTM enabled policies
-            if policy.get('utm-status') == 'enable':
-                stats["with_utm"] += 1
-            
-            # Count policies with users
-            if policy.get('users') or policy.get('groups'):
-                stats["with_users"] += 1
-            
-            # Count policies with comments
-            if policy.get('comments'):
-                stats["with_comments"] += 1
-        
-        return json.dumps(stats, indent=2)
-        
+        api = fortigate_manager.get_async_device(device_id)
+        stats = await api.per_vdom(vdom, lambda name: _policy_statistics(api, name))
+        return render(stats)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
+async def _policy_conflicts(device_id: str, vdom: str) -> Dict:
+    """Analyzes the compiled policy set of one VDOM"""
+    engine = await policy_engine(device_id, vdom)
+    # Tens of thousands of policies take seconds: keep the event loop free
+    return await asyncio.to_thread(analyze_policies, engine)
+
+
 @mcp.tool()
-def fortigate_create_firewall_address(device_id: str,
+@output_options
+async def fortigate_analyze_policy_conflicts(device_id: str, vdom: str = "root") -> str:
+    """
+    Finds shadowed, redundant, correlated and unmatchable firewall policies
+
+    Args:
+        device_id: Device ID
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
+
+    Returns:
+        shadowed: policies fully covered by an earlier policy with another action
+        redundant: policies fully covered by an earlier, or a later, policy with the same action
+        correlated: policies overlapping earlier policies with another action, with the count
+                    and the first policy IDs
+        unmatchable: policies matching no traffic
+        partially_resolved: policies with objects that cannot be resolved offline
+                            (FQDN, geography, schedules, users...), only reported when certain
+    """
+    try:
+        api = fortigate_manager.get_async_device(device_id)
+        return render(await api.per_vdom(vdom, lambda name: _policy_conflicts(device_id, name)))
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+
+@mcp.tool()
+async def fortigate_create_firewall_address(device_id: str,
     name: str,
     type: str,
     subnet: Optional[str] = None,
@@ -455,17 +573,18 @@ def fortigate_create_firewall_address(device_id: str,
         # Add comments if specified
         if comments:
             address_data["comment"] = comments
-        api = fortigate_manager.get_device(device_id)
-        result = api.create_address_object(address_data)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.create_address_object(address_data)
 
-        return json.dumps(result, indent=2)
+        return render(result)
 
     except Exception as e:
         return f"Error: {str(e)}"
 
 # === ADDRESS OBJECTS ===
 @mcp.tool()
-def fortigate_delete_firewall_address(device_id: str, name: str, vdom: str = "root") -> str:
+async def fortigate_delete_firewall_address(device_id: str, name: str, vdom: str = "root",
+                                            force: bool = False) -> str:
     """
     Deletes address object by name
 
@@ -473,17 +592,22 @@ def fortigate_delete_firewall_address(device_id: str, name: str, vdom: str = "ro
         device_id: Device ID
         name: Name of address object to delete
         vdom: Target VDOM (default: root)
+        force: Delete even if policies, groups or routes still reference it (default: False)
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        result = api.delete_address_object(name, vdom)
-        return json.dumps(result, indent=2)
+        if not force:
+            blocked = await delete_guard(device_id, vdom, 'address', name)
+            if blocked:
+                return blocked
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.delete_address_object(name, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_update_firewall_address(device_id: str,
+async def fortigate_update_firewall_address(device_id: str,
     name: str,
     type: Optional[str] = None,
     subnet: Optional[str] = None,
@@ -536,17 +660,51 @@ def fortigate_update_firewall_address(device_id: str,
         if not address_data:
             return "Error: No fields provided for update."
 
-        api = fortigate_manager.get_device(device_id)
-        result = api.update_address_object(name, address_data, vdom)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.update_address_object(name, address_data, vdom)
+
+        return render(result)
+
+    except Exception as e:
+        return f"Error: {str(e)}"
+
 
-        return json.dumps(result, indent=2)
+@mcp.tool()
+@output_options
+async def fortigate_resolve_addresses(device_id: str, names: List[str], vdom: str = "root") -> str:
+    """
+    Resolves address objects, address groups and VIPs to the IPv4 space they cover
 
+    Args:
+        device_id: Device ID
+        names: Address, address group or VIP names
+        vdom: Target VDOM (default: root)
+
+    Returns:
+        Per name: collapsed CIDR blocks and ranges, number of addresses, wildcard
+        masks and the objects that cannot be resolved (FQDN, geography...)
+    """
+    try:
+        book = await address_book(device_id, vdom)
+        result = {}
+        for name in names:
+            resolved = book.resolve(name)
+            result[name] = {
+                'cidrs': resolved.cidrs(),
+                'ranges': [f"{ipaddress.IPv4Address(start)}-{ipaddress.IPv4Address(end)}"
+                           for start, end in resolved.intervals.intervals()],
+                'addresses': sum(end - start + 1 for start, end in resolved.intervals.intervals()),
+                'wildcards': [f"{ipaddress.IPv4Address(address)} {ipaddress.IPv4Address(mask)}"
+                              for address, mask in resolved.wildcards],
+                'unresolved': sorted(set(resolved.unknown)),
+            }
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_create_service_object(device_id: str,
+async def fortigate_create_service_object(device_id: str,
     name: str,
     protocol: str = "TCP/UDP/SCTP",
     tcp_portrange: Optional[str] = None,
@@ -569,7 +727,7 @@ def fortigate_create_service_object(device_id: str,
         The result of the service object creation.
     """
     try:
-        api = fortigate_manager.get_device(device_id)
+        api = fortigate_manager.get_async_device(device_id)
         data = {
             "name": name,
             "protocol": protocol,
@@ -580,14 +738,15 @@ def fortigate_create_service_object(device_id: str,
             data["udp-portrange"] = udp_portrange
         if comment:
             data["comment"] = comment
-        result = api.create_service_object(data, vdom)
-        return json.dumps(result, indent=2)
+        result = await api.create_service_object(data, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_delete_service_object(device_id: str, name: str, vdom: str = "root") -> str:
+async def fortigate_delete_service_object(device_id: str, name: str, vdom: str = "root",
+                                         force: bool = False) -> str:
     """
     Deletes a service object.
 
@@ -595,20 +754,25 @@ def fortigate_delete_service_object(device_id: str, name: str, vdom: str = "root
         device_id: The ID of the FortiGate device.
         name: The name of the service object to delete.
         vdom: The VDOM to delete the service object from.
+        force: Delete even if policies or service groups still reference it (default: False).
 
     Returns:
         The result of the service object deletion.
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        result = api.delete_service_object(name, vdom)
-        return json.dumps(result, indent=2)
+        if not force:
+            blocked = await delete_guard(device_id, vdom, 'service', name)
+            if blocked:
+                return blocked
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.delete_service_object(name, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_update_service_object(device_id: str,
+async def fortigate_update_service_object(device_id: str,
     name: str,
     protocol: Optional[str] = None,
     tcp_portrange: Optional[str] = None,
@@ -631,7 +795,7 @@ def fortigate_update_service_object(device_id: str,
         The result of the service object update.
     """
     try:
-        api = fortigate_manager.get_device(device_id)
+        api = fortigate_manager.get_async_device(device_id)
         data = {}
         if protocol:
             data["protocol"] = protocol
@@ -645,14 +809,14 @@ def fortigate_update_service_object(device_id: str,
         if not data:
             return "Error: No fields provided for update."
 
-        result = api.update_service_object(name, data, vdom)
-        return json.dumps(result, indent=2)
+        result = await api.update_service_object(name, data, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_create_vip_object(device_id: str,
+async def fortigate_create_vip_object(device_id: str,
     name: str,
     extip: str,
     mappedip: str,
@@ -683,7 +847,7 @@ def fortigate_create_vip_object(device_id: str,
         The result of the VIP object creation.
     """
     try:
-        api = fortigate_manager.get_device(device_id)
+        api = fortigate_manager.get_async_device(device_id)
         data = {
             "name": name,
             "extip": extip,
@@ -701,14 +865,14 @@ def fortigate_create_vip_object(device_id: str,
             data["mappedport"] = mappedport
         if comment:
             data["comment"] = comment
-        result = api.create_vip_object(data, vdom)
-        return json.dumps(result, indent=2)
+        result = await api.create_vip_object(data, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_update_vip_object(device_id: str,
+async def fortigate_update_vip_object(device_id: str,
     name: str,
     extip: Optional[str] = None,
     mappedip: Optional[str] = None,
@@ -739,7 +903,7 @@ def fortigate_update_vip_object(device_id: str,
         The result of the VIP object update.
     """
     try:
-        api = fortigate_manager.get_device(device_id)
+        api = fortigate_manager.get_async_device(device_id)
         data = {}
         if extip:
             data["extip"] = extip
@@ -761,28 +925,34 @@ def fortigate_update_vip_object(device_id: str,
         if not data:
             return "Error: No fields provided for update."
 
-        result = api.update_vip_object(name, data, vdom)
-        return json.dumps(result, indent=2)
+        result = await api.update_vip_object(name, data, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_get_vip_objects(device_id: str,vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_vip_objects(device_id: str,vdom: str = "root") -> str:
     """Gets configured vip objects """
     try:
-        api = fortigate_manager.get_device(device_id)
-        policies = api.get_vip_addresses(vdom)
-        return json.dumps(policies, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        policies = await api.get_vip_addresses(vdom)
+        return render(policies)
     except Exception as e:
         return f"Error: {str(e)}"
 
 @mcp.tool()
-def fortigate_delete_vip_object(device_id: str, vip_name: str, vdom: str = "root") -> str:
-    """ Deletes vip object by name"""
+async def fortigate_delete_vip_object(device_id: str, vip_name: str, vdom: str = "root",
+                                     force: bool = False) -> str:
+    """ Deletes vip object by name, unless policies or groups reference it and force is False"""
     try:
-        api = fortigate_manager.get_device(device_id)
-        result = api.delete_vip_address(vip_name, vdom)
-        return json.dumps(result, indent=2)
+        if not force:
+            blocked = await delete_guard(device_id, vdom, 'address', vip_name)
+            if blocked:
+                return blocked
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.delete_vip_address(vip_name, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
\ No newline at end of file
@@ -0,0 +1,185 @@
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+
+from mcptool.base import mcp, fortigate_manager
+from mcptool.output import output_options, render
+from fortigate.fortigate import collect, logger
+from fortigate.references import KINDS, REFERENCE_FIELDS, ReferenceIndex, find_unused, policy_hit_counts
+
+# References listed in the error of a guarded delete
+MAX_LISTED_REFERENCES = 10
+
+# Reference indexes and the configuration revision they reflect, by (device ID, VDOM)
+_indexes: Dict[Tuple[str, str], Tuple[Optional[str], ReferenceIndex]] = {}
+
+
+def _table_readers(api, vdom: str) -> Dict:
+    """Returns an awaitable reading each indexed table"""
+    return {
+        'firewall/policy': collect(api.iter_firewall_policies(vdom)),
+        'firewall/policy6': api.get_firewall_policies6(vdom),
+        'firewall/local-in-policy': api.get_local_in_policies(vdom),
+        'firewall/central-snat-map': api.get_central_snat_map(vdom),
+        'firewall/proxy-policy': api.get_proxy_policies(vdom),
+        'firewall/DoS-policy': api.get_dos_policies(vdom),
+        'firewall/shaping-policy': api.get_shaping_policies(vdom),
+        'firewall/addrgrp': api.get_address_groups(vdom),
+        'firewall.service/group': api.get_service_groups(vdom),
+        'firewall/vip': api.get_vip_addresses(vdom),
+        'firewall/vipgrp': api.get_vip_groups(vdom),
+        'firewall/profile-group': api.get_profile_groups(vdom),
+        'system/zone': api.get_zones(vdom),
+        'system/sdwan/service': api.get_sdwan_rules(vdom),
+        'vpn.ipsec/phase2-interface': api.get_ipsec_phase2(vdom),
+        'router/static': api.get_static_routes(vdom),
+        'router/policy': api.get_policy_routes(vdom),
+        'user/group': api.get_user_groups(vdom),
+    }
+
+
+async def reference_index(device_id: str, vdom: str = 'root', refresh: bool = False) -> ReferenceIndex:
+    """Returns the reference index of a VDOM
+
+    When the device reports a new configuration revision, or the revision
+    cannot be read, the tables are read again and only the tables whose records
+    differ are indexed again. A table that cannot be read is dropped from the
+    index, and the index is kept without a revision so the next call reads
+    the tables again.
+    """
+    api = fortigate_manager.get_async_device(device_id)
+    key = (device_id, vdom)
+    revision = await api.config_revision(vdom)
+    entry = _indexes.get(key)
+    if entry is not None and not refresh and revision is not None and revision == entry[0]:
+        return entry[1]
+    readers = _table_readers(api, vdom)
+    results = await asyncio.gather(*readers.values(), return_exceptions=True)
+    index = entry[1] if entry is not None else ReferenceIndex()
+    complete = True
+    for table, records in zip(readers, results):
+        if isinstance(records, BaseException):
+            # Tables the account cannot read or the model lacks stay out of the index
+            logger.warning("Indexing references of %s/%s: reading %s failed (%s)", device_id, vdom, table, records)
+            index.drop_table(table)
+            complete = False
+            continue
+        index.update_table(table, records)
+    _indexes[key] = (revision if complete else None, index)
+    return index
+
+
+async def delete_guard(device_id: str, vdom: str, kind: str, name: str) -> Optional[str]:
+    """Returns an error listing the records that reference an object, None when nothing does"""
+    references = (await reference_index(device_id, vdom)).where_used(name, kind)
+    if not references:
+        return None
+    listed = ', '.join(f"{reference['table']} {reference['id']} ({reference['field']})"
+                       for reference in references[:MAX_LISTED_REFERENCES])
+    if len(references) > MAX_LISTED_REFERENCES:
+        listed += f" and {len(references) - MAX_LISTED_REFERENCES} more"
+    return (f"Error: {name} is still referenced by {len(references)} record(s): {listed}. "
+            f"Remove the references first, or pass force=True")
+
+
+# === REFERENCES ===
+@mcp.tool()
+@output_options
+async def fortigate_where_used(device_id: str, name: str, kind: Optional[str] = None,
+                               vdom: str = "root") -> str:
+    """
+    Lists the policies, groups, VIPs, profile groups, zones, routes, SD-WAN rules,
+    IPsec selectors and user groups referencing an object
+
+    Args:
+        device_id: Device ID
+        name: Object name
+        kind: Object kind, e.g. address (also address groups, VIPs and VIP groups), address6,
+              service, interface, schedule, profile-group, av-profile, webfilter-profile,
+              ips-sensor, dnsfilter-profile (optional, default: any kind)
+        vdom: Target VDOM (default: root)
+
+    Returns:
+        References with table, record ID, field and kind, and the tables that
+        could not be indexed
+    """
+    try:
+        if kind is not None and kind not in KINDS:
+            raise ValueError(f"Unknown kind {kind}, expected one of {', '.join(KINDS)}")
+        index = await reference_index(device_id, vdom)
+        started = time.perf_counter()
+        references = index.where_used(name, kind)
+        return render({
+            'name': name,
+            'count': len(references),
+            'references': references,
+            'unindexed_tables': sorted(set(REFERENCE_FIELDS) - set(index.tables)),
+            'lookup_us': round((time.perf_counter() - started) * 1e6, 1),
+        })
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+
+async def _unused_objects(device_id: str, api, vdom: str) -> Dict:
+    """Finds the unused objects of one VDOM"""
+    index = await reference_index(device_id, vdom)
+    readers = {
+        'addresses': ('address', collect(api.iter_address_objects(vdom, fields=['name']))),
+        'services': ('service', api.get_service_objects(vdom, fields=['name'])),
+        'av_profiles': ('av-profile', api.get_av_profiles(vdom, fields=['name'])),
+        'webfilter_profiles': ('webfilter-profile', api.get_webfilter_profiles(vdom, fields=['name'])),
+        'ips_sensors': ('ips-sensor', api.get_ips_sensors(vdom, fields=['name'])),
+        'dnsfilter_profiles': ('dnsfilter-profile', api.get_dnsfilter_profiles(vdom, fields=['name'])),
+    }
+    usage, *tables = await asyncio.gather(api.get_policy_usage(vdom),
+                                          *(reader for _, reader in readers.values()),
+                                          return_exceptions=True)
+    objects, unavailable = {}, []
+    for (category, (kind, _)), records in zip(readers.items(), tables):
+        if isinstance(records, BaseException):
+            unavailable.append(category)
+            continue
+        objects[category] = (kind, [record['name'] for record in records if record.get('name')])
+    # Groups and VIPs are part of the reference index already
+    objects['address_groups'] = ('address', [group['name'] for group in index.records('firewall/addrgrp')])
+    objects['vips'] = ('address', [vip['name'] for vip in index.records('firewall/vip')])
+    objects['service_groups'] = ('service', [group['name'] for group in index.records('firewall.service/group')])
+    objects['vip_groups'] = ('address', [group['name'] for group in index.records('firewall/vipgrp')])
+    objects['profile_groups'] = ('profile-group', [group['name'] for group in index.records('firewall/profile-group')])
+
+    hits = None if isinstance(usage, BaseException) else policy_hit_counts(usage)
+    result = find_unused(index, objects, hits)
+    result['policy_usage'] = ({'available': False} if hits is None else
+                              {'available': True, 'zero_hit_policies': sorted(
+                                  policy for policy, count in hits.items() if count == 0)})
+    result['unavailable'] = unavailable
+    # References held in these tables were not seen: the findings are only candidates
+    result['unchecked_tables'] = sorted(set(REFERENCE_FIELDS) - set(index.tables))
+    result['complete'] = not result['unchecked_tables']
+    return result
+
+
+@mcp.tool()
+@output_options
+async def fortigate_find_unused_objects(device_id: str, vdom: str = "root") -> str:
+    """
+    Lists unused addresses, address groups, VIPs, VIP groups, services, service groups,
+    profile groups and AV, web filter, IPS and DNS filter profiles
+
+    Args:
+        device_id: Device ID
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
+
+    Returns:
+        Per object type: unreferenced (no policy, group, route... names them) and
+        zero_hit_only (only used by policies without hits since the counters were
+        last reset, directly or through unused groups); the zero-hit policies, the
+        object types that could not be read, and unchecked_tables, the reference
+        tables that could not be read. Unless complete is true, the objects are only
+        candidates: references in unchecked tables were not seen
+    """
+    try:
+        api = fortigate_manager.get_async_device(device_id)
+        return render(await api.per_vdom(vdom, lambda name: _unused_objects(device_id, api, name)))
+    except Exception as e:
+        return f"Error: {str(e)}"
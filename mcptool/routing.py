@@ -1,26 +1,27 @@
-import json
 from typing import Dict, List, Optional, Any
 from mcptool.base import mcp, fortigate_manager
+from mcptool.output import output_options, render
 
 @mcp.tool()
-def fortigate_get_static_routes(device_id: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_static_routes(device_id: str, vdom: str = "root") -> str:
     """
     Gets configured static routes
 
     Args:
         device_id: Device ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        routes = api.get_static_routes(vdom)
-        return json.dumps(routes, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        routes = await api.get_static_routes(vdom)
+        return render(routes)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_create_static_route(device_id: str,
+async def fortigate_create_static_route(device_id: str,
     dst: str,
     gateway: str,
     device: str,
@@ -41,7 +42,7 @@ def fortigate_create_static_route(device_id: str,
         The result of the route creation.
     """
     try:
-        api = fortigate_manager.get_device(device_id)
+        api = fortigate_manager.get_async_device(device_id)
         data = {
             "dst": dst,
             "gateway": gateway,
@@ -49,14 +50,14 @@ def fortigate_create_static_route(device_id: str,
         }
         if comment:
             data["comment"] = comment
-        result = api.create_static_route(data, vdom)
-        return json.dumps(result, indent=2)
+        result = await api.create_static_route(data, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_delete_static_route(device_id: str, route_id: int, vdom: str = "root") -> str:
+async def fortigate_delete_static_route(device_id: str, route_id: int, vdom: str = "root") -> str:
     """
     Deletes a static route.
 
@@ -69,15 +70,15 @@ def fortigate_delete_static_route(device_id: str, route_id: int, vdom: str = "ro
         The result of the route deletion.
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        result = api.delete_static_route(route_id, vdom)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.delete_static_route(route_id, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_update_static_route(device_id: str,
+async def fortigate_update_static_route(device_id: str,
     route_id: int,
     dst: Optional[str] = None,
     gateway: Optional[str] = None,
@@ -100,7 +101,7 @@ def fortigate_update_static_route(device_id: str,
         The result of the route update.
     """
     try:
-        api = fortigate_manager.get_device(device_id)
+        api = fortigate_manager.get_async_device(device_id)
         data = {}
         if dst:
             data["dst"] = dst
@@ -114,31 +115,32 @@ def fortigate_update_static_route(device_id: str,
         if not data:
             return "Error: No fields provided for update."
 
-        result = api.update_static_route(route_id, data, vdom)
-        return json.dumps(result, indent=2)
+        result = await api.update_static_route(route_id, data, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_get_policy_routes(device_id: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_policy_routes(device_id: str, vdom: str = "root") -> str:
     """
     Gets configured policy routes.
 
     Args:
         device_id: Device ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        routes = api.get_policy_routes(vdom)
-        return json.dumps(routes, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        routes = await api.get_policy_routes(vdom)
+        return render(routes)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_create_policy_route(device_id: str,
+async def fortigate_create_policy_route(device_id: str,
     input_device: str,
     src: str,
     dst: str,
@@ -165,7 +167,7 @@ def fortigate_create_policy_route(device_id: str,
         The result of the route creation.
     """
     try:
-        api = fortigate_manager.get_device(device_id)
+        api = fortigate_manager.get_async_device(device_id)
         data = {
             "input-device": input_device,
             "src": src,
@@ -176,14 +178,15 @@ def fortigate_create_policy_route(device_id: str,
         }
         if comment:
             data["comment"] = comment
-        result = api.create_policy_route(data, vdom)
-        return json.dumps(result, indent=2)
+        result = await api.create_policy_route(data, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_route_lookup(device_id: str, destination: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_route_lookup(device_id: str, destination: str, vdom: str = "root") -> str:
     """
     Looks up a route in the routing table.
 
@@ -196,40 +199,42 @@ def fortigate_route_lookup(device_id: str, destination: str, vdom: str = "root")
         The result of the route lookup.
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        result = api.route_lookup(destination, vdom)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.route_lookup(destination, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 @mcp.tool()
-def fortigate_get_routing_table(device_id: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_routing_table(device_id: str, vdom: str = "root") -> str:
     """
     Gets configured routing table
 
     Args:
         device_id: Device ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        routes = api.get_routing_table(vdom)
-        return json.dumps(routes, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        routes = await api.get_routing_table(vdom)
+        return render(routes)
     except Exception as e:
         return f"Error: {str(e)}"
 
 @mcp.tool()
-def fortigate_get_bgp_peers(device_id: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_bgp_peers(device_id: str, vdom: str = "root") -> str:
     """
     Get configured BGP peers
 
     Args:
         device_id: Device ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        routes = api.get_bgp_peers(vdom)
-        return json.dumps(routes, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        routes = await api.get_bgp_peers(vdom)
+        return render(routes)
     except Exception as e:
         return f"Error: {str(e)}"
\ No newline at end of file
@@ -1,32 +1,33 @@
-import json
 from typing import Dict, List, Optional, Any
 
 from mcptool.base import mcp, fortigate_manager
+from mcptool.output import output_options, render
 
 # === ANTIVIRUS PROFILES ===
 
 @mcp.tool()
-def fortigate_get_av_profiles(device_id: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_av_profiles(device_id: str, vdom: str = "root") -> str:
     """
     Get all antivirus profiles
 
     Args:
         device_id: Device ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
 
     Returns:
         List of antivirus profiles
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        profiles = api.get_av_profiles(vdom)
-        return json.dumps(profiles, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        profiles = await api.get_av_profiles(vdom)
+        return render(profiles)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_create_av_profile(device_id: str, name: str, 
+async def fortigate_create_av_profile(device_id: str, name: str, 
                                inspection_mode: str = "proxy",
                                http_scan: str = "enable",
                                ftp_scan: str = "enable", 
@@ -73,15 +74,15 @@ def fortigate_create_av_profile(device_id: str, name: str,
         if comments:
             profile_data["comment"] = comments
 
-        api = fortigate_manager.get_device(device_id)
-        result = api.create_av_profile(profile_data, vdom)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.create_av_profile(profile_data, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_delete_av_profile(device_id: str, profile_name: str, vdom: str = "root") -> str:
+async def fortigate_delete_av_profile(device_id: str, profile_name: str, vdom: str = "root") -> str:
     """
     Delete antivirus profile
 
@@ -94,9 +95,9 @@ def fortigate_delete_av_profile(device_id: str, profile_name: str, vdom: str = "
         Result of profile deletion
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        result = api.delete_av_profile(profile_name, vdom)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.delete_av_profile(profile_name, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
@@ -104,27 +105,28 @@ def fortigate_delete_av_profile(device_id: str, profile_name: str, vdom: str = "
 # === WEB FILTER PROFILES ===
 
 @mcp.tool()
-def fortigate_get_webfilter_profiles(device_id: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_webfilter_profiles(device_id: str, vdom: str = "root") -> str:
     """
     Get all web filter profiles
 
     Args:
         device_id: Device ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
 
     Returns:
         List of web filter profiles
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        profiles = api.get_webfilter_profiles(vdom)
-        return json.dumps(profiles, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        profiles = await api.get_webfilter_profiles(vdom)
+        return render(profiles)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_create_webfilter_profile(device_id: str, name: str,
+async def fortigate_create_webfilter_profile(device_id: str, name: str,
                                      inspection_mode: str = "proxy",
                                      https_replacemsg: str = "enable",
                                      log_all_url: str = "disable",
@@ -165,15 +167,15 @@ def fortigate_create_webfilter_profile(device_id: str, name: str,
         if comments:
             profile_data["comment"] = comments
 
-        api = fortigate_manager.get_device(device_id)
-        result = api.create_webfilter_profile(profile_data, vdom)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.create_webfilter_profile(profile_data, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_delete_webfilter_profile(device_id: str, profile_name: str, vdom: str = "root") -> str:
+async def fortigate_delete_webfilter_profile(device_id: str, profile_name: str, vdom: str = "root") -> str:
     """
     Delete web filter profile
 
@@ -186,9 +188,9 @@ def fortigate_delete_webfilter_profile(device_id: str, profile_name: str, vdom:
         Result of profile deletion
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        result = api.delete_webfilter_profile(profile_name, vdom)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.delete_webfilter_profile(profile_name, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
@@ -196,27 +198,28 @@ def fortigate_delete_webfilter_profile(device_id: str, profile_name: str, vdom:
 # === IPS SENSORS ===
 
 @mcp.tool()
-def fortigate_get_ips_sensors(device_id: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_ips_sensors(device_id: str, vdom: str = "root") -> str:
     """
     Get all IPS sensors
 
     Args:
         device_id: Device ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
 
     Returns:
         List of IPS sensors
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        sensors = api.get_ips_sensors(vdom)
-        return json.dumps(sensors, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        sensors = await api.get_ips_sensors(vdom)
+        return render(sensors)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_create_ips_sensor(device_id: str, name: str,
+async def fortigate_create_ips_sensor(device_id: str, name: str,
                               block_malicious_url: str = "enable",
                               scan_botnet_connections: str = "enable", 
                               extended_log: str = "disable",
@@ -248,15 +251,15 @@ def fortigate_create_ips_sensor(device_id: str, name: str,
         if comments:
             sensor_data["comment"] = comments
 
-        api = fortigate_manager.get_device(device_id)
-        result = api.create_ips_sensor(sensor_data, vdom)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.create_ips_sensor(sensor_data, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_delete_ips_sensor(device_id: str, sensor_name: str, vdom: str = "root") -> str:
+async def fortigate_delete_ips_sensor(device_id: str, sensor_name: str, vdom: str = "root") -> str:
     """
     Delete IPS sensor
 
@@ -269,9 +272,9 @@ def fortigate_delete_ips_sensor(device_id: str, sensor_name: str, vdom: str = "r
         Result of sensor deletion
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        result = api.delete_ips_sensor(sensor_name, vdom)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.delete_ips_sensor(sensor_name, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
@@ -279,27 +282,28 @@ def fortigate_delete_ips_sensor(device_id: str, sensor_name: str, vdom: str = "r
 # === SSL/SSH INSPECTION PROFILES ===
 
 @mcp.tool()
-def fortigate_get_ssl_ssh_profiles(device_id: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_ssl_ssh_profiles(device_id: str, vdom: str = "root") -> str:
     """
     Get all SSL/SSH inspection profiles
 
     Args:
         device_id: Device ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
 
     Returns:
         List of SSL/SSH inspection profiles
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        profiles = api.get_ssl_ssh_profiles(vdom)
-        return json.dumps(profiles, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        profiles = await api.get_ssl_ssh_profiles(vdom)
+        return render(profiles)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_create_ssl_ssh_profile(device_id: str, name: str,
+async def fortigate_create_ssl_ssh_profile(device_id: str, name: str,
                                    ssl_inspect_all: str = "disable",
                                    https_inspection: str = "disable",
                                    ftps_inspection: str = "disable",
@@ -357,15 +361,15 @@ def fortigate_create_ssl_ssh_profile(device_id: str, name: str,
         if comments:
             profile_data["comment"] = comments
 
-        api = fortigate_manager.get_device(device_id)
-        result = api.create_ssl_ssh_profile(profile_data, vdom)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.create_ssl_ssh_profile(profile_data, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_delete_ssl_ssh_profile(device_id: str, profile_name: str, vdom: str = "root") -> str:
+async def fortigate_delete_ssl_ssh_profile(device_id: str, profile_name: str, vdom: str = "root") -> str:
     """
     Delete SSL/SSH inspection profile
 
@@ -378,9 +382,9 @@ def fortigate_delete_ssl_ssh_profile(device_id: str, profile_name: str, vdom: st
         Result of profile deletion
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        result = api.delete_ssl_ssh_profile(profile_name, vdom)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.delete_ssl_ssh_profile(profile_name, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
@@ -388,27 +392,28 @@ def fortigate_delete_ssl_ssh_profile(device_id: str, profile_name: str, vdom: st
 # === DNS FILTER PROFILES ===
 
 @mcp.tool()
-def fortigate_get_dnsfilter_profiles(device_id: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_dnsfilter_profiles(device_id: str, vdom: str = "root") -> str:
     """
     Get all DNS filter profiles
 
     Args:
         device_id: Device ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
 
     Returns:
         List of DNS filter profiles
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        profiles = api.get_dnsfilter_profiles(vdom)
-        return json.dumps(profiles, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        profiles = await api.get_dnsfilter_profiles(vdom)
+        return render(profiles)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_create_dnsfilter_profile(device_id: str, name: str,
+async def fortigate_create_dnsfilter_profile(device_id: str, name: str,
                                      block_action: str = "block",
                                      log_all_domain: str = "disable",
                                      safe_search: str = "disable",
@@ -443,15 +448,15 @@ def fortigate_create_dnsfilter_profile(device_id: str, name: str,
         if comments:
             profile_data["comment"] = comments
 
-        api = fortigate_manager.get_device(device_id)
-        result = api.create_dnsfilter_profile(profile_data, vdom)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.create_dnsfilter_profile(profile_data, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_delete_dnsfilter_profile(device_id: str, profile_name: str, vdom: str = "root") -> str:
+async def fortigate_delete_dnsfilter_profile(device_id: str, profile_name: str, vdom: str = "root") -> str:
     """
     Delete DNS filter profile
 
@@ -464,8 +469,8 @@ def fortigate_delete_dnsfilter_profile(device_id: str, profile_name: str, vdom:
         Result of profile deletion
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        result = api.delete_dnsfilter_profile(profile_name, vdom)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.delete_dnsfilter_profile(profile_name, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
\ No newline at end of file
@@ -0,0 +1,202 @@
+import asyncio
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Tuple
+
+from mcptool.base import mcp, fortigate_manager
+from mcptool.output import output_options, render
+from fortigate.fortigate import collect, logger
+from fortigate.flow_batch import simulate_file
+from fortigate.policy_engine import AddressBook, PolicyEngine
+
+# Directory fortigate_simulate_flow_file reads flow files from and writes results to, None disables the tool
+flow_dir: Optional[Path] = None
+
+# Compiled policy sets by (device ID, VDOM)
+_engines: Dict[Tuple[str, str], PolicyEngine] = {}
+# Address resolvers and the configuration revision they reflect, by (device ID, VDOM)
+_address_books: Dict[Tuple[str, str], Tuple[Optional[str], AddressBook]] = {}
+
+
+def configure_simulation(config: Dict = None):
+    """Applies the optional 'simulation' section of the configuration"""
+    global flow_dir
+    config = config or {}
+    flow_dir = Path(config['flow_dir']).resolve() if config.get('flow_dir') else None
+
+
+def _flow_file(path: str) -> str:
+    """Resolves a path relative to the flow directory, refusing paths outside it"""
+    if flow_dir is None:
+        raise ValueError("Flow files are disabled; set simulation.flow_dir in the configuration")
+    resolved = (flow_dir / path).resolve()
+    if not resolved.is_relative_to(flow_dir):
+        raise ValueError(f"{path} is outside the flow directory")
+    return str(resolved)
+
+
+async def address_book(device_id: str, vdom: str = 'root', refresh: bool = False) -> AddressBook:
+    """Returns the address resolver of a VDOM
+
+    When the device reports a new configuration revision the address, group
+    and VIP tables are fetched again, from the device since the new revision
+    drops the cached responses of older ones, and only the objects that
+    differ, and the groups above them, are resolved again.
+    """
+    api = fortigate_manager.get_async_device(device_id)
+    key = (device_id, vdom)
+    revision = await api.config_revision(vdom)
+    entry = _address_books.get(key)
+    if entry is not None and not refresh and (revision is None or revision == entry[0]):
+        return entry[1]
+    addresses, groups, vips = await asyncio.gather(
+        collect(api.iter_address_objects(vdom)),
+        api.get_address_groups(vdom),
+        api.get_vip_addresses(vdom)
+    )
+    if entry is None:
+        book = AddressBook(addresses, groups, vips)
+    else:
+        book = entry[1]
+        book.sync(addresses, groups, vips)
+    _address_books[key] = (revision, book)
+    return book
+
+
+async def _compile(device_id: str, api, vdom: str, refresh: bool = False) -> PolicyEngine:
+    """Fetches the tables a policy lookup depends on and compiles them
+
+    The revision is read first: a new one drops the cached responses read at
+    older revisions, so the tables come from the device, not from the cache.
+    """
+    revision = await api.config_revision(vdom)
+    book, policies, services, service_groups, zones, routes = await asyncio.gather(
+        address_book(device_id, vdom, refresh),
+        collect(api.iter_firewall_policies(vdom)),
+        api.get_service_objects(vdom),
+        api.get_service_groups(vdom),
+        api.get_zones(vdom),
+        api.get_routing_table(vdom)
+    )
+    return PolicyEngine(policies, services=services, service_groups=service_groups, zones=zones,
+                        routes=routes, revision=revision, address_book=book)
+
+
+async def policy_engine(device_id: str, vdom: str = 'root', refresh: bool = False) -> PolicyEngine:
+    """Returns the compiled policy set of a VDOM
+
+    It is recompiled when the device reports a new configuration revision.
+    When the device cannot be reached the last compiled set is used.
+    """
+    api = fortigate_manager.get_async_device(device_id)
+    key = (device_id, vdom)
+    engine = _engines.get(key)
+    if engine is not None and not refresh:
+        revision = await api.config_revision(vdom)
+        if revision is None or revision == engine.revision:
+            return engine
+    try:
+        engine = await _compile(device_id, api, vdom, refresh)
+    except Exception as e:
+        if key not in _engines:
+            raise
+        logger.warning("Recompiling policies of %s/%s failed (%s), using the last compiled set",
+                       device_id, vdom, e)
+        return _engines[key]
+    _engines[key] = engine
+    return engine
+
+
+# === POLICY SIMULATION ===
+@mcp.tool()
+async def fortigate_compile_policy_lookup(device_id: str, vdom: str = "root") -> str:
+    """
+    Compiles the firewall policies of a VDOM for offline policy lookups
+
+    Args:
+        device_id: Device ID
+        vdom: Target VDOM (default: root)
+
+    Returns:
+        Size of the compiled policy set, its configuration revision and compile time
+    """
+    try:
+        engine = await policy_engine(device_id, vdom, refresh=True)
+        return render(engine.stats())
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+
+@mcp.tool()
+@output_options
+async def fortigate_lookup_firewall_policies_offline(device_id: str, flows: List[Dict[str, Any]],
+                                                     vdom: str = "root") -> str:
+    """
+    Finds the policy matching each of many flows, using the compiled policy set
+
+    Args:
+        device_id: Device ID
+        flows: Flows with srcintf, source_ip, protocol, dest and optionally
+               source_port, dest_port, icmp_type, icmp_code, dstintf
+        vdom: Target VDOM (default: root)
+
+    Returns:
+        Matching policy per flow (exact: false when an earlier policy depends on
+        conditions only the device can evaluate) and counts per policy
+    """
+    try:
+        engine = await policy_engine(device_id, vdom)
+        started = time.perf_counter()
+        results = []
+        for flow in flows:
+            try:
+                results.append(engine.lookup(**flow))
+            except (TypeError, ValueError) as e:
+                results.append({'error': str(e)})
+        policies = Counter(str(result['policy_id']) for result in results if 'policy_id' in result)
+        return render({
+            'results': results,
+            'summary': {
+                'flows': len(flows),
+                'policies': dict(policies.most_common()),
+                'inexact': sum(1 for result in results if result.get('exact') is False),
+                'errors': sum(1 for result in results if 'error' in result),
+                'revision': engine.revision,
+                'elapsed_ms': round((time.perf_counter() - started) * 1000, 2),
+            }
+        })
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+
+@mcp.tool()
+@output_options
+async def fortigate_simulate_flow_file(device_id: str, path: str, vdom: str = "root",
+                                       output_path: Optional[str] = None) -> str:
+    """
+    Finds the policy matching every flow of a CSV or NDJSON file, using the compiled policy set
+
+    Args:
+        device_id: Device ID
+        path: File in the configured flow directory (simulation.flow_dir), NDJSON
+              (.ndjson/.jsonl) or CSV with a header row, with srcintf, source_ip (or src),
+              dest (or dst), protocol (or proto) and optionally source_port (sport),
+              dest_port (dport), dstintf
+        vdom: Target VDOM (default: root)
+        output_path: CSV file in the flow directory receiving flow number, policy ID and
+                     exact flag of each flow (default: <path>.policies.csv)
+
+    Returns:
+        Flow counts per policy, implicit deny, inexact and unparsable flows, and throughput
+    """
+    try:
+        path = _flow_file(path)
+        output_path = _flow_file(output_path or f"{path}.policies.csv")
+        engine = await policy_engine(device_id, vdom)
+        # Millions of flows take seconds: keep the event loop free
+        result = await asyncio.to_thread(simulate_file, engine, path, output_path)
+        result['output_path'] = str(Path(output_path).relative_to(flow_dir))
+        return render(result)
+    except Exception as e:
+        return f"Error: {str(e)}"
@@ -1,12 +1,13 @@
-import json
 from typing import Dict, List, Optional, Any
 
 from mcptool.base import mcp, fortigate_manager
+from mcptool.output import next_page, output_options, page_size_option, render
 
 # === CONFIGURATION MANAGEMENT ===
 
 @mcp.tool()
-def fortigate_backup_config(device_id: str, scope: str = "global") -> str:
+@output_options
+async def fortigate_backup_config(device_id: str, scope: str = "global") -> str:
     """
     Backup FortiGate configuration
 
@@ -18,15 +19,15 @@ def fortigate_backup_config(device_id: str, scope: str = "global") -> str:
         Configuration backup data
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        backup = api.backup_config(scope)
-        return json.dumps(backup, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        backup = await api.backup_config(scope)
+        return render(backup)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_restore_config(device_id: str, config_data: str) -> str:
+async def fortigate_restore_config(device_id: str, config_data: str) -> str:
     """
     Restore FortiGate configuration
 
@@ -38,9 +39,9 @@ def fortigate_restore_config(device_id: str, config_data: str) -> str:
         Result of configuration restore
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        result = api.restore_config(config_data)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.restore_config(config_data)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
@@ -48,68 +49,79 @@ def fortigate_restore_config(device_id: str, config_data: str) -> str:
 # === SYSTEM MONITORING ===
 
 @mcp.tool()
-def fortigate_get_system_performance(device_id: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_system_performance(device_id: str, vdom: str = "root") -> str:
     """
     Get system performance metrics
 
     Args:
         device_id: Device ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
 
     Returns:
         System performance data (CPU, memory, disk usage)
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        performance = api.get_system_performance(vdom)
-        return json.dumps(performance, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        performance = await api.get_system_performance(vdom)
+        return render(performance)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_get_bandwidth_usage(device_id: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_bandwidth_usage(device_id: str, vdom: str = "root") -> str:
     """
     Get bandwidth usage statistics
 
     Args:
         device_id: Device ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
 
     Returns:
         Bandwidth usage statistics by interface
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        bandwidth = api.get_bandwidth_usage(vdom)
-        return json.dumps(bandwidth, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        bandwidth = await api.get_bandwidth_usage(vdom)
+        return render(bandwidth)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_get_session_table(device_id: str, count: int = 100, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_session_table(device_id: str, count: int = 100, vdom: str = "root",
+                                      page_size: Optional[int] = None, cursor: Optional[str] = None) -> str:
     """
     Get active session table
 
     Args:
         device_id: Device ID
         count: Number of sessions to retrieve (default: 100)
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
+        page_size: Records per page, 0 for all at once (optional, default: 500)
+        cursor: next_cursor of the previous page, to read the next page (optional)
 
     Returns:
         Active firewall sessions
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        sessions = api.get_session_table(count, vdom)
-        return json.dumps(sessions, indent=2)
+        if cursor:
+            # Later pages come from the snapshot taken by the first call
+            return next_page(cursor)
+        api = fortigate_manager.get_async_device(device_id)
+        # Stream-decode the table instead of buffering the whole response body
+        sessions = await api.per_vdom(vdom, lambda name: api.iter_session_table(name, limit=count))
+        return render(sessions, page_size=page_size_option(page_size))
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_get_disk_usage(device_id: str) -> str:
+@output_options
+async def fortigate_get_disk_usage(device_id: str) -> str:
     """
     Get disk usage information
 
@@ -120,9 +132,9 @@ def fortigate_get_disk_usage(device_id: str) -> str:
         Disk usage statistics
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        disk_usage = api.get_disk_usage()
-        return json.dumps(disk_usage, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        disk_usage = await api.get_disk_usage()
+        return render(disk_usage)
     except Exception as e:
         return f"Error: {str(e)}"
 
@@ -130,7 +142,8 @@ def fortigate_get_disk_usage(device_id: str) -> str:
 # === LICENSE AND FIRMWARE ===
 
 @mcp.tool()
-def fortigate_get_license_info(device_id: str) -> str:
+@output_options
+async def fortigate_get_license_info(device_id: str) -> str:
     """
     Get license information
 
@@ -141,15 +154,16 @@ def fortigate_get_license_info(device_id: str) -> str:
         License status and details
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        license_info = api.get_license_info()
-        return json.dumps(license_info, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        license_info = await api.get_license_info()
+        return render(license_info)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_get_firmware_info(device_id: str) -> str:
+@output_options
+async def fortigate_get_firmware_info(device_id: str) -> str:
     """
     Get firmware information
 
@@ -160,9 +174,9 @@ def fortigate_get_firmware_info(device_id: str) -> str:
         Current firmware version and build information
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        firmware_info = api.get_firmware_info()
-        return json.dumps(firmware_info, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        firmware_info = await api.get_firmware_info()
+        return render(firmware_info)
     except Exception as e:
         return f"Error: {str(e)}"
 
@@ -170,7 +184,8 @@ def fortigate_get_firmware_info(device_id: str) -> str:
 # === LOGGING ===
 
 @mcp.tool()
-def fortigate_get_system_logs(device_id: str, lines: int = 100, 
+@output_options
+async def fortigate_get_system_logs(device_id: str, lines: int = 100, 
                             level: str = "information") -> str:
     """
     Get system logs
@@ -184,51 +199,53 @@ def fortigate_get_system_logs(device_id: str, lines: int = 100,
         System log entries
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        logs = api.get_system_logs(lines, level)
-        return json.dumps(logs, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        logs = await api.get_system_logs(lines, level)
+        return render(logs)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_get_traffic_logs(device_id: str, count: int = 100, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_traffic_logs(device_id: str, count: int = 100, vdom: str = "root") -> str:
     """
     Get traffic logs
 
     Args:
         device_id: Device ID
         count: Number of log entries to retrieve (default: 100)
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
 
     Returns:
         Traffic log entries
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        logs = api.get_traffic_logs(count, vdom)
-        return json.dumps(logs, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        logs = await api.get_traffic_logs(count, vdom)
+        return render(logs)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_get_security_logs(device_id: str, count: int = 100, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_security_logs(device_id: str, count: int = 100, vdom: str = "root") -> str:
     """
     Get security/attack logs
 
     Args:
         device_id: Device ID
         count: Number of log entries to retrieve (default: 100)
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
 
     Returns:
         Security log entries (attacks, intrusions, malware)
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        logs = api.get_security_logs(count, vdom)
-        return json.dumps(logs, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        logs = await api.get_security_logs(count, vdom)
+        return render(logs)
     except Exception as e:
         return f"Error: {str(e)}"
 
@@ -236,7 +253,7 @@ def fortigate_get_security_logs(device_id: str, count: int = 100, vdom: str = "r
 # === SYSTEM OPERATIONS ===
 
 @mcp.tool()
-def fortigate_reboot_system(device_id: str, 
+async def fortigate_reboot_system(device_id: str, 
                           event_log_message: str = "System reboot via API") -> str:
     """
     Reboot FortiGate system
@@ -249,15 +266,15 @@ def fortigate_reboot_system(device_id: str,
         Result of reboot operation
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        result = api.reboot_system(event_log_message)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.reboot_system(event_log_message)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_shutdown_system(device_id: str,
+async def fortigate_shutdown_system(device_id: str,
                             event_log_message: str = "System shutdown via API") -> str:
     """
     Shutdown FortiGate system
@@ -270,8 +287,8 @@ def fortigate_shutdown_system(device_id: str,
         Result of shutdown operation
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        result = api.shutdown_system(event_log_message)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.shutdown_system(event_log_message)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
\ No newline at end of file
@@ -1,12 +1,13 @@
-import json
 from typing import Dict, List, Optional, Any
 
 from mcptool.base import mcp, fortigate_manager
+from mcptool.output import output_options, render
 
 # === DEVICE MANAGEMENT ===
 
 @mcp.tool()
-def fortigate_get_system_status(device_id: str) -> str:
+@output_options
+async def fortigate_get_system_status(device_id: str) -> str:
     """
     Gets Fortigate system status
 
@@ -14,15 +15,16 @@ def fortigate_get_system_status(device_id: str) -> str:
         device_id: Device ID
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        status = api.get_system_status()
-        return json.dumps(status, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        status = await api.get_system_status()
+        return render(status)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_get_vdoms(device_id: str) -> str:
+@output_options
+async def fortigate_get_vdoms(device_id: str) -> str:
     """
     Lists all VDOMs of a device
 
@@ -30,9 +32,42 @@ def fortigate_get_vdoms(device_id: str) -> str:
         device_id: Device ID
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        vdoms = api.get_vdoms()
-        return json.dumps(vdoms, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        vdoms = await api.get_vdoms()
+        return render(vdoms)
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+
+@mcp.tool()
+@output_options
+def fortigate_get_client_stats(device_id: str) -> str:
+    """
+    Gets client-side statistics for a device (cache, request coalescing, connection reuse)
+
+    Args:
+        device_id: Device ID
+    """
+    try:
+        api = fortigate_manager.get_async_device(device_id)
+        return render(api.client_stats())
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+
+@mcp.tool()
+def fortigate_clear_cache(device_id: str, vdom: Optional[str] = None) -> str:
+    """
+    Drops cached configuration reads of a device
+
+    Args:
+        device_id: Device ID
+        vdom: Only clear this VDOM (default: all VDOMs)
+    """
+    try:
+        api = fortigate_manager.get_async_device(device_id)
+        api.cache.invalidate(vdom=vdom)
+        return f"Cache of device {device_id} cleared"
     except Exception as e:
         return f"Error: {str(e)}"
 
@@ -40,41 +75,43 @@ def fortigate_get_vdoms(device_id: str) -> str:
 # === SERVICE MANAGEMENT ===
 
 @mcp.tool()
-def fortigate_get_service_objects(device_id: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_service_objects(device_id: str, vdom: str = "root") -> str:
     """
     Gets configured service objects
 
     Args:
         device_id: Device ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        services = api.get_service_objects(vdom)
-        return json.dumps(services, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        services = await api.get_service_objects(vdom)
+        return render(services)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_get_interfaces(device_id: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_interfaces(device_id: str, vdom: str = "root") -> str:
     """
     Gets configured interfaces
 
     Args:
         device_id: Device ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        interfaces = api.get_interfaces(vdom)
-        return json.dumps(interfaces, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        interfaces = await api.get_interfaces(vdom)
+        return render(interfaces)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_configure_interface(device_id: str,
+async def fortigate_configure_interface(device_id: str,
     name: str,
     ip: str,
     allowaccess: str,
@@ -93,20 +130,20 @@ def fortigate_configure_interface(device_id: str,
         The result of the interface configuration.
     """
     try:
-        api = fortigate_manager.get_device(device_id)
+        api = fortigate_manager.get_async_device(device_id)
         data = {
             "name": name,
             "ip": ip,
             "allowaccess": allowaccess,
         }
-        result = api.configure_interface(name, data, vdom)
-        return json.dumps(result, indent=2)
+        result = await api.configure_interface(name, data, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_create_vlan(device_id: str,
+async def fortigate_create_vlan(device_id: str,
     name: str,
     interface: str,
     vlanid: int,
@@ -129,7 +166,7 @@ def fortigate_create_vlan(device_id: str,
         The result of the VLAN creation.
     """
     try:
-        api = fortigate_manager.get_device(device_id)
+        api = fortigate_manager.get_async_device(device_id)
         data = {
             "name": name,
             "interface": interface,
@@ -137,8 +174,8 @@ def fortigate_create_vlan(device_id: str,
             "ip": ip,
             "allowaccess": allowaccess,
         }
-        result = api.create_vlan(data, vdom)
-        return json.dumps(result, indent=2)
+        result = await api.create_vlan(data, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
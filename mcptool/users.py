@@ -1,32 +1,40 @@
-import json
 from typing import Dict, List, Optional, Any
 
 from mcptool.base import mcp, fortigate_manager
+from mcptool.output import next_page, output_options, page_size_option, render
 
 # === LOCAL USERS ===
 
 @mcp.tool()
-def fortigate_get_local_users(device_id: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_local_users(device_id: str, vdom: str = "root",
+                                    page_size: Optional[int] = None, cursor: Optional[str] = None) -> str:
     """
     Get all local users
 
     Args:
         device_id: Device ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
+        page_size: Records per page, 0 for all at once (optional, default: 500)
+        cursor: next_cursor of the previous page, to read the next page (optional)
 
     Returns:
         List of local users
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        users = api.get_local_users(vdom)
-        return json.dumps(users, indent=2)
+        if cursor:
+            # Later pages come from the snapshot taken by the first call
+            return next_page(cursor)
+        api = fortigate_manager.get_async_device(device_id)
+        # Stream-decode the table instead of buffering the whole response body
+        users = await api.per_vdom(vdom, api.iter_local_users)
+        return render(users, page_size=page_size_option(page_size))
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_create_local_user(device_id: str, name: str, password: str,
+async def fortigate_create_local_user(device_id: str, name: str, password: str,
                                type: str = "password",
                                status: str = "enable",
                                email_to: Optional[str] = None,
@@ -69,15 +77,15 @@ def fortigate_create_local_user(device_id: str, name: str, password: str,
         if comments:
             user_data["comment"] = comments
 
-        api = fortigate_manager.get_device(device_id)
-        result = api.create_local_user(user_data, vdom)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.create_local_user(user_data, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_update_local_user(device_id: str, username: str,
+async def fortigate_update_local_user(device_id: str, username: str,
                                password: Optional[str] = None,
                                type: Optional[str] = None,
                                status: Optional[str] = None,
@@ -125,15 +133,15 @@ def fortigate_update_local_user(device_id: str, username: str,
         if not user_data:
             return "Error: No fields provided to update"
 
-        api = fortigate_manager.get_device(device_id)
-        result = api.update_local_user(username, user_data, vdom)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.update_local_user(username, user_data, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_delete_local_user(device_id: str, username: str, vdom: str = "root") -> str:
+async def fortigate_delete_local_user(device_id: str, username: str, vdom: str = "root") -> str:
     """
     Delete local user
 
@@ -146,9 +154,9 @@ def fortigate_delete_local_user(device_id: str, username: str, vdom: str = "root
         Result of user deletion
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        result = api.delete_local_user(username, vdom)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.delete_local_user(username, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
@@ -156,27 +164,28 @@ def fortigate_delete_local_user(device_id: str, username: str, vdom: str = "root
 # === USER GROUPS ===
 
 @mcp.tool()
-def fortigate_get_user_groups(device_id: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_user_groups(device_id: str, vdom: str = "root") -> str:
     """
     Get all user groups
 
     Args:
         device_id: Device ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
 
     Returns:
         List of user groups
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        groups = api.get_user_groups(vdom)
-        return json.dumps(groups, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        groups = await api.get_user_groups(vdom)
+        return render(groups)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_create_user_group(device_id: str, name: str,
+async def fortigate_create_user_group(device_id: str, name: str,
                                auth_concurrent_override: str = "disable",
                                auth_concurrent_value: int = 0,
                                authtimeout: int = 0,
@@ -220,15 +229,15 @@ def fortigate_create_user_group(device_id: str, name: str,
         if members:
             group_data["member"] = [{"name": member} for member in members]
 
-        api = fortigate_manager.get_device(device_id)
-        result = api.create_user_group(group_data, vdom)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.create_user_group(group_data, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_delete_user_group(device_id: str, group_name: str, vdom: str = "root") -> str:
+async def fortigate_delete_user_group(device_id: str, group_name: str, vdom: str = "root") -> str:
     """
     Delete user group
 
@@ -241,9 +250,9 @@ def fortigate_delete_user_group(device_id: str, group_name: str, vdom: str = "ro
         Result of group deletion
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        result = api.delete_user_group(group_name, vdom)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.delete_user_group(group_name, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
@@ -251,27 +260,28 @@ def fortigate_delete_user_group(device_id: str, group_name: str, vdom: str = "ro
 # === AUTHENTICATION SERVERS ===
 
 @mcp.tool()
-def fortigate_get_ldap_servers(device_id: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_ldap_servers(device_id: str, vdom: str = "root") -> str:
     """
     Get all LDAP authentication servers
 
     Args:
         device_id: Device ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
 
     Returns:
         List of LDAP servers
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        servers = api.get_auth_servers(vdom)
-        return json.dumps(servers, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        servers = await api.get_auth_servers(vdom)
+        return render(servers)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_create_ldap_server(device_id: str, name: str, server: str,
+async def fortigate_create_ldap_server(device_id: str, name: str, server: str,
                                 dn: str,
                                 cnid: str = "cn",
                                 type: str = "simple",
@@ -319,15 +329,15 @@ def fortigate_create_ldap_server(device_id: str, name: str, server: str,
         if comments:
             server_data["comment"] = comments
 
-        api = fortigate_manager.get_device(device_id)
-        result = api.create_ldap_server(server_data, vdom)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.create_ldap_server(server_data, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_delete_ldap_server(device_id: str, server_name: str, vdom: str = "root") -> str:
+async def fortigate_delete_ldap_server(device_id: str, server_name: str, vdom: str = "root") -> str:
     """
     Delete LDAP authentication server
 
@@ -340,35 +350,36 @@ def fortigate_delete_ldap_server(device_id: str, server_name: str, vdom: str = "
         Result of server deletion
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        result = api.delete_ldap_server(server_name, vdom)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.delete_ldap_server(server_name, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_get_radius_servers(device_id: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_radius_servers(device_id: str, vdom: str = "root") -> str:
     """
     Get all RADIUS authentication servers
 
     Args:
         device_id: Device ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
 
     Returns:
         List of RADIUS servers
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        servers = api.get_radius_servers(vdom)
-        return json.dumps(servers, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        servers = await api.get_radius_servers(vdom)
+        return render(servers)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_create_radius_server(device_id: str, name: str, server: str,
+async def fortigate_create_radius_server(device_id: str, name: str, server: str,
                                   secret: str,
                                   auth_type: str = "auto",
                                   port: int = 1812,
@@ -415,15 +426,15 @@ def fortigate_create_radius_server(device_id: str, name: str, server: str,
         if comments:
             server_data["comment"] = comments
 
-        api = fortigate_manager.get_device(device_id)
-        result = api.create_radius_server(server_data, vdom)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.create_radius_server(server_data, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_delete_radius_server(device_id: str, server_name: str, vdom: str = "root") -> str:
+async def fortigate_delete_radius_server(device_id: str, server_name: str, vdom: str = "root") -> str:
     """
     Delete RADIUS authentication server
 
@@ -436,8 +447,8 @@ def fortigate_delete_radius_server(device_id: str, server_name: str, vdom: str =
         Result of server deletion
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        result = api.delete_radius_server(server_name, vdom)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.delete_radius_server(server_name, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
\ No newline at end of file
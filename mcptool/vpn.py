@@ -1,32 +1,33 @@
-import json
 from typing import Dict, List, Optional, Any
 
 from mcptool.base import mcp, fortigate_manager
+from mcptool.output import output_options, render
 
 # === IPSEC VPN ===
 
 @mcp.tool()
-def fortigate_get_ipsec_phase1(device_id: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_ipsec_phase1(device_id: str, vdom: str = "root") -> str:
     """
     Get all IPSec phase 1 configurations
 
     Args:
         device_id: Device ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
 
     Returns:
         List of IPSec phase 1 configurations
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        phase1 = api.get_ipsec_phase1(vdom)
-        return json.dumps(phase1, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        phase1 = await api.get_ipsec_phase1(vdom)
+        return render(phase1)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_create_ipsec_phase1(device_id: str, name: str, interface: str,
+async def fortigate_create_ipsec_phase1(device_id: str, name: str, interface: str,
                                  remote_gw: str, psk: str,
                                  proposal: str = "aes128-sha256 aes256-sha256",
                                  dhgrp: str = "14 5",
@@ -77,15 +78,15 @@ def fortigate_create_ipsec_phase1(device_id: str, name: str, interface: str,
         if comments:
             phase1_data["comments"] = comments
 
-        api = fortigate_manager.get_device(device_id)
-        result = api.create_ipsec_phase1(phase1_data, vdom)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.create_ipsec_phase1(phase1_data, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_delete_ipsec_phase1(device_id: str, interface_name: str, vdom: str = "root") -> str:
+async def fortigate_delete_ipsec_phase1(device_id: str, interface_name: str, vdom: str = "root") -> str:
     """
     Delete IPSec phase 1 interface
 
@@ -98,35 +99,36 @@ def fortigate_delete_ipsec_phase1(device_id: str, interface_name: str, vdom: str
         Result of phase 1 deletion
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        result = api.delete_ipsec_phase1(interface_name, vdom)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.delete_ipsec_phase1(interface_name, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_get_ipsec_phase2(device_id: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_ipsec_phase2(device_id: str, vdom: str = "root") -> str:
     """
     Get all IPSec phase 2 configurations
 
     Args:
         device_id: Device ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
 
     Returns:
         List of IPSec phase 2 configurations
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        phase2 = api.get_ipsec_phase2(vdom)
-        return json.dumps(phase2, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        phase2 = await api.get_ipsec_phase2(vdom)
+        return render(phase2)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_create_ipsec_phase2(device_id: str, name: str, phase1name: str,
+async def fortigate_create_ipsec_phase2(device_id: str, name: str, phase1name: str,
                                  proposal: str = "aes128-sha1 aes256-sha256",
                                  dhgrp: str = "14 5",
                                  pfs: str = "enable",
@@ -172,15 +174,15 @@ def fortigate_create_ipsec_phase2(device_id: str, name: str, phase1name: str,
         if comments:
             phase2_data["comments"] = comments
 
-        api = fortigate_manager.get_device(device_id)
-        result = api.create_ipsec_phase2(phase2_data, vdom)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.create_ipsec_phase2(phase2_data, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_delete_ipsec_phase2(device_id: str, interface_name: str, vdom: str = "root") -> str:
+async def fortigate_delete_ipsec_phase2(device_id: str, interface_name: str, vdom: str = "root") -> str:
     """
     Delete IPSec phase 2 interface
 
@@ -193,29 +195,30 @@ def fortigate_delete_ipsec_phase2(device_id: str, interface_name: str, vdom: str
         Result of phase 2 deletion
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        result = api.delete_ipsec_phase2(interface_name, vdom)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.delete_ipsec_phase2(interface_name, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_get_ipsec_tunnel_status(device_id: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_ipsec_tunnel_status(device_id: str, vdom: str = "root") -> str:
     """
     Get IPSec tunnel status
 
     Args:
         device_id: Device ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
 
     Returns:
         IPSec tunnel status information
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        status = api.get_ipsec_tunnels_status(vdom)
-        return json.dumps(status, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        status = await api.get_ipsec_tunnels_status(vdom)
+        return render(status)
     except Exception as e:
         return f"Error: {str(e)}"
 
@@ -223,27 +226,28 @@ def fortigate_get_ipsec_tunnel_status(device_id: str, vdom: str = "root") -> str
 # === SSL VPN ===
 
 @mcp.tool()
-def fortigate_get_ssl_vpn_settings(device_id: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_ssl_vpn_settings(device_id: str, vdom: str = "root") -> str:
     """
     Get SSL VPN settings
 
     Args:
         device_id: Device ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
 
     Returns:
         SSL VPN settings
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        settings = api.get_ssl_vpn_settings(vdom)
-        return json.dumps(settings, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        settings = await api.get_ssl_vpn_settings(vdom)
+        return render(settings)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_update_ssl_vpn_settings(device_id: str,
+async def fortigate_update_ssl_vpn_settings(device_id: str,
                                     status: Optional[str] = None,
                                     port: Optional[int] = None,
                                     source_interface: Optional[List[str]] = None,
@@ -302,35 +306,36 @@ def fortigate_update_ssl_vpn_settings(device_id: str,
         if not settings_data:
             return "Error: No settings provided to update"
 
-        api = fortigate_manager.get_device(device_id)
-        result = api.update_ssl_vpn_settings(settings_data, vdom)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.update_ssl_vpn_settings(settings_data, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_get_ssl_vpn_portals(device_id: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_ssl_vpn_portals(device_id: str, vdom: str = "root") -> str:
     """
     Get SSL VPN portals
 
     Args:
         device_id: Device ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
 
     Returns:
         List of SSL VPN portals
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        portals = api.get_ssl_vpn_portals(vdom)
-        return json.dumps(portals, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        portals = await api.get_ssl_vpn_portals(vdom)
+        return render(portals)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_create_ssl_vpn_portal(device_id: str, name: str,
+async def fortigate_create_ssl_vpn_portal(device_id: str, name: str,
                                   tunnel_mode: str = "enable",
                                   web_mode: str = "enable",
                                   ip_pools: Optional[List[str]] = None,
@@ -381,15 +386,15 @@ def fortigate_create_ssl_vpn_portal(device_id: str, name: str,
         if comments:
             portal_data["comment"] = comments
 
-        api = fortigate_manager.get_device(device_id)
-        result = api.create_ssl_vpn_portal(portal_data, vdom)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.create_ssl_vpn_portal(portal_data, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_delete_ssl_vpn_portal(device_id: str, portal_name: str, vdom: str = "root") -> str:
+async def fortigate_delete_ssl_vpn_portal(device_id: str, portal_name: str, vdom: str = "root") -> str:
     """
     Delete SSL VPN portal
 
@@ -402,29 +407,30 @@ def fortigate_delete_ssl_vpn_portal(device_id: str, portal_name: str, vdom: str
         Result of portal deletion
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        result = api.delete_ssl_vpn_portal(portal_name, vdom)
-        return json.dumps(result, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        result = await api.delete_ssl_vpn_portal(portal_name, vdom)
+        return render(result)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
 @mcp.tool()
-def fortigate_get_ssl_vpn_status(device_id: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_ssl_vpn_status(device_id: str, vdom: str = "root") -> str:
     """
     Get SSL VPN status
 
     Args:
         device_id: Device ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
 
     Returns:
         SSL VPN status information
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        status = api.get_ssl_vpn_status(vdom)
-        return json.dumps(status, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        status = await api.get_ssl_vpn_status(vdom)
+        return render(status)
     except Exception as e:
         return f"Error: {str(e)}"
 
@@ -432,20 +438,21 @@ def fortigate_get_ssl_vpn_status(device_id: str, vdom: str = "root") -> str:
 # === VPN CERTIFICATES ===
 
 @mcp.tool()
-def fortigate_get_vpn_certificates(device_id: str, vdom: str = "root") -> str:
+@output_options
+async def fortigate_get_vpn_certificates(device_id: str, vdom: str = "root") -> str:
     """
     Get VPN certificates
 
     Args:
         device_id: Device ID
-        vdom: Target VDOM (default: root)
+        vdom: Target VDOM, several as 'vdom1,vdom2' or '*' for all (default: root)
 
     Returns:
         List of VPN certificates
     """
     try:
-        api = fortigate_manager.get_device(device_id)
-        certificates = api.get_vpn_certificates(vdom)
-        return json.dumps(certificates, indent=2)
+        api = fortigate_manager.get_async_device(device_id)
+        certificates = await api.get_vpn_certificates(vdom)
+        return render(certificates)
     except Exception as e:
         return f"Error: {str(e)}"
\ No newline at end of file
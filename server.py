@@ -1,15 +1,31 @@
 import yaml
 import sys
 import os
+import logging
 from pathlib import Path
 
 from mcptool import fortigate_manager, mcp
+from mcptool.output import configure_output
+from mcptool.history import configure_hit_sampler
+from mcptool.simulation import configure_simulation
+from fortigate import codec
+from fortigate.fortigate import logger, request_log
 
 # Fix the import path
 sys.path.append(str(Path(__file__).parent))
 
 
 
+def configure_logging(log_config):
+	"""Apply the optional 'logging' section of the configuration"""
+	logger.setLevel(str(log_config.get('level', 'INFO')).upper())
+	request_log.configure(
+		max_body=log_config.get('max_body'),
+		sample_rate=log_config.get('sample_rate'),
+		endpoint_levels=log_config.get('endpoints')
+	)
+
+
 def load_config(config_file="config.yaml"):
 	"""Load configuration from YAML file"""
 	try:
@@ -22,6 +38,12 @@ def load_config(config_file="config.yaml"):
 		with open(config_path, 'r') as f:
 			config = yaml.safe_load(f)
 
+		configure_logging(config.get('logging') or {})
+		codec.configure(config.get('json_codec', 'auto'))
+		fortigate_manager.configure_fleet(**(config.get('fleet') or {}))
+		configure_output(config.get('output') or {})
+		configure_simulation(config.get('simulation') or {})
+
 		# Load devices from configuration
 		devices_loaded = 0
 		for device_id, device_config in config.get('devices', {}).items():
@@ -30,7 +52,13 @@ def load_config(config_file="config.yaml"):
 					device_id=device_id,
 					host=device_config['host'],
 					token=device_config['token'],
-					vdoms=device_config.get('vdoms', ['root'])
+					vdoms=device_config.get('vdoms', ['root']),
+					cache=device_config.get('cache'),
+					connection=device_config.get('connection'),
+					limits=device_config.get('limits'),
+					retry=device_config.get('retry'),
+					circuit_breaker=device_config.get('circuit_breaker'),
+					timeouts=device_config.get('timeouts')
 				)
 				print(f"✅ Loaded device: {device_id} - {device_config.get('description', device_config['host'])}")
 				devices_loaded += 1
@@ -38,6 +66,7 @@ def load_config(config_file="config.yaml"):
 				print(f"❌ Error loading device {device_id}: {e}")
 
 		print(f"📡 Loaded {devices_loaded} devices successfully")
+		configure_hit_sampler(config.get('hit_sampler') or {})
 
 	except yaml.YAMLError as e:
 		print(f"❌ Error parsing config file: {e}")
@@ -46,6 +75,7 @@ def load_config(config_file="config.yaml"):
 
 
 def main():
+	logging.basicConfig(level=logging.INFO)
 	print("🚀 Starting Fortigate MCP Server with FastMCP...")
 	print("=" * 50)
 
@@ -62,6 +92,7 @@ def main():
 	print("  - Advanced Features: HA, SD-WAN, FortiView, threat dashboard")
 	print("  - Network Objects: address/service objects, VIPs")
 	print("  - Routing: static routes, routing tables, interfaces")
+	print("  - Fleet: system status, policies and tunnels across devices")
 	print("=" * 50)
 	print("📡 Server ready - connect your MCP client!")
 
@@ -0,0 +1,74 @@
+import pytest
+
+
+class Clock:
+    """Stands in for time.monotonic, the tests move it forward by hand"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock_of(monkeypatch):
+    """Returns a function patching time.monotonic in the modules given with one Clock"""
+
+    def install(*modules) -> Clock:
+        clock = Clock()
+        for module in modules:
+            monkeypatch.setattr(module.time, 'monotonic', clock)
+        return clock
+
+    return install
+
+
+class FakeDevice:
+    """Serves tables over an httpx MockTransport, at a config revision the tests change by hand
+
+    Tables are keyed by endpoint (e.g. 'cmdb/firewall/address'), missing ones
+    read as empty, and are paged with start and count like FortiOS. Endpoints in failures answer with that HTTP status, or
+    with the status a function of the request returns, if any.
+    """
+
+    def __init__(self, revision: str = '1', **tables):
+        self.revision = revision
+        self.tables = tables
+        self.failures = {}
+        self.requests = []
+
+    def handler(self, request):
+        import httpx
+
+        endpoint = request.url.path.split('/api/v2/', 1)[1].strip('/')
+        self.requests.append((endpoint, request.url.params))
+        status = self.failures.get(endpoint)
+        if callable(status):
+            status = status(request)
+        if status is not None:
+            return httpx.Response(status, json={'status': 'error'})
+        results = self.tables.get(endpoint, [])
+        if 'start' in request.url.params:
+            start = int(request.url.params['start'])
+            results = results[start:start + int(request.url.params['count'])]
+        return httpx.Response(200, json={'revision': self.revision, 'results': results})
+
+    def api(self, **options):
+        import httpx
+        from fortigate.fortigate import AsyncFortigateAPI
+
+        api = AsyncFortigateAPI('fw.example.com', 'token', **options)
+        api.client = httpx.AsyncClient(headers=api.client.headers, transport=httpx.MockTransport(self.handler))
+        return api
+
+
+@pytest.fixture
+def device():
+    return FakeDevice()
+
+
+@pytest.fixture
+def make_device():
+    """Builds further fake devices, for tests needing more than one"""
+    return FakeDevice
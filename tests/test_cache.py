@@ -0,0 +1,175 @@
+import asyncio
+
+import pytest
+
+from fortigate import cache as cache_module
+from fortigate.cache import ResponseCache, cache_key, table_path
+
+
+@pytest.fixture
+def clock(clock_of):
+    return clock_of(cache_module)
+
+
+def test_cache_key_ignores_parameter_order():
+    assert cache_key('/cmdb/firewall/address/', 'root', {'b': 1, 'a': [1, 2]}) == \
+        cache_key('cmdb/firewall/address', 'root', {'a': [1, 2], 'b': 1})
+
+
+def test_table_path():
+    assert table_path('cmdb/firewall/address/web-server') == 'cmdb/firewall/address'
+    assert table_path('/cmdb/firewall/policy/') == 'cmdb/firewall/policy'
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = ResponseCache(ttl=10, revalidate=False)
+    cache.put('key', ['value'], 10)
+    assert cache.get('key') == ['value']
+    clock.now += 10
+    assert cache.get('key') is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_least_recently_used_entries_are_evicted_beyond_max_bytes(clock):
+    cache = ResponseCache(ttl=60, max_bytes=100)
+    cache.put('a', 'a', 40)
+    cache.put('b', 'b', 40)
+    cache.get('a')
+    cache.put('c', 'c', 40)
+    assert cache.get('b') is None
+    assert cache.get('a') == 'a' and cache.get('c') == 'c'
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['bytes'] == 80
+
+
+def test_values_larger_than_the_cache_are_not_stored(clock):
+    cache = ResponseCache(ttl=60, max_bytes=100)
+    cache.put('big', 'big', 101)
+    assert cache.get('big') is None
+
+
+def test_zero_ttl_disables_the_cache(clock):
+    cache = ResponseCache(ttl=0)
+    cache.put('key', 'value', 1)
+    assert not cache.enabled
+    assert cache.get('key') is None
+
+
+def test_invalidate_drops_the_table_in_the_written_vdom(clock):
+    cache = ResponseCache(ttl=60)
+    address = cache_key('cmdb/firewall/address', 'root')
+    address_object = cache_key('cmdb/firewall/address/web', 'root')
+    address_group = cache_key('cmdb/firewall/addrgrp', 'root')
+    other_vdom = cache_key('cmdb/firewall/address', 'dmz')
+    several_vdoms = cache_key('cmdb/firewall/address', 'root,dmz')
+    for key in (address, address_object, address_group, other_vdom, several_vdoms):
+        cache.put(key, 'value', 1)
+
+    cache.invalidate('cmdb/firewall/address/web', 'root')
+
+    assert cache.get(address) is None
+    assert cache.get(address_object) is None
+    assert cache.get(several_vdoms) is None
+    assert cache.get(address_group) == 'value'
+    assert cache.get(other_vdom) == 'value'
+    assert cache.stats()['invalidations'] == 3
+
+
+def test_clear_drops_every_entry(clock):
+    cache = ResponseCache(ttl=60)
+    cache.put(cache_key('cmdb/firewall/address', 'root'), 'value', 1)
+    cache.put(cache_key('cmdb/system/zone', 'dmz'), 'value', 1)
+    cache.clear()
+    assert cache.stats()['entries'] == 0
+
+
+def test_expired_entry_with_a_revision_is_kept_for_revalidation(clock):
+    cache = ResponseCache(ttl=10)
+    cache.put('key', 'value', 1, revision='r1')
+    clock.now += 10
+    assert cache.get('key') is None
+    assert cache.stale_revision('key') == 'r1'
+    assert cache.renew('key') == 'value'
+    assert cache.get('key') == 'value'
+    stats = cache.stats()
+    assert stats['revalidations'] == 1 and stats['hits'] == 1
+
+
+def test_expired_entry_without_a_revision_is_dropped(clock):
+    cache = ResponseCache(ttl=10)
+    cache.put('key', 'value', 1)
+    clock.now += 10
+    assert cache.get('key') is None
+    assert cache.stale_revision('key') is None
+
+
+def test_revalidation_can_be_disabled(clock):
+    cache = ResponseCache(ttl=10, revalidate=False)
+    cache.put('key', 'value', 1, revision='r1')
+    clock.now += 10
+    assert cache.get('key') is None
+    assert cache.stale_revision('key') is None
+
+
+def test_known_revision_is_trusted_for_revision_interval(clock):
+    cache = ResponseCache(revision_interval=2)
+    cache.note_revision('root', 'r1', probed=True)
+    assert cache.known_revision('root') == 'r1'
+    clock.now += 3
+    assert cache.known_revision('root') is None
+    assert cache.stats()['revision_checks'] == 1
+
+
+def test_writes_forget_the_known_revision(clock):
+    cache = ResponseCache()
+    cache.note_revision('root', 'r1')
+    cache.note_revision('dmz', 'r7')
+    cache.invalidate('cmdb/firewall/address', 'root')
+    assert cache.known_revision('root') is None
+    assert cache.known_revision('dmz') == 'r7'
+
+
+def test_a_new_revision_drops_entries_read_at_another_one(clock):
+    cache = ResponseCache(ttl=60)
+    address = cache_key('cmdb/firewall/address', 'root')
+    zone = cache_key('cmdb/system/zone', 'root')
+    several_vdoms = cache_key('cmdb/firewall/address', 'root,dmz')
+    other_vdom = cache_key('cmdb/firewall/address', 'dmz')
+    cache.note_revision('root', 'r1')
+    cache.put(address, 'old', 1, revision='r1')
+    cache.put(several_vdoms, 'old', 1)
+    cache.put(other_vdom, 'dmz', 1, revision='d1')
+    cache.note_revision('root', 'r2')
+    cache.put(zone, 'new', 1, revision='r2')
+    # Seeing the same revision again keeps what was read at it
+    cache.note_revision('root', 'r2', probed=True)
+    assert cache.get(address) is None
+    assert cache.get(several_vdoms) is None
+    assert cache.get(zone) == 'new'
+    assert cache.get(other_vdom) == 'dmz'
+    assert cache.stats()['invalidations'] == 2
+
+
+def test_client_does_not_serve_a_fresh_entry_of_an_older_revision(clock):
+    httpx = pytest.importorskip('httpx')
+    from fortigate.fortigate import AsyncFortigateAPI
+
+    device = {'revision': 'r1', 'addresses': [{'name': 'web'}]}
+
+    def handler(request):
+        if request.url.path.endswith('/cmdb/system/settings'):
+            return httpx.Response(200, json={'revision': device['revision'], 'results': {}})
+        return httpx.Response(200, json={'revision': device['revision'], 'results': device['addresses']})
+
+    async def run():
+        api = AsyncFortigateAPI('fw.example.com', 'token')
+        api.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        assert await api.get_address_objects() == [{'name': 'web'}]
+        # Changed out of band, well within the TTL
+        device.update(revision='r2', addresses=[{'name': 'web'}, {'name': 'db'}])
+        clock.now += api.cache.revision_interval + 1
+        assert await api.config_revision() == 'r2'
+        assert await api.get_address_objects() == [{'name': 'web'}, {'name': 'db'}]
+        await api.client.aclose()
+
+    asyncio.run(run())
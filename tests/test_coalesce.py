@@ -0,0 +1,204 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from fortigate.coalesce import AsyncSingleFlight, SingleFlight
+
+
+def test_followers_share_the_result_of_the_leader():
+    async def run():
+        group = AsyncSingleFlight()
+        release = asyncio.Event()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await release.wait()
+            return 'result'
+
+        callers = [asyncio.ensure_future(group.run('key', fetch)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        assert await asyncio.gather(*callers) == ['result'] * 3
+        assert len(calls) == 1
+        assert group.stats() == {'in_flight': 0, 'leaders': 1, 'coalesced': 2}
+
+    asyncio.run(run())
+
+
+def test_followers_get_the_error_of_the_leader_and_the_next_call_runs_again():
+    async def run():
+        group = AsyncSingleFlight()
+        release = asyncio.Event()
+
+        async def fail():
+            await release.wait()
+            raise ValueError('refused')
+
+        callers = [asyncio.ensure_future(group.run('key', fail)) for _ in range(2)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*callers, return_exceptions=True)
+        assert [str(result) for result in results] == ['refused', 'refused']
+
+        async def fetch():
+            return 'result'
+
+        assert await group.run('key', fetch) == 'result'
+        assert group.stats()['leaders'] == 2
+
+    asyncio.run(run())
+
+
+def test_cancelling_the_leader_does_not_cancel_its_followers():
+    async def run():
+        group = AsyncSingleFlight()
+        release = asyncio.Event()
+
+        async def fetch():
+            await release.wait()
+            return 'result'
+
+        leader = asyncio.ensure_future(group.run('key', fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(group.run('key', fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+        release.set()
+        assert await follower == 'result'
+        assert leader.cancelled()
+
+    asyncio.run(run())
+
+
+def test_finish_publishes_the_outcome_of_a_led_call():
+    async def run():
+        group = AsyncSingleFlight()
+        assert group.join('key') is None
+        future = group.lead('key')
+        assert group.join('key') is future
+        group.finish('key', future, result=['item'])
+        assert await future == ['item'] and group.join('key') is None
+
+        future = group.lead('key')
+        group.finish('key', future, error=ValueError('refused'))
+        with pytest.raises(ValueError):
+            await future
+
+        # An abandoned call is cancelled: followers fetch for themselves
+        future = group.lead('key')
+        group.finish('key', future)
+        assert future.cancelled()
+        assert group.stats() == {'in_flight': 0, 'leaders': 3, 'coalesced': 1}
+
+    asyncio.run(run())
+
+
+def test_client_sends_concurrent_identical_gets_once(device):
+    httpx = pytest.importorskip('httpx')
+    device.tables['cmdb/firewall/addrgrp'] = [{'name': 'servers'}]
+
+    async def run():
+        release = asyncio.Event()
+
+        async def handler(request):
+            await release.wait()
+            return device.handler(request)
+
+        api = device.api()
+        api.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        callers = [asyncio.ensure_future(api.get_address_groups()) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        release.set()
+        assert await asyncio.gather(*callers) == [[{'name': 'servers'}]] * 3
+        await api.aclose()
+
+    asyncio.run(run())
+    assert len(device.requests) == 1
+
+
+def test_stream_followers_fetch_for_themselves_when_the_leader_is_cancelled(device):
+    httpx = pytest.importorskip('httpx')
+    from fortigate.fortigate import collect
+
+    device.tables['cmdb/firewall/address'] = [{'name': 'web'}]
+
+    async def run():
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def handler(request):
+            started.set()
+            await release.wait()
+            return device.handler(request)
+
+        api = device.api()
+        api.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        leader = asyncio.ensure_future(collect(api.iter_address_objects()))
+        await started.wait()
+        follower = asyncio.ensure_future(collect(api.iter_address_objects()))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        release.set()
+        assert await follower == [{'name': 'web'}]
+        assert leader.cancelled()
+        assert api.inflight.stats()['coalesced'] == 1
+        await api.aclose()
+
+    asyncio.run(run())
+    assert len(device.requests) == 1
+
+
+def test_stream_followers_get_the_error_of_the_leader(device):
+    httpx = pytest.importorskip('httpx')
+    from fortigate.fortigate import collect
+
+    device.failures['cmdb/firewall/address'] = 403
+
+    async def run():
+        release = asyncio.Event()
+
+        async def handler(request):
+            await release.wait()
+            return device.handler(request)
+
+        api = device.api()
+        api.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        callers = [asyncio.ensure_future(collect(api.iter_address_objects())) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        release.set()
+        results = await asyncio.gather(*callers, return_exceptions=True)
+        assert all(isinstance(result, httpx.HTTPStatusError) for result in results)
+        await api.aclose()
+
+    asyncio.run(run())
+    assert len(device.requests) == 1
+
+
+def test_blocking_single_flight_shares_results_and_errors():
+    group = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        if len(calls) > 1:
+            raise ValueError('refused')
+        return 'result'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(group.run('key', fetch))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    while group.stats()['coalesced'] < 2:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == ['result'] * 3 and len(calls) == 1
+
+    with pytest.raises(ValueError):
+        group.run('key', fetch)
+    assert group.stats() == {'in_flight': 0, 'leaders': 2, 'coalesced': 2}
@@ -0,0 +1,41 @@
+import decimal
+
+import pytest
+
+from fortigate import codec
+
+
+@pytest.fixture
+def no_orjson(monkeypatch):
+    """Runs the test as if orjson were not installed, restoring the codec in use after"""
+    monkeypatch.setattr(codec, 'orjson', None)
+    monkeypatch.setattr(codec, '_codec', codec._codec)
+
+
+def codecs():
+    return [codec.StdlibCodec()] + ([codec.OrjsonCodec()] if codec.orjson is not None else [])
+
+
+def test_the_standard_library_is_used_without_orjson(no_orjson):
+    codec.configure()
+    assert codec.active() == 'json'
+    assert codec.loads(codec.dumpb({'name': 'web', 'port': 443})) == {'name': 'web', 'port': 443}
+    with pytest.raises(ValueError, match='not installed'):
+        codec.configure('orjson')
+    with pytest.raises(ValueError, match='Unknown JSON codec'):
+        codec.configure('simplejson')
+    assert codec.active() == 'json'
+
+
+@pytest.mark.parametrize('selected', codecs(), ids=lambda selected: selected.name)
+def test_codecs_produce_the_same_text(selected):
+    stdlib = codec.StdlibCodec()
+    value = {'name': 'wéb', 'members': [{'name': 'a'}], 'id': 1, 'ratio': 0.5, 'off': None}
+    assert selected.dumps(value) == stdlib.dumps(value) == \
+        '{"name":"wéb","members":[{"name":"a"}],"id":1,"ratio":0.5,"off":null}'
+    for indent in (2, 4):
+        assert selected.dumps(value, indent=indent) == stdlib.dumps(value, indent=indent)
+    # Beyond 64 bits orjson hands over to the standard library
+    assert selected.dumps({'wide': 2 ** 70}) == '{"wide":%d}' % 2 ** 70
+    assert selected.dumps({'cost': decimal.Decimal('1.5')}, default=str) == '{"cost":"1.5"}'
+    assert selected.loads(selected.dumpb(value)) == value
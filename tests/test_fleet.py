@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+httpx = pytest.importorskip('httpx')
+
+from fortigate.fortigate import FortigateManager
+
+
+def fleet(*devices, vdoms=None):
+    """A manager with each fake device registered as fw1, fw2, ..."""
+    manager = FortigateManager()
+    for number, device in enumerate(devices, 1):
+        device_id = f'fw{number}'
+        manager.async_devices[device_id] = device.api()
+        manager.device_configs[device_id] = {'host': 'fw.example.com', 'vdoms': vdoms or ['root']}
+    return manager
+
+
+def test_results_and_errors_are_kept_per_device_and_vdom(make_device):
+    up = make_device(**{'cmdb/firewall/policy': [{'policyid': 1}]})
+    down = make_device()
+    down.failures['cmdb/firewall/policy'] = 403
+    manager = fleet(up, down, vdoms=['root', 'dmz'])
+
+    result = asyncio.run(manager.fan_out('get_firewall_policies', ['fw1', 'fw2', 'fw3'], ['*']))
+    assert result['results'] == {'fw1': {'root': [{'policyid': 1}], 'dmz': [{'policyid': 1}]}}
+    assert set(result['errors']['fw2']) == {'root', 'dmz'}
+    assert result['errors']['fw3'] == {'root': 'Device fw3 not found'}
+    assert {key: result['summary'][key] for key in ('devices', 'calls', 'failed_calls')} == \
+        {'devices': 3, 'calls': 5, 'failed_calls': 3}
+    assert sorted(params.get('vdom', 'root') for endpoint, params in up.requests) == ['dmz', 'root']
+
+
+def test_a_device_that_does_not_answer_times_out_alone(make_device):
+    async def hang(request):
+        await asyncio.Event().wait()
+
+    manager = fleet(make_device(**{'cmdb/firewall/policy': [{'policyid': 1}]}), make_device())
+    manager.async_devices['fw2'].client = httpx.AsyncClient(transport=httpx.MockTransport(hang))
+    result = asyncio.run(manager.fan_out('get_firewall_policies', timeout=0.05))
+    assert result['results'] == {'fw1': [{'policyid': 1}]}
+    assert result['errors'] == {'fw2': 'Timed out after 0.05s'}
+
+
+def test_concurrency_bounds_the_calls_in_flight(make_device):
+    devices = [make_device() for _ in range(6)]
+    manager = fleet(*devices)
+    manager.configure_fleet(concurrency=2)
+    in_flight, peak = [0], [0]
+
+    def counted(device):
+        async def handler(request):
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+            await asyncio.sleep(0.01)
+            in_flight[0] -= 1
+            return device.handler(request)
+        return handler
+
+    for number, device in enumerate(devices, 1):
+        manager.async_devices[f'fw{number}'].client = httpx.AsyncClient(
+            transport=httpx.MockTransport(counted(device)))
+    result = asyncio.run(manager.fan_out('get_firewall_policies'))
+    assert len(result['results']) == 6 and result['errors'] == {}
+    assert peak[0] == 2
@@ -0,0 +1,107 @@
+import csv
+import json
+import random
+
+import pytest
+
+from fortigate import flow_batch
+from fortigate.flow_batch import read_chunks, simulate_file
+from fortigate.policy_engine import PolicyEngine
+
+ADDRESSES = [
+    {'name': 'lan', 'type': 'ipmask', 'subnet': '192.168.1.0 255.255.255.0'},
+    {'name': 'web', 'type': 'ipmask', 'subnet': '10.0.0.0 255.255.255.0'},
+    {'name': 'odd', 'type': 'wildcard', 'wildcard': '10.0.0.1 255.255.255.1'},
+    {'name': 'cdn', 'type': 'fqdn', 'fqdn': 'cdn.example.com'},
+]
+SERVICES = [
+    {'name': 'ALL', 'protocol': 'IP', 'protocol-number': 0},
+    {'name': 'HTTPS', 'protocol': 'TCP/UDP/SCTP', 'tcp-portrange': '443'},
+    {'name': 'DNS', 'protocol': 'TCP/UDP/SCTP', 'udp-portrange': '53'},
+    {'name': 'PING', 'protocol': 'ICMP', 'icmptype': 8},
+]
+ROUTES = [{'ip_mask': '0.0.0.0/0', 'interface': 'wan1'}, {'ip_mask': '10.0.0.0/8', 'interface': 'port2'}]
+
+
+def policy(policyid, srcaddr, dstaddr, service, action='accept', dstintf='port2'):
+    return {'policyid': policyid, 'action': action, 'srcintf': [{'name': 'port1'}],
+            'dstintf': [{'name': dstintf}], 'srcaddr': [{'name': srcaddr}], 'dstaddr': [{'name': dstaddr}],
+            'service': [{'name': service}], 'schedule': 'always'}
+
+
+@pytest.fixture
+def engine():
+    return PolicyEngine([policy(1, 'lan', 'web', 'HTTPS'), policy(2, 'lan', 'odd', 'ALL', 'deny'),
+                         policy(3, 'lan', 'cdn', 'DNS', dstintf='any'),
+                         policy(4, 'all', 'all', 'PING', dstintf='any'),
+                         policy(5, 'lan', 'all', 'ALL', dstintf='wan1')],
+                        addresses=ADDRESSES, services=SERVICES, routes=ROUTES, revision='7')
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['srcintf', 'src', 'dst', 'proto', 'dport'])
+        writer.writerows(rows)
+    return str(path)
+
+
+def results(path):
+    with open(path, newline='') as f:
+        return [(int(row['policy_id']), row['exact'] == 'true') for row in csv.DictReader(f)]
+
+
+def test_csv_flows_are_looked_up(engine, tmp_path):
+    path = write_csv(tmp_path / 'flows.csv', [
+        ['port1', '192.168.1.5', '10.0.0.8', 'tcp', '443'],
+        ['port1', '192.168.1.5', '10.0.0.9', 'tcp', '80'],
+        ['port1', '192.168.1.5', '8.8.8.8', 'udp', '53'],
+        ['port1', '172.16.0.1', '8.8.8.8', 'icmp', ''],
+        ['port1', 'not-an-ip', '8.8.8.8', 'tcp', '80'],
+    ])
+    summary = simulate_file(engine, path)
+    assert results(summary['output_path']) == [(1, True), (2, True), (5, False), (4, True), (-1, False)]
+    assert (summary['flows'], summary['inexact'], summary['errors']) == (5, 1, 1)
+    assert summary['first_errors'][0]['flow'] == 5
+    assert summary['output_path'] == f"{path}.policies.csv"
+
+
+def test_ndjson_lines_that_are_not_objects_become_row_errors(engine, tmp_path):
+    path = tmp_path / 'flows.ndjson'
+    path.write_text('\n'.join([
+        json.dumps({'srcintf': 'port1', 'source': '192.168.1.5', 'destination': '10.0.0.8',
+                    'protocol': 6, 'dport': 443, 'ignored': True}),
+        '{"srcintf": "port1", ',
+        '[1, 2]',
+        '',
+        json.dumps({'srcintf': 'port1', 'source_ip': '192.168.1.5', 'dest': '10.0.0.8',
+                    'protocol': 'tcp', 'dest_port': -1}),
+    ]) + '\n')
+    columns = next(read_chunks(str(path)))
+    assert columns['dest_port'] == [443, None, None, -1]
+    assert columns['error'][0] is None and columns['error'][1].startswith('Invalid JSON')
+    assert columns['error'][2] == 'Expected a JSON object, not list'
+
+    summary = simulate_file(engine, str(path), str(tmp_path / 'out.csv'))
+    assert results(tmp_path / 'out.csv') == [(1, True), (-1, False), (-1, False), (-1, False)]
+    assert summary['errors'] == 3
+    assert summary['first_errors'][2] == {'flow': 4, 'error': 'Port -1 out of range 0-65535'}
+
+
+def test_vectorized_and_scalar_lookups_agree(engine, tmp_path, monkeypatch):
+    pytest.importorskip('numpy')
+    generator = random.Random(5)
+    rows = [[generator.choice(['port1', 'port3', '']),
+             generator.choice(['192.168.1.5', '172.16.0.1', '10.0.0.300']),
+             generator.choice(['10.0.0.8', '10.0.0.7', '8.8.8.8', '203.0.113.1']),
+             generator.choice(['tcp', 'udp', 'icmp', '47', 'bogus']),
+             generator.choice(['', '53', '443', '80', '70000'])] for _ in range(3000)]
+    path = write_csv(tmp_path / 'flows.csv', rows)
+
+    vectorized = simulate_file(engine, path, str(tmp_path / 'vectorized.csv'), chunk_flows=1024)
+    monkeypatch.setattr(flow_batch, 'np', None)
+    scalar = simulate_file(engine, path, str(tmp_path / 'scalar.csv'))
+    assert (vectorized['vectorized'], scalar['vectorized']) == (True, False)
+    assert results(tmp_path / 'vectorized.csv') == results(tmp_path / 'scalar.csv')
+    for field in ('flows', 'policies', 'implicit_deny', 'inexact', 'errors'):
+        assert vectorized[field] == scalar[field]
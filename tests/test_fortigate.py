@@ -0,0 +1,180 @@
+import asyncio
+
+import pytest
+
+httpx = pytest.importorskip('httpx')
+
+
+def test_async_requests_carry_the_token_and_the_vdom(device):
+    from fortigate import codec
+
+    sent = []
+
+    def handler(request):
+        sent.append((request.method, request.headers['Authorization'], request.url.params.get('vdom'),
+                     codec.loads(request.content) if request.content else None))
+        return device.handler(request)
+
+    async def run():
+        api = device.api()
+        api.client = httpx.AsyncClient(headers=api.client.headers, transport=httpx.MockTransport(handler))
+        await api.get_address_groups()
+        await api.get_address_groups(vdom='dmz')
+        await api.create_address_object({'name': 'web'}, vdom='dmz')
+        await api.aclose()
+
+    asyncio.run(run())
+    assert sent == [('GET', 'Bearer token', None, None), ('GET', 'Bearer token', 'dmz', None),
+                    ('POST', 'Bearer token', 'dmz', {'name': 'web'})]
+
+
+def test_async_tools_run_concurrently_on_one_client(device, monkeypatch):
+    from mcptool.base import fortigate_manager
+    from mcptool.policy import fortigate_get_firewall_policies, fortigate_get_policy_by_id
+
+    device.tables['cmdb/firewall/policy'] = [{'policyid': 1}, {'policyid': 2}]
+    device.tables['cmdb/firewall/policy/2'] = [{'policyid': 2}]
+
+    async def run():
+        api = device.api()
+        monkeypatch.setitem(fortigate_manager.async_devices, 'fw1', api)
+        results = await asyncio.gather(fortigate_get_firewall_policies('fw1', output_format='compact'),
+                                       fortigate_get_policy_by_id('fw1', 2, output_format='compact'))
+        await api.aclose()
+        return results
+
+    policies, policy = asyncio.run(run())
+    assert policies == '[{"policyid":1},{"policyid":2}]'
+    assert policy == '[{"policyid":2}]'
+
+
+def test_a_paused_stream_does_not_hold_the_request_slot(device):
+    device.tables['cmdb/firewall/address'] = [{'name': 'web'}, {'name': 'db'}]
+
+    async def run():
+        api = device.api(limits={'max_in_flight': 1})
+        stream = api.iter_address_objects()
+        assert await stream.__anext__() == {'name': 'web'}
+        # The consumer holds on to the stream: the only slot is free for another request
+        assert await asyncio.wait_for(api.get_address_groups(), 1) == []
+        assert [item async for item in stream] == [{'name': 'db'}]
+        assert api.throttle.stats()['in_flight'] == 0
+        await api.aclose()
+
+    asyncio.run(run())
+
+
+def test_failed_attempts_count_as_requests(device):
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        if len(attempts) == 1:
+            raise httpx.ConnectError('connection refused', request=request)
+        return device.handler(request)
+
+    async def run():
+        api = device.api(retry={'backoff': 0})
+        api.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        assert await api.get_address_groups() == []
+        await api.aclose()
+        return api.connection_stats
+
+    stats = asyncio.run(run())
+    assert (len(attempts), stats.requests, stats.http_version) == (2, 2, 'HTTP/1.1')
+
+
+def test_field_projection_is_sent_as_the_format_parameter(device):
+    from fortigate.fortigate import collect
+
+    device.tables['cmdb/firewall/addrgrp'] = [{'name': 'servers'}]
+
+    async def run():
+        api = device.api()
+        assert await api.get_address_groups(fields=['name', 'member']) == [{'name': 'servers'}]
+        # Another projection is another response: it is not served from the cache
+        await api.get_address_groups()
+        await collect(api.iter_firewall_policies(filters=['action==deny'], fields=['policyid', 'action']))
+        await api.aclose()
+
+    asyncio.run(run())
+    (_, projected), (_, full), (_, policies) = device.requests
+    assert projected.get('format') == 'name|member' and 'format' not in full
+    assert (policies.get('format'), policies.get('filter')) == ('policyid|action', 'action==deny')
+
+
+def test_tables_are_iterated_page_by_page(device):
+    from fortigate.fortigate import collect
+
+    device.tables['cmdb/firewall/address'] = [{'name': f'net-{i}'} for i in range(5)]
+    device.tables['monitor/firewall/session'] = [{'id': i} for i in range(5)]
+
+    async def run():
+        api = device.api()
+        addresses = await collect(api.iter_address_objects(page_size=2))
+        sessions = await collect(api.iter_session_table(limit=3, page_size=2))
+        await api.aclose()
+        return addresses, sessions
+
+    addresses, sessions = asyncio.run(run())
+    assert [address['name'] for address in addresses] == [f'net-{i}' for i in range(5)]
+    assert sessions == [{'id': 0}, {'id': 1}, {'id': 2}]
+    pages = [(endpoint, params['start'], params['count']) for endpoint, params in device.requests]
+    # A short page ends the table, the limit caps the last page
+    assert pages == [('cmdb/firewall/address', '0', '2'), ('cmdb/firewall/address', '2', '2'),
+                     ('cmdb/firewall/address', '4', '2'),
+                     ('monitor/firewall/session', '0', '2'), ('monitor/firewall/session', '2', '1')]
+
+
+def test_paged_iteration_takes_a_single_vdom(device):
+    async def run():
+        api = device.api()
+        with pytest.raises(ValueError, match='single VDOM'):
+            await api.iter_address_objects('dmz,lab').__anext__()
+        await api.aclose()
+
+    asyncio.run(run())
+
+
+def test_multi_vdom_reads_use_one_query_when_the_device_supports_it(device):
+    sent = []
+
+    def handler(request):
+        vdom = request.url.params.get('vdom')
+        sent.append(vdom)
+        if device.failures:
+            return httpx.Response(400, json={'status': 'error'})
+        return httpx.Response(200, json=[{'vdom': name, 'results': [{'name': f'{name}-net'}]}
+                                         for name in vdom.split(',')])
+
+    async def run():
+        api = device.api()
+        api.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        assert await api.get_address_objects(vdom='dmz,lab') == \
+            {'dmz': [{'name': 'dmz-net'}], 'lab': [{'name': 'lab-net'}]}
+        assert api.multi_vdom_query is True
+        # Once the device is known to support it, errors are not retried VDOM by VDOM
+        device.failures['cmdb/firewall/addrgrp'] = 400
+        with pytest.raises(httpx.HTTPStatusError):
+            await api.get_address_groups(vdom='dmz,lab')
+        await api.aclose()
+
+    asyncio.run(run())
+    assert sent == ['dmz,lab', 'dmz,lab']
+
+
+def test_multi_vdom_reads_fall_back_to_one_request_per_vdom(device):
+    device.tables['cmdb/firewall/address'] = [{'name': 'net'}]
+    device.failures['cmdb/firewall/address'] = lambda request: 400 if ',' in request.url.params['vdom'] else None
+
+    async def run():
+        api = device.api()
+        assert await api.get_address_objects(vdom='dmz,lab') == {'dmz': [{'name': 'net'}], 'lab': [{'name': 'net'}]}
+        assert api.multi_vdom_query is False
+        # The device is not asked for a multi-VDOM query again
+        assert await api.get_address_groups(vdom='dmz,lab') == {'dmz': [], 'lab': []}
+        await api.aclose()
+
+    asyncio.run(run())
+    assert sorted(params['vdom'] for endpoint, params in device.requests) == \
+        ['dmz', 'dmz', 'dmz,lab', 'lab', 'lab']
@@ -0,0 +1,129 @@
+from fortigate.hit_history import MISSING_SAMPLES_BEFORE_DROP, HitHistory, HitSampler, trend
+
+HOUR = 3600
+START = 1_700_000_000 - 1_700_000_000 % HOUR
+
+
+def sampled(*samples, buckets=24):
+    """Returns a history fed with one sample per hour"""
+    history = HitHistory(bucket_seconds=HOUR, buckets=buckets)
+    for hour, hits in enumerate(samples):
+        history.record(hits, now=START + hour * HOUR)
+    return history
+
+
+def test_first_sample_is_the_baseline():
+    history = sampled({1: 100, 2: 5})
+    assert history.columns == {}
+    assert history.top(HOUR, now=START) == []
+    assert history.zero_hits(HOUR, now=START)['never_hit_while_sampled'] == [1, 2]
+
+
+def test_deltas_go_to_the_bucket_of_the_sample():
+    history = sampled({1: 100}, {1: 130}, {1: 130}, {1: 160})
+    now = START + 3 * HOUR
+    assert [hits for _, hits in history.series(1, 4 * HOUR, now=now)] == [0, 30, 0, 30]
+    assert history.top(HOUR, now=now) == [(1, 30)]
+    assert history.top(2 * HOUR, now=now) == [(1, 60)]
+    assert history.last_hit_at(1) == now
+    assert history.tracks(1) and not history.tracks(2)
+    assert history.coverage() == 3 * HOUR
+
+
+def test_a_lower_counter_was_reset():
+    history = sampled({1: 100}, {1: 7})
+    assert history.top(HOUR, now=START + HOUR) == [(1, 7)]
+
+
+def test_ring_keeps_the_last_buckets():
+    history = sampled(*({1: count * 10} for count in range(10)), buckets=4)
+    now = START + 9 * HOUR
+    assert [hits for _, hits in history.series(1, 24 * HOUR, now=now)] == [10, 10, 10, 10]
+    assert history.stats()['buckets_used'] == 4
+
+
+def test_gaps_between_samples_count_as_no_hits():
+    history = HitHistory(bucket_seconds=HOUR, buckets=24)
+    history.record({1: 0}, now=START)
+    history.record({1: 50}, now=START + 5 * HOUR)
+    assert [hits for _, hits in history.series(1, 24 * HOUR, now=START + 5 * HOUR)] == [0, 0, 0, 0, 0, 50]
+
+
+def test_top_and_zero_hits():
+    history = sampled({1: 0, 2: 0, 3: 0}, {1: 5, 2: 50, 3: 0}, {1: 10, 2: 50, 3: 0})
+    now = START + 2 * HOUR
+    assert history.top(3 * HOUR, now=now) == [(2, 50), (1, 10)]
+    assert history.top(3 * HOUR, limit=1, now=now) == [(2, 50)]
+    result = history.zero_hits(HOUR / 2, now=now)
+    assert result == {'policies': [2, 3], 'never_hit_while_sampled': [3], 'complete': True,
+                      'covered_seconds': 2 * HOUR}
+    assert history.zero_hits(30 * 86400, now=now)['complete'] is False
+
+
+def test_empty_samples_do_not_wipe_the_history():
+    history = sampled({1: 0, 2: 0}, {1: 5, 2: 5})
+    for _ in range(MISSING_SAMPLES_BEFORE_DROP + 1):
+        history.record({}, now=START + 2 * HOUR)
+    assert set(history.counters) == {1, 2}
+    assert history.top(3 * HOUR, now=START + 2 * HOUR) == [(1, 5), (2, 5)]
+
+
+def test_policies_missing_from_consecutive_samples_are_dropped():
+    history = sampled({1: 0, 2: 0}, {1: 5, 2: 5})
+    for _ in range(MISSING_SAMPLES_BEFORE_DROP - 1):
+        history.record({1: 5}, now=START + 2 * HOUR)
+    # Seen again: the count of missed samples starts over
+    history.record({1: 5, 2: 5}, now=START + 2 * HOUR)
+    for _ in range(MISSING_SAMPLES_BEFORE_DROP - 1):
+        history.record({1: 5}, now=START + 2 * HOUR)
+    assert 2 in history.counters
+    history.record({1: 5}, now=START + 2 * HOUR)
+    assert set(history.counters) == {1}
+    assert 2 not in history.columns and 2 not in history.last_hit
+
+
+def test_trend_slope_and_direction():
+    series = [(START + hour * HOUR, hits) for hour, hits in enumerate([60, 120, 180])]
+    result = trend(series, HOUR)
+    assert [point['hits_per_minute'] for point in result['points']] == [1.0, 2.0, 3.0]
+    assert result['total_hits'] == 360
+    assert result['rate_change_per_day'] == 24.0
+    assert result['direction'] == 'rising'
+    assert trend(series[:1], HOUR)['direction'] is None
+
+
+class Device:
+    def __init__(self, usage):
+        self.usage = usage
+
+    def get_policy_usage(self, vdom):
+        if isinstance(self.usage, Exception):
+            raise self.usage
+        return self.usage
+
+
+class Manager:
+    def __init__(self, devices):
+        self.devices = devices
+
+    def list_devices(self):
+        return [{'device_id': device_id, 'vdoms': ['root']} for device_id in self.devices]
+
+    def get_device(self, device_id):
+        return self.devices[device_id]
+
+
+def test_sampler_records_every_device_and_keeps_errors():
+    manager = Manager({'fw1': Device([{'policyid': 1, 'hit_count': 3}]),
+                       'fw2': Device(ConnectionError('unreachable'))})
+    sampler = HitSampler(manager, bucket_seconds=HOUR, buckets=4)
+    sampler.sample()
+    assert sampler.history('fw1').counters == {1: 3}
+    assert sampler.history('fw2') is None
+    stats = sampler.stats()
+    assert stats['errors'] == {'fw2/root': 'unreachable'}
+    assert stats['histories']['fw1/root']['samples'] == 1
+
+    manager.devices['fw2'] = Device([])
+    sampler.sample()
+    assert sampler.stats()['errors'] == {}
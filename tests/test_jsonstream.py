@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from fortigate.jsonstream import ResultsStreamParser
+
+
+def parse(body: bytes, chunk_size: int):
+    parser = ResultsStreamParser()
+    items = []
+    for start in range(0, len(body), chunk_size):
+        items.extend(parser.feed(body[start:start + chunk_size]))
+    items.extend(parser.close())
+    return items, parser.metadata
+
+
+RESPONSE = {
+    'http_method': 'GET',
+    'revision': 'abc',
+    'results': [{'policyid': i, 'name': f'pol-é{i}', 'srcaddr': [{'name': 'all'}], 'hits': i * 1.5}
+                for i in range(50)],
+    'vdom': 'root',
+    'status': 'success',
+}
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 64, 1 << 20])
+def test_items_are_the_results_array_whatever_the_chunking(chunk_size):
+    body = json.dumps(RESPONSE, indent=4, ensure_ascii=False).encode('utf-8')
+    items, metadata = parse(body, chunk_size)
+    assert items == RESPONSE['results']
+    assert metadata == {key: value for key, value in RESPONSE.items() if key != 'results'}
+
+
+def test_numbers_split_across_chunks_are_not_cut():
+    items, _ = parse(b'{"results": [12345, 678]}', 3)
+    assert items == [12345, 678]
+
+
+def test_results_object_is_a_single_item():
+    items, metadata = parse(b'{"status": "success", "results": {"hostname": "fw1"}}', 5)
+    assert items == [{'hostname': 'fw1'}]
+    assert metadata == {'status': 'success'}
+
+
+def test_empty_results():
+    assert parse(b'{"results": [], "status": "success"}', 4) == ([], {'status': 'success'})
+
+
+def test_truncated_body_raises():
+    with pytest.raises(ValueError):
+        parse(b'{"results": [{"policyid": 1}, {"policyid"', 8)
+
+
+def test_non_object_body_raises():
+    with pytest.raises(ValueError):
+        parse(b'[1, 2]', 8)
@@ -0,0 +1,116 @@
+import json
+
+import pytest
+
+from mcptool import output
+from mcptool.output import next_page, output_options, render, select_fields, tabulate
+
+POLICIES = [{'policyid': i, 'name': f'policy-{i}', 'action': 'accept', 'comments': 'x' * 50} for i in range(200)]
+
+
+@pytest.fixture(autouse=True)
+def default_settings():
+    output.configure_output({})
+    yield
+    output.configure_output({})
+
+
+def read_all(text: str, max_chars: int = None) -> list:
+    """Follows the cursors of a paged result, returning the text of its pages"""
+    texts = [text]
+    while json.loads(texts[-1]).get('next_cursor'):
+        texts.append(next_page(json.loads(texts[-1])['next_cursor'], max_chars))
+    return texts
+
+
+def test_select_fields_keeps_record_fields_only():
+    result = {'root': [{'policyid': 1, 'name': 'a', 'action': 'deny'}], 'dmz': []}
+    assert select_fields(result, ['policyid', 'action']) == {'root': [{'policyid': 1, 'action': 'deny'}], 'dmz': []}
+    assert select_fields({'policyid': 1, 'name': 'a'}, ['name']) == {'name': 'a'}
+
+
+def test_tabulate_turns_record_lists_into_columns_and_rows():
+    assert tabulate({'items': [{'a': 1}, {'a': 2, 'b': 3}]}) == \
+        {'items': {'columns': ['a', 'b'], 'rows': [[1, None], [2, 3]]}}
+    assert tabulate([1, 2]) == [1, 2]
+
+
+def test_small_results_are_returned_whole():
+    assert json.loads(render({'policies': POLICIES[:2]})) == {'policies': POLICIES[:2]}
+
+
+def test_large_results_are_paged_without_losing_records():
+    texts = read_all(render({'policies': POLICIES, 'vdom': 'root'}, max_chars=2000), 2000)
+    assert len(texts) > 1
+    assert all(len(text) <= 2000 for text in texts)
+    pages = [json.loads(text) for text in texts]
+    assert [policy for page in pages for policy in page['result'].get('policies', [])] == POLICIES
+    assert pages[0]['summary']['list_items'] == {'policies': 200}
+
+
+def test_long_strings_are_split_into_chunks():
+    pages = [json.loads(text) for text in read_all(render({'config': 'y' * 5000}, max_chars=1000), 1000)]
+    assert ''.join(page['result']['config'] for page in pages) == 'y' * 5000
+
+
+def test_unknown_cursor_is_an_error():
+    with pytest.raises(ValueError):
+        next_page('000000000000.1')
+    with pytest.raises(ValueError):
+        next_page('bogus')
+
+
+def test_unknown_output_format_is_an_error():
+    with pytest.raises(ValueError):
+        render({}, output_format='xml')
+
+
+def test_output_options_are_applied_to_render_in_the_tool():
+    @output_options
+    def tool(device_id: str) -> str:
+        return render({'policies': POLICIES[:2], 'device': device_id})
+
+    assert json.loads(tool('fw1', fields=['policyid'])) == {'policies': [{'policyid': 0}, {'policyid': 1}],
+                                                            'device': 'fw1'}
+    assert json.loads(tool('fw1', output_format='table'))['policies']['columns'] == \
+        ['policyid', 'name', 'action', 'comments']
+    assert '\n' in tool('fw1', output_format='pretty')
+    # Options only last for the call
+    assert '\n' not in tool('fw1')
+
+
+def test_record_paging_returns_page_size_records_per_page():
+    pages = [json.loads(text) for text in read_all(render(POLICIES, page_size=64))]
+    assert [len(page['result']) for page in pages] == [64, 64, 64, 8]
+    assert [policy for page in pages for policy in page['result']] == POLICIES
+    assert [page['summary']['offset'] for page in pages] == [0, 64, 128, 192]
+
+
+def test_record_paging_reads_a_stable_snapshot():
+    first = json.loads(render(POLICIES, page_size=100))
+    # The table changed on the device and was read again by another call
+    changed = [dict(policy, name='renamed') for policy in POLICIES]
+    render(changed, page_size=100)
+    second = json.loads(next_page(first['next_cursor']))
+    assert second['result'][50]['name'] == 'policy-150'
+    assert second['summary']['snapshot_taken_at'] == first['summary']['snapshot_taken_at']
+    assert second['next_cursor'] is None
+
+
+def test_results_within_page_size_are_not_paged():
+    assert json.loads(render(POLICIES[:10], page_size=64)) == POLICIES[:10]
+
+
+def test_page_size_option_uses_the_server_default():
+    output.configure_output({'page_size': 25})
+    assert output.page_size_option(None) == 25
+    assert output.page_size_option(0) == 0
+
+
+def test_expired_snapshots_are_dropped(monkeypatch):
+    output.configure_output({'snapshot_ttl': 60})
+    first = json.loads(render(POLICIES, page_size=100))
+    now = output.time.monotonic() + 61
+    monkeypatch.setattr(output.time, 'monotonic', lambda: now)
+    with pytest.raises(ValueError, match='expired'):
+        next_page(first['next_cursor'])
@@ -0,0 +1,65 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip('httpx')
+
+from mcptool.base import fortigate_manager
+from mcptool.policy import _pushdown_filter, fortigate_search_firewall_policies
+
+POLICIES = [
+    {'policyid': 1, 'name': 'web-in', 'action': 'accept', 'status': 'enable',
+     'srcaddr': [{'name': 'all'}], 'dstaddr': [{'name': 'web-servers'}], 'service': [{'name': 'HTTPS'}]},
+    {'policyid': 2, 'name': 'lan-out', 'action': 'accept', 'status': 'enable',
+     'srcaddr': [{'name': 'lan'}], 'dstaddr': [{'name': 'all'}], 'service': [{'name': 'ALL'}]},
+]
+
+
+@pytest.fixture
+def fw1(device, monkeypatch):
+    device.tables['cmdb/firewall/policy'] = POLICIES
+    monkeypatch.setitem(fortigate_manager.async_devices, 'fw1', device.api())
+    return device
+
+
+def search(**filters):
+    return asyncio.run(fortigate_search_firewall_policies('fw1', output_format='compact', **filters))
+
+
+def test_member_filters_are_pushed_down_and_checked_again_locally(fw1):
+    # The fake device ignores filters: the local check still narrows the result
+    result = json.loads(search(dstaddr_filter='web', service_filter='https'))
+    assert result['server_filters'] == ['dstaddr=@web', 'service=@https']
+    assert [policy['policyid'] for policy in result['policies']] == [1]
+    endpoint, params = fw1.requests[-1]
+    assert params.get_list('filter') == ['dstaddr=@web', 'service=@https']
+
+
+def test_rejected_filters_fall_back_to_local_filtering(fw1):
+    fw1.failures['cmdb/firewall/policy'] = lambda request: 400 if 'filter' in request.url.params else None
+    result = json.loads(search(srcaddr_filter='lan'))
+    assert result['server_filters'] == []
+    assert (result['total_policies'], [policy['policyid'] for policy in result['policies']]) == (2, [2])
+
+
+@pytest.mark.parametrize('status', [500, 404])
+def test_only_client_errors_fall_back(fw1, status):
+    fw1.failures['cmdb/firewall/policy'] = status
+    result = search(srcaddr_filter='lan')
+    assert result.startswith('Error:')
+    # 404 was a rejected filter: the request without it is the one that failed
+    assert len(fw1.requests) == (2 if status == 404 else 1)
+
+
+def test_values_fortios_cannot_express_are_only_checked_locally(fw1):
+    # ',' separates alternatives in a FortiOS filter, '\\' escapes
+    assert _pushdown_filter('name', '=@', 'web,in') is None
+    assert _pushdown_filter('name', '=@', 'web\\in') is None
+    assert _pushdown_filter('action', '==', 'deny') == 'action==deny'
+
+    result = json.loads(search(name_filter='lan,', action_filter='accept'))
+    assert result['server_filters'] == ['action==accept']
+    assert result['policies'] == []
+    result = json.loads(search(name_filter='WEB'))
+    assert [policy['policyid'] for policy in result['policies']] == [1]
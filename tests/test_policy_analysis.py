@@ -0,0 +1,109 @@
+import random
+
+from fortigate.policy_analysis import _RangeIndex, analyze_policies
+from fortigate.policy_engine import IntervalSet, PolicyEngine
+
+ADDRESSES = [
+    {'name': 'lan', 'type': 'ipmask', 'subnet': '192.168.1.0 255.255.255.0'},
+    {'name': 'host', 'type': 'ipmask', 'subnet': '192.168.1.10 255.255.255.255'},
+    {'name': 'web', 'type': 'ipmask', 'subnet': '10.0.0.0 255.255.255.0'},
+    {'name': 'web-low', 'type': 'iprange', 'start-ip': '10.0.0.0', 'end-ip': '10.0.0.127'},
+    {'name': 'web-mid', 'type': 'iprange', 'start-ip': '10.0.0.64', 'end-ip': '10.0.0.191'},
+    {'name': 'cdn', 'type': 'fqdn', 'fqdn': 'cdn.example.com'},
+]
+SERVICES = [
+    {'name': 'ALL', 'protocol': 'IP', 'protocol-number': 0},
+    {'name': 'HTTP', 'protocol': 'TCP/UDP/SCTP', 'tcp-portrange': '80'},
+    {'name': 'HTTPS', 'protocol': 'TCP/UDP/SCTP', 'tcp-portrange': '443'},
+]
+GROUPS = [{'name': 'web-services', 'member': [{'name': 'HTTP'}, {'name': 'HTTPS'}]}]
+
+
+def policy(policyid, srcaddr='lan', dstaddr='web', service='ALL', action='accept', **fields):
+    record = {'policyid': policyid, 'name': f'p{policyid}', 'action': action, 'status': 'enable',
+              'srcintf': [{'name': 'port1'}], 'dstintf': [{'name': 'port2'}],
+              'srcaddr': [{'name': srcaddr}], 'dstaddr': [{'name': dstaddr}],
+              'service': [{'name': service}], 'schedule': 'always'}
+    record.update(fields)
+    return record
+
+
+def analyze(*policies):
+    return analyze_policies(PolicyEngine(list(policies), addresses=ADDRESSES, services=SERVICES,
+                                         service_groups=GROUPS, revision='1'))
+
+
+def ids(entries, field='policy_id'):
+    return [entry[field] for entry in entries]
+
+
+def test_policy_behind_a_broader_one_with_another_action_is_shadowed():
+    result = analyze(policy(1, action='deny'), policy(2, srcaddr='host', service='HTTPS'))
+    assert result['shadowed'] == [{'policy_id': 2, 'name': 'p2', 'action': 'accept', 'covered_by': 1}]
+    assert result['redundant'] == result['correlated'] == []
+
+
+def test_policy_behind_a_broader_one_with_the_same_action_is_redundant():
+    result = analyze(policy(1, service='web-services'), policy(2, srcaddr='host', service='HTTP'))
+    assert ids(result['redundant']) == [2]
+    assert result['redundant'][0]['covered_by'] == 1
+    assert result['shadowed'] == []
+
+
+def test_policy_covered_by_a_later_one_is_redundant_unless_a_conflict_sits_between():
+    result = analyze(policy(1, srcaddr='host'), policy(2))
+    assert ids(result['redundant']) == [1]
+    assert result['redundant'][0]['covered_by'] == 2
+
+    result = analyze(policy(1, srcaddr='host'), policy(2, dstaddr='web-low', action='deny'), policy(3))
+    assert 1 not in ids(result['redundant'])
+
+
+def test_partial_overlaps_with_another_action_are_correlated():
+    result = analyze(policy(1, dstaddr='web-low'), policy(2, dstaddr='web-mid', action='deny'))
+    assert result['correlated'] == [{'policy_id': 2, 'name': 'p2', 'action': 'deny',
+                                     'count': 1, 'correlated_with': [1]}]
+    assert result['shadowed'] == result['redundant'] == []
+
+
+def test_disjoint_policies_are_not_related():
+    result = analyze(policy(1, service='HTTP'), policy(2, service='HTTPS', action='deny'))
+    assert result['shadowed'] == result['redundant'] == result['correlated'] == result['unmatchable'] == []
+
+
+def test_negated_all_matches_nothing():
+    result = analyze(policy(1, srcaddr='all', **{'srcaddr-negate': 'enable'}), policy(2))
+    assert ids(result['unmatchable']) == [1]
+
+
+def test_unresolved_objects_never_produce_findings():
+    result = analyze(policy(1, dstaddr='cdn', action='deny'), policy(2, srcaddr='host'))
+    assert result['shadowed'] == result['redundant'] == []
+    assert result['partially_resolved'] == [1]
+
+    # A schedule only the device evaluates: the later policy may still match
+    result = analyze(policy(1, action='deny', schedule='workhours'), policy(2, srcaddr='host'))
+    assert result['shadowed'] == []
+    assert result['revision'] == '1'
+
+
+def test_range_index_answers_like_a_scan(monkeypatch):
+    # Small blocks: queries span several blocks, and the shared boundaries below get blocks of their own
+    monkeypatch.setattr(_RangeIndex, 'BLOCK', 3)
+    generator = random.Random(3)
+
+    def intervals(count, width):
+        return IntervalSet((start, start + generator.randrange(width))
+                           for start in (generator.randrange(200) for _ in range(count)))
+
+    sets = [intervals(generator.randrange(4), 20) for _ in range(60)] + [IntervalSet([(50, 60)])] * 8
+    index = _RangeIndex(sets)
+    assert index.size < len(index.points)
+    everyone = (1 << len(sets)) - 1
+    for _ in range(300):
+        query = intervals(generator.randrange(1, 3), 40)
+        values = [value for start, end in query.intervals() for value in range(start, end + 1)]
+        overlapping = sum(1 << bit for bit, covered in enumerate(sets) if any(value in covered for value in values))
+        containing = sum(1 << bit for bit, covered in enumerate(sets) if all(value in covered for value in values))
+        assert index.overlapping(query) == overlapping
+        assert index.containing(query, everyone) == containing
@@ -0,0 +1,155 @@
+import pytest
+
+from fortigate.policy_engine import IPV4_MAX, AddressBook, IntervalSet, PolicyEngine, RouteTable, ipv4
+
+
+def refs(*names):
+    return [{'name': name} for name in names]
+
+
+def policy(policyid, srcaddr=('all',), dstaddr=('all',), service=('ALL',), action='accept',
+           srcintf=('port1',), dstintf=('port2',), **fields):
+    record = {'policyid': policyid, 'name': f'p{policyid}', 'action': action, 'status': 'enable',
+              'srcintf': refs(*srcintf), 'dstintf': refs(*dstintf), 'srcaddr': refs(*srcaddr),
+              'dstaddr': refs(*dstaddr), 'service': refs(*service), 'schedule': 'always'}
+    record.update(fields)
+    return record
+
+
+ADDRESSES = [
+    {'name': 'lan', 'type': 'ipmask', 'subnet': '192.168.1.0 255.255.255.0'},
+    {'name': 'web', 'type': 'ipmask', 'subnet': '10.0.0.0 255.255.255.0'},
+    {'name': 'range', 'type': 'iprange', 'start-ip': '10.0.1.10', 'end-ip': '10.0.1.20'},
+    {'name': 'odd', 'type': 'wildcard', 'wildcard': '10.0.0.1 255.255.255.1'},
+    {'name': 'cdn', 'type': 'fqdn', 'fqdn': 'cdn.example.com'},
+]
+GROUPS = [
+    {'name': 'servers', 'member': refs('web', 'range')},
+    {'name': 'web-but-range', 'member': refs('servers'), 'exclude': 'enable', 'exclude-member': refs('range')},
+]
+VIPS = [{'name': 'vip', 'extip': '203.0.113.10', 'mappedip': [{'range': '10.0.0.10'}]}]
+SERVICES = [
+    {'name': 'ALL', 'protocol': 'IP', 'protocol-number': 0},
+    {'name': 'HTTPS', 'protocol': 'TCP/UDP/SCTP', 'tcp-portrange': '443'},
+    {'name': 'DNS', 'protocol': 'TCP/UDP/SCTP', 'tcp-portrange': '53', 'udp-portrange': '53'},
+    {'name': 'PING', 'protocol': 'ICMP', 'icmptype': 8},
+]
+ROUTES = [
+    {'ip_mask': '0.0.0.0/0', 'interface': 'wan1', 'distance': 10},
+    {'ip_mask': '10.0.0.0/8', 'interface': 'port2', 'distance': 10},
+    {'ip_mask': '10.0.1.0/24', 'interface': 'port3', 'distance': 20},
+    {'ip_mask': '10.0.1.0/24', 'interface': 'port4', 'distance': 5},
+]
+
+
+def engine(*policies, **tables):
+    tables.setdefault('addresses', ADDRESSES)
+    tables.setdefault('address_groups', GROUPS)
+    tables.setdefault('vips', VIPS)
+    tables.setdefault('services', SERVICES)
+    tables.setdefault('routes', ROUTES)
+    return PolicyEngine(list(policies), **tables)
+
+
+def test_interval_set_merges_and_complements():
+    intervals = IntervalSet([(5, 9), (1, 3), (4, 4), (20, 30)])
+    assert intervals.intervals() == [(1, 9), (20, 30)]
+    assert 9 in intervals and 10 not in intervals
+    assert intervals.complement(40).intervals() == [(0, 0), (10, 19), (31, 40)]
+    assert intervals.difference(IntervalSet([(2, 25)]), 40).intervals() == [(1, 1), (26, 30)]
+
+
+def test_route_table_prefers_longest_prefix_then_distance():
+    routes = RouteTable(ROUTES)
+    assert routes.lookup(ipv4('10.0.1.5')) == 'port4'
+    assert routes.lookup(ipv4('10.9.9.9')) == 'port2'
+    assert routes.lookup(ipv4('8.8.8.8')) == 'wan1'
+    assert RouteTable([]).lookup(ipv4('8.8.8.8')) is None
+
+
+def test_address_book_resolves_groups_with_exclusions():
+    book = AddressBook(ADDRESSES, GROUPS, VIPS)
+    assert book.resolve('servers').cidrs() == ['10.0.0.0/24', '10.0.1.10/31', '10.0.1.12/30',
+                                               '10.0.1.16/30', '10.0.1.20/32']
+    assert book.resolve('web-but-range').intervals.intervals() == [(ipv4('10.0.0.0'), ipv4('10.0.0.255'))]
+    assert book.resolve('all').intervals.intervals() == [(0, IPV4_MAX)]
+    assert book.resolve('cdn').unknown == ['cdn']
+
+
+def test_address_book_update_drops_only_the_groups_above():
+    book = AddressBook(ADDRESSES, GROUPS, VIPS)
+    book.resolve('web-but-range')
+    book.resolve('lan')
+    dropped = book.update('address', {'name': 'range', 'type': 'iprange',
+                                      'start-ip': '10.0.2.1', 'end-ip': '10.0.2.2'})
+    assert dropped == {'range', 'servers', 'web-but-range'}
+    assert book.memoized == 2  # web and lan stay resolved
+    assert ipv4('10.0.2.1') in book.resolve('servers').intervals
+
+
+def test_first_matching_policy_wins():
+    rules = engine(policy(1, srcaddr=('lan',), dstaddr=('web',), service=('HTTPS',)),
+                   policy(2, srcaddr=('lan',), dstaddr=('all',), service=('ALL',), action='deny'))
+    assert rules.lookup('port1', '192.168.1.5', 'tcp', '10.0.0.8', dest_port=443)['policy_id'] == 1
+    assert rules.lookup('port1', '192.168.1.5', 'tcp', '10.0.0.8', dest_port=80)['policy_id'] == 2
+    assert rules.lookup('port1', '192.168.1.5', 'udp', '10.0.0.8', dest_port=443)['action'] == 'deny'
+
+
+def test_implicit_deny_and_missing_route():
+    rules = engine(policy(1, srcaddr=('lan',)), routes=[{'ip_mask': '10.0.0.0/8', 'interface': 'port2'}])
+    result = rules.lookup('port1', '172.16.0.1', 'tcp', '10.0.0.8', dest_port=443)
+    assert (result['policy_id'], result['policy_name'], result['exact']) == (0, 'Implicit Deny', True)
+    assert rules.lookup('port1', '192.168.1.5', 'tcp', '8.8.8.8')['note'] == 'No route to the destination'
+
+
+def test_egress_interface_comes_from_routes_unless_given():
+    rules = engine(policy(1, dstintf=('port4',)))
+    assert rules.lookup('port1', '192.168.1.5', 'tcp', '10.0.1.1')['policy_id'] == 1
+    assert rules.lookup('port1', '192.168.1.5', 'tcp', '10.0.0.1')['policy_id'] == 0
+    assert rules.lookup('port1', '192.168.1.5', 'tcp', '10.0.0.1', dstintf='port4')['policy_id'] == 1
+
+
+def test_zones_and_any_interfaces():
+    zones = [{'name': 'inside', 'interface': [{'interface-name': 'port1'}, {'interface-name': 'port5'}]}]
+    rules = engine(policy(1, srcintf=('inside',), dstintf=('any',)), zones=zones)
+    assert rules.lookup('port5', '1.1.1.1', 'tcp', '8.8.8.8')['policy_id'] == 1
+    assert rules.lookup('port6', '1.1.1.1', 'tcp', '8.8.8.8')['policy_id'] == 0
+
+
+def test_vip_destinations_are_routed_to_their_mapped_address():
+    rules = engine(policy(1, srcintf=('wan1',), dstaddr=('vip',), service=('HTTPS',)))
+    result = rules.lookup('wan1', '198.51.100.1', 'tcp', '203.0.113.10', dest_port=443)
+    assert (result['policy_id'], result['dstintf']) == (1, 'port2')
+
+
+def test_wildcard_negate_and_icmp():
+    rules = engine(policy(1, dstaddr=('odd',), service=('PING',)),
+                   policy(2, srcaddr=('lan',), **{'srcaddr-negate': 'enable'}))
+    assert rules.lookup('port1', '192.168.1.5', 'icmp', '10.0.0.7', icmp_type=8)['policy_id'] == 1
+    assert rules.lookup('port1', '192.168.1.5', 'icmp', '10.0.0.8', icmp_type=8)['policy_id'] == 0
+    assert rules.lookup('port1', '172.16.0.1', 'icmp', '10.0.0.8', icmp_type=8)['policy_id'] == 2
+
+
+def test_policies_only_the_device_can_evaluate_are_reported_uncertain():
+    rules = engine(policy(1, dstaddr=('cdn',)),
+                   policy(2, schedule='workhours'),
+                   policy(3, action='deny'))
+    result = rules.lookup('port1', '192.168.1.5', 'tcp', '10.0.0.8', dest_port=443)
+    assert result['policy_id'] == 3
+    assert result['exact'] is False
+    assert result['uncertain_policies'] == [{'policy_id': 1, 'conditions': ['cdn']},
+                                            {'policy_id': 2, 'conditions': ['schedule workhours']}]
+
+
+def test_disabled_policies_are_skipped():
+    rules = engine(policy(1, status='disable'), policy(2))
+    assert rules.stats()['policies'] == 1
+    assert rules.lookup('port1', '192.168.1.5', 'tcp', '10.0.0.8')['policy_id'] == 2
+
+
+def test_lookup_rejects_ipv6_and_unknown_protocols():
+    rules = engine(policy(1))
+    with pytest.raises(ValueError, match='only IPv4'):
+        rules.lookup('port1', '2001:db8::1', 'tcp', '10.0.0.8')
+    with pytest.raises(ValueError, match='Unknown protocol'):
+        rules.lookup('port1', '192.168.1.5', 'bogus', '10.0.0.8')
@@ -0,0 +1,167 @@
+import asyncio
+
+import pytest
+
+from fortigate import cache as cache_module
+from fortigate.references import ReferenceIndex, find_unused, policy_hit_counts
+
+
+def refs(*names):
+    return [{'name': name} for name in names]
+
+
+POLICIES = [
+    {'policyid': 1, 'name': 'web', 'srcaddr': refs('lan'), 'dstaddr': refs('servers'),
+     'service': refs('HTTPS'), 'srcintf': refs('port1'), 'dstintf': refs('port2'), 'schedule': 'always'},
+    {'policyid': 2, 'srcaddr': refs('lan'), 'dstaddr': refs('vips'), 'service': refs('ALL'),
+     'srcintf': refs('port1'), 'dstintf': refs('wan1'), 'profile-group': 'strict'},
+]
+
+
+def index_of(**tables):
+    index = ReferenceIndex()
+    for table, records in tables.items():
+        index.update_table(table, records)
+    return index
+
+
+def test_where_used_lists_the_referencing_records():
+    index = index_of(**{'firewall/policy': POLICIES,
+                        'firewall/addrgrp': [{'name': 'servers', 'member': refs('web1', 'lan')}]})
+    assert index.where_used('lan') == [
+        {'table': 'firewall/policy', 'id': 1, 'field': 'srcaddr', 'name': 'web', 'kind': 'address'},
+        {'table': 'firewall/policy', 'id': 2, 'field': 'srcaddr', 'kind': 'address'},
+        {'table': 'firewall/addrgrp', 'id': 'servers', 'field': 'member', 'kind': 'address'},
+    ]
+    assert index.where_used('port1', 'address') == []
+    assert [reference['id'] for reference in index.where_used('port1', 'interface')] == [1, 2]
+    assert index.where_used('strict') == [
+        {'table': 'firewall/policy', 'id': 2, 'field': 'profile-group', 'kind': 'profile-group'}]
+
+
+def test_newer_tables_are_indexed():
+    index = index_of(**{
+        'firewall/local-in-policy': [{'policyid': 7, 'intf': 'wan1', 'srcaddr': refs('admins'),
+                                      'dstaddr': refs('all'), 'service': refs('SSH')}],
+        'firewall/vipgrp': [{'name': 'vips', 'member': refs('vip1'), 'interface': 'wan1'}],
+        'firewall/shaping-policy': [{'id': 3, 'dstaddr': refs('admins')}],
+        'vpn.ipsec/phase2-interface': [{'name': 'p2', 'src-name': 'lan', 'dst-name': 'remote'}],
+    })
+    assert [(reference['table'], reference['id']) for reference in index.where_used('admins', 'address')] == [
+        ('firewall/local-in-policy', 7), ('firewall/shaping-policy', 3)]
+    assert index.where_used('vip1', 'address')[0]['table'] == 'firewall/vipgrp'
+    assert index.where_used('remote', 'address')[0]['field'] == 'dst-name'
+    assert index.referenced('interface') == {'wan1'}
+
+
+def test_update_table_replaces_only_that_table():
+    index = index_of(**{'firewall/policy': POLICIES,
+                        'firewall/addrgrp': [{'name': 'servers', 'member': refs('lan')}]})
+    assert index.update_table('firewall/policy', POLICIES) is False
+    assert index.update_table('firewall/policy', POLICIES[1:]) is True
+    assert [reference['table'] for reference in index.where_used('lan', 'address')] == [
+        'firewall/addrgrp', 'firewall/policy']
+    assert index.where_used('HTTPS', 'service') == []
+    index.update_table('firewall/policy', [])
+    assert index.referenced('service') == set()
+    assert index.stats() == {'tables': {'firewall/addrgrp': 1, 'firewall/policy': 0},
+                             'objects': 1, 'references': 1}
+
+
+def test_dropped_tables_leave_the_index():
+    index = index_of(**{'firewall/policy': POLICIES,
+                        'firewall/addrgrp': [{'name': 'servers', 'member': refs('lan')}]})
+    index.drop_table('firewall/addrgrp')
+    assert index.tables == ['firewall/policy']
+    assert [reference['id'] for reference in index.where_used('lan', 'address')] == [1, 2]
+    index.drop_table('firewall/addrgrp')
+    assert index.update_table('firewall/addrgrp', [{'name': 'servers', 'member': refs('lan')}]) is True
+
+
+def test_reference_index_reads_unreadable_tables_again(device, clock_of, monkeypatch):
+    pytest.importorskip('httpx')
+    from mcptool import references
+    from mcptool.base import fortigate_manager
+
+    clock = clock_of(cache_module)
+    monkeypatch.setattr(references, '_indexes', {})
+    api = device.api()
+    monkeypatch.setitem(fortigate_manager.async_devices, 'fw1', api)
+    device.tables['cmdb/firewall/addrgrp'] = [{'name': 'servers', 'member': refs('web1')}]
+
+    async def run():
+        index = await references.reference_index('fw1')
+        assert [reference['id'] for reference in index.where_used('web1')] == ['servers']
+
+        device.revision = '2'
+        device.failures['cmdb/firewall/addrgrp'] = 403
+        clock.now += api.cache.revision_interval + 1
+        index = await references.reference_index('fw1')
+        # The old references of the table are gone, and it is reported as not indexed
+        assert index.where_used('web1') == []
+        assert 'firewall/addrgrp' not in index.tables
+        assert references._indexes[('fw1', 'root')][0] is None
+
+        del device.failures['cmdb/firewall/addrgrp']
+        index = await references.reference_index('fw1')
+        assert [reference['id'] for reference in index.where_used('web1')] == ['servers']
+        assert references._indexes[('fw1', 'root')][0] == '2'
+
+    asyncio.run(run())
+
+
+def test_policy_hit_counts_reads_both_usage_formats():
+    usage = [{'policyid': 1, 'hit_count': 5}, {'policyid': 2, 'hits': '0'}, {'policyid': 3}, {'hit_count': 9}]
+    assert policy_hit_counts(usage) == {1: 5, 2: 0}
+    assert policy_hit_counts(None) == {}
+
+
+def test_find_unused_separates_unreferenced_from_zero_hit_only():
+    index = index_of(**{'firewall/policy': POLICIES,
+                        'firewall/addrgrp': [{'name': 'servers', 'member': refs('web1')},
+                                             {'name': 'old', 'member': refs('web2')}]})
+    objects = {'addresses': ('address', ['lan', 'web1', 'web2', 'spare']),
+               'address_groups': ('address', ['servers', 'old'])}
+    assert find_unused(index, objects) == {
+        'addresses': {'unreferenced': ['spare'], 'zero_hit_only': ['web2']},
+        'address_groups': {'unreferenced': ['old'], 'zero_hit_only': []},
+    }
+    # Policy 1 never hit: what only it uses goes with it, policy 2 keeps lan in use
+    result = find_unused(index, objects, hits={1: 0, 2: 10})
+    assert result['addresses']['zero_hit_only'] == ['web1', 'web2']
+    assert result['address_groups']['zero_hit_only'] == ['servers']
+    # Policies without a counter count as used
+    assert find_unused(index, objects, hits={2: 0})['addresses']['zero_hit_only'] == ['web2']
+
+
+def test_find_unused_handles_group_cycles():
+    index = index_of(**{'firewall/policy': POLICIES,
+                        'firewall/addrgrp': [{'name': 'a', 'member': refs('b', 'x')},
+                                             {'name': 'b', 'member': refs('a')},
+                                             {'name': 'servers', 'member': refs('b')}]})
+    objects = {'address_groups': ('address', ['a', 'b']), 'addresses': ('address', ['x'])}
+    # a and b only use each other, but b is also in servers, used by policy 1
+    assert find_unused(index, objects) == {
+        'address_groups': {'unreferenced': [], 'zero_hit_only': []},
+        'addresses': {'unreferenced': [], 'zero_hit_only': []},
+    }
+    index.update_table('firewall/addrgrp', [{'name': 'a', 'member': refs('b', 'x')},
+                                            {'name': 'b', 'member': refs('a')}])
+    assert find_unused(index, objects) == {
+        'address_groups': {'unreferenced': [], 'zero_hit_only': ['a', 'b']},
+        'addresses': {'unreferenced': [], 'zero_hit_only': ['x']},
+    }
+
+
+def test_find_unused_follows_vip_and_profile_groups():
+    index = index_of(**{'firewall/policy': POLICIES,
+                        'firewall/vipgrp': [{'name': 'vips', 'member': refs('vip1')}],
+                        'firewall/profile-group': [{'name': 'strict', 'av-profile': 'av-strict'},
+                                                   {'name': 'loose', 'av-profile': 'av-loose'}]})
+    objects = {'vips': ('address', ['vip1']), 'profile_groups': ('profile-group', ['strict', 'loose']),
+               'antivirus_profiles': ('av-profile', ['av-strict', 'av-loose'])}
+    assert find_unused(index, objects, hits={1: 4, 2: 0}) == {
+        'vips': {'unreferenced': [], 'zero_hit_only': ['vip1']},
+        'profile_groups': {'unreferenced': ['loose'], 'zero_hit_only': ['strict']},
+        'antivirus_profiles': {'unreferenced': [], 'zero_hit_only': ['av-loose', 'av-strict']},
+    }
@@ -0,0 +1,57 @@
+import logging
+
+import pytest
+
+from fortigate.request_log import RequestLogger
+
+
+class Records(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+@pytest.fixture
+def records():
+    logger = logging.getLogger('test-request-log')
+    handler = Records()
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+    handler.logger = logger
+    yield handler
+    logger.removeHandler(handler)
+
+
+def test_bodies_are_cut_to_max_body(records):
+    log = RequestLogger(records.logger, max_body=10)
+    log.request('POST', 'cmdb/firewall/address', 'root', data={'name': 'a-rather-long-name'})
+    log.response('GET', 'cmdb/firewall/address', 200, 0.0125, lambda: b'0123456789abcdef')
+    log.response('GET', 'cmdb/firewall/address', 200, 0.01, lambda: b'short')
+    assert records.messages[0].endswith('data={"name":"a...[truncated 19 of 29 chars]')
+    assert records.messages[1] == ('response method=GET endpoint=cmdb/firewall/address status=200 '
+                                   'elapsed_ms=12.5 body=0123456789...[truncated 6 of 16 chars]')
+    assert records.messages[2].endswith('body=short')
+
+
+def test_bodies_are_only_read_for_emitted_records(records):
+    def body():
+        raise AssertionError('body read for a dropped record')
+
+    records.logger.setLevel(logging.INFO)
+    log = RequestLogger(records.logger)
+    log.response('GET', 'cmdb/firewall/address', 200, 0.01, body)
+    log.failure('GET', 'cmdb/firewall/address', ValueError('refused'))
+    assert records.messages == ['request failed method=GET endpoint=cmdb/firewall/address error=refused']
+
+
+def test_endpoint_levels_and_sampling(records):
+    log = RequestLogger(records.logger, sample_rate=0.0,
+                        endpoint_levels={'monitor/': 'INFO', 'monitor/system/status': 'DEBUG'})
+    log.response('GET', 'monitor/system/config/backup', 200, 0.01, lambda: b'backup')
+    log.response('GET', 'monitor/system/status', 200, 0.01, lambda: b'status')
+    # Not sampled: the record is kept without its body
+    assert records.messages == ['response method=GET endpoint=monitor/system/status status=200 '
+                                'elapsed_ms=10.0 body=-']
@@ -0,0 +1,97 @@
+import httpx
+import pytest
+
+from fortigate import resilience
+from fortigate.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy, is_transient
+
+
+@pytest.fixture
+def clock(clock_of):
+    return clock_of(resilience)
+
+
+def status_error(status: int, headers: dict = None) -> httpx.HTTPStatusError:
+    request = httpx.Request('GET', 'https://fw/api/v2/cmdb/firewall/policy')
+    response = httpx.Response(status, headers=headers, request=request)
+    return httpx.HTTPStatusError(f"{status}", request=request, response=response)
+
+
+def test_transient_failures():
+    assert is_transient(httpx.ConnectError('refused'))
+    assert is_transient(httpx.ReadTimeout('timeout'))
+    assert is_transient(status_error(503))
+    assert is_transient(status_error(429))
+    assert not is_transient(status_error(404))
+    assert not is_transient(ValueError('bad'))
+
+
+def test_only_idempotent_methods_are_retried():
+    policy = RetryPolicy(attempts=3)
+    assert policy.delay('GET', 1, httpx.ConnectError('refused')) is not None
+    assert policy.delay('POST', 1, httpx.ConnectError('refused')) is None
+    assert policy.delay('GET', 1, status_error(400)) is None
+    assert policy.delay('GET', 1, CircuitOpenError('open')) is None
+
+
+def test_retries_stop_after_the_last_attempt():
+    policy = RetryPolicy(attempts=3)
+    assert policy.delay('GET', 2, httpx.ConnectError('refused')) is not None
+    assert policy.delay('GET', 3, httpx.ConnectError('refused')) is None
+    assert policy.stats()['retries'] == 1
+
+
+def test_backoff_is_bounded_and_honours_retry_after():
+    policy = RetryPolicy(attempts=10, backoff=0.5, max_backoff=2)
+    assert all(0 <= policy.delay('GET', attempt, httpx.ConnectError('x')) <= 2 for attempt in range(1, 9))
+    assert policy.delay('GET', 1, status_error(429, {'Retry-After': '1'})) == 1.0
+    assert policy.delay('GET', 1, status_error(429, {'Retry-After': '60'})) == 2.0
+
+
+def test_breaker_opens_after_consecutive_transient_failures(clock):
+    breaker = CircuitBreaker(failures=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.record(httpx.ConnectError('refused'))
+    # An answer, even an error one, proves the device is reachable
+    breaker.record(status_error(404))
+    for _ in range(2):
+        breaker.record(httpx.ConnectError('refused'))
+    breaker.before_request('fw')
+    breaker.record(httpx.ConnectError('refused'))
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request('fw')
+    assert breaker.stats()['rejected'] == 1
+
+
+def test_breaker_lets_one_trial_through_after_reset_timeout(clock):
+    breaker = CircuitBreaker(failures=1, reset_timeout=30)
+    breaker.record(httpx.ConnectError('refused'))
+    clock.now += 30
+    breaker.before_request('fw')
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request('fw')
+    breaker.record(None)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_request('fw')
+
+
+def test_failed_trial_opens_the_circuit_again(clock):
+    breaker = CircuitBreaker(failures=5, reset_timeout=30)
+    for _ in range(5):
+        breaker.record(httpx.ConnectError('refused'))
+    clock.now += 31
+    breaker.before_request('fw')
+    breaker.record(httpx.ConnectError('refused'))
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request('fw')
+    assert breaker.stats()['opened'] == 2
+
+
+def test_breaker_can_be_disabled(clock):
+    breaker = CircuitBreaker(failures=0)
+    for _ in range(100):
+        breaker.record(httpx.ConnectError('refused'))
+    breaker.before_request('fw')
+    assert breaker.state == CircuitBreaker.CLOSED
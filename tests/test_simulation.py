@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip('httpx')
+
+from fortigate import cache as cache_module
+from mcptool import simulation
+from mcptool.base import fortigate_manager
+
+POLICIES = [{'policyid': 1, 'action': 'accept', 'srcintf': [{'name': 'port1'}], 'dstintf': [{'name': 'any'}],
+             'srcaddr': [{'name': 'all'}], 'dstaddr': [{'name': 'web'}], 'service': [{'name': 'ALL'}],
+             'schedule': 'always'}]
+SERVICES = [{'name': 'ALL', 'protocol': 'IP', 'protocol-number': 0}]
+
+
+def web(subnet):
+    return [{'name': 'web', 'type': 'ipmask', 'subnet': f'{subnet} 255.255.255.0'}]
+
+
+@pytest.fixture
+def fw1(device, clock_of, monkeypatch):
+    """Registers the fake device as fw1, with empty simulation caches"""
+    device.tables.update({'cmdb/firewall/address': web('10.0.0.0'), 'cmdb/firewall/policy': POLICIES,
+                          'cmdb/firewall/service/custom': SERVICES})
+    device.clock = clock_of(cache_module)
+    monkeypatch.setattr(simulation, '_engines', {})
+    monkeypatch.setattr(simulation, '_address_books', {})
+    monkeypatch.setitem(fortigate_manager.async_devices, 'fw1', device.api())
+    return device
+
+
+def change_within_ttl(device, revision, **tables):
+    """Changes the device configuration once the last revision read is no longer trusted"""
+    device.revision = revision
+    device.tables.update(tables)
+    api = fortigate_manager.get_async_device('fw1')
+    device.clock.now += api.cache.revision_interval + 1
+    assert api.cache.revision_interval + 1 < api.cache.ttl
+
+
+def matched(engine, dest):
+    return engine.lookup('port1', '192.168.1.5', 'tcp', dest, dest_port=443)['policy_id']
+
+
+def test_policy_engine_is_rebuilt_from_the_tables_of_a_new_revision(fw1):
+    async def run():
+        engine = await simulation.policy_engine('fw1')
+        assert (engine.revision, matched(engine, '10.0.0.8'), matched(engine, '10.0.9.8')) == ('1', 1, 0)
+
+        change_within_ttl(fw1, '2', **{'cmdb/firewall/address': web('10.0.9.0'),
+                                       'cmdb/firewall/policy': POLICIES + [dict(POLICIES[0], policyid=2)]})
+        engine = await simulation.policy_engine('fw1')
+        assert (engine.revision, matched(engine, '10.0.0.8'), matched(engine, '10.0.9.8')) == ('2', 0, 1)
+        assert engine.stats()['policies'] == 2
+        # Same revision: the compiled set is kept
+        assert await simulation.policy_engine('fw1') is engine
+
+    asyncio.run(run())
+
+
+def test_address_book_syncs_with_the_tables_of_a_new_revision(fw1):
+    async def run():
+        book = await simulation.address_book('fw1')
+        assert book.resolve('web').cidrs() == ['10.0.0.0/24']
+
+        change_within_ttl(fw1, '2', **{'cmdb/firewall/address': web('10.0.9.0')})
+        assert await simulation.address_book('fw1') is book
+        assert book.resolve('web').cidrs() == ['10.0.9.0/24']
+        assert simulation._address_books[('fw1', 'root')][0] == '2'
+
+    asyncio.run(run())
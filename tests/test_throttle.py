@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from fortigate import throttle as throttle_module
+from fortigate.throttle import ConcurrencyLimiter, DeviceThrottle, TokenBucket
+
+
+@pytest.fixture
+def clock(clock_of):
+    return clock_of(throttle_module)
+
+
+def test_token_bucket_allows_a_burst_then_spaces_requests(clock):
+    bucket = TokenBucket(rate=2, burst=2)
+    assert [bucket.reserve() for _ in range(4)] == [0.0, 0.0, 0.5, 1.0]
+    clock.now += 2
+    # The two reservations made ahead were paid back, one token is left
+    assert bucket.reserve() == 0.0
+
+
+def test_token_bucket_without_rate_never_waits(clock):
+    bucket = TokenBucket(rate=0)
+    assert all(bucket.reserve() == 0.0 for _ in range(100))
+
+
+def test_limiter_hands_slots_to_waiters_in_arrival_order():
+    async def run():
+        limiter = ConcurrencyLimiter(2)
+        order = []
+
+        async def worker(name):
+            await limiter.acquire_async()
+            order.append(name)
+            await asyncio.sleep(0.01)
+            limiter.release()
+
+        await asyncio.gather(*(worker(i) for i in range(6)))
+        return limiter, order
+
+    limiter, order = asyncio.run(run())
+    assert order == list(range(6))
+    assert limiter.active == 0 and limiter.waiting == 0
+
+
+def test_limiter_caps_requests_in_flight():
+    async def run():
+        throttle = DeviceThrottle(max_in_flight=3)
+        peak = current = 0
+
+        async def request():
+            nonlocal peak, current
+            async with throttle.aslot():
+                current += 1
+                peak = max(peak, current)
+                await asyncio.sleep(0.005)
+                current -= 1
+
+        await asyncio.gather(*(request() for _ in range(20)))
+        return throttle, peak
+
+    throttle, peak = asyncio.run(run())
+    assert peak == 3
+    stats = throttle.stats()
+    assert stats['requests'] == 20 and stats['in_flight'] == 0 and stats['queued'] > 0
+
+
+def test_cancelled_waiter_gives_its_slot_back():
+    async def run():
+        limiter = ConcurrencyLimiter(1)
+        await limiter.acquire_async()
+        waiter = asyncio.create_task(limiter.acquire_async())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        limiter.release()
+        await asyncio.wait_for(limiter.acquire_async(), 1)
+        return limiter
+
+    limiter = asyncio.run(run())
+    assert limiter.active == 1 and limiter.waiting == 0
+
+
+def test_blocking_slot_counts_requests():
+    throttle = DeviceThrottle(max_in_flight=1)
+    with throttle.slot():
+        assert throttle.stats()['in_flight'] == 1
+    assert throttle.stats()['in_flight'] == 0
+    assert throttle.stats()['requests'] == 1
+
+
+def test_from_config_defaults():
+    throttle = DeviceThrottle.from_config(None)
+    assert throttle.limiter.limit == throttle_module.DEFAULT_MAX_IN_FLIGHT
+    assert throttle.bucket.rate == throttle_module.DEFAULT_RATE
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from fortigate.timeouts import AdaptiveTimeouts, percentile
+
+
+def test_percentile_is_nearest_rank():
+    samples = [float(n) for n in range(1, 101)]
+    assert (percentile(samples, 0.5), percentile(samples, 0.99), percentile([3.0], 0.99)) == (50.0, 99.0, 3.0)
+
+
+def test_defaults_hold_until_an_endpoint_has_enough_samples():
+    timeouts = AdaptiveTimeouts(min_samples=5)
+    for _ in range(4):
+        timeouts.observe('cmdb/firewall/address/web', 0.1)
+    assert timeouts.get('cmdb/firewall/address') == (10.0, 30.0)
+
+    # Entries of a table share its window
+    timeouts.observe('cmdb/firewall/address', 0.5)
+    assert timeouts.get('cmdb/firewall/address/db') == (2.0, 2.0)
+    assert timeouts.get('cmdb/firewall/policy')[1] == 30.0
+
+
+def test_read_timeouts_follow_the_p99_latency_within_bounds():
+    timeouts = AdaptiveTimeouts(min_samples=10, maximum=20.0, connect=5.0)
+    for elapsed in [1.0] * 9 + [4.0]:
+        timeouts.observe('monitor/firewall/session', elapsed)
+    assert timeouts.get('monitor/firewall/session') == (3.0, 12.0)
+
+    for _ in range(10):
+        timeouts.observe('monitor/firewall/session', 10.0)
+    assert timeouts.get('monitor/firewall/session') == (5.0, 20.0)
+
+
+def test_overrides_take_precedence_longest_prefix_first():
+    timeouts = AdaptiveTimeouts(min_samples=1, endpoints={'monitor/': 60, 'monitor/system/status': {'read': 5,
+                                                                                                   'connect': 1}})
+    timeouts.observe('monitor/system/status', 0.1)
+    assert timeouts.get('monitor/system/status') == (1.0, 5.0)
+    assert timeouts.get('monitor/firewall/session')[1] == 60.0
+    assert timeouts.get('monitor/system/config/backup')[1] == 300.0
+    assert AdaptiveTimeouts(adaptive=False, min_samples=1).get('cmdb/firewall/address') == (10.0, 30.0)
+
+
+def test_a_timed_out_request_raises_the_endpoint_timeout(device):
+    httpx = pytest.importorskip('httpx')
+
+    def handler(request):
+        raise httpx.ReadTimeout('timed out', request=request)
+
+    async def run():
+        api = device.api(retry={'attempts': 1}, timeouts={'min_samples': 2, 'default': 4, 'multiplier': 3})
+        api.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        api.timeouts.observe('cmdb/firewall/address', 1.0)
+        for _ in range(2):
+            with pytest.raises(httpx.ReadTimeout):
+                await api.get_address_objects()
+        await api.aclose()
+        return api.timeouts
+
+    timeouts = asyncio.run(run())
+    # Each timeout hit is a sample: 4s (the default), then 12s, so the next read gets 36s
+    assert timeouts.stats()['endpoints']['cmdb/firewall/address']['samples'] == 3
+    assert timeouts.get('cmdb/firewall/address')[1] == 36.0
@@ -0,0 +1,63 @@
+import asyncio
+import logging
+
+import pytest
+
+pytest.importorskip('httpx')
+
+from fortigate import transport
+from fortigate.transport import ConnectionSettings, ConnectionStats, IdleEviction
+
+
+def test_settings_are_read_from_the_device_configuration_and_clamped():
+    settings = ConnectionSettings.from_config({'pool_size': 4, 'keepalive': 8, 'keepalive_expiry': 5})
+    assert (settings.pool_size, settings.keepalive, settings.keepalive_expiry, settings.http2) == (4, 4, 5.0, False)
+    limits = settings.limits()
+    assert (limits.max_connections, limits.max_keepalive_connections, limits.keepalive_expiry) == (4, 4, 5.0)
+    assert settings.adapter()._pool_maxsize == 4
+
+    settings = ConnectionSettings.from_config({'pool_size': 0, 'keepalive': -1})
+    assert (settings.pool_size, settings.keepalive) == (1, 0)
+
+
+def test_reuse_rate_counts_requests_served_on_open_connections():
+    stats = ConnectionStats()
+    settings = ConnectionSettings()
+    assert stats.stats(settings)['reuse_rate'] == 0.0
+
+    for _ in range(4):
+        stats.record_request()
+    asyncio.run(stats.trace('connection.connect_tcp.complete', {}))
+    asyncio.run(stats.trace('connection.send_request_headers.complete', {}))
+    stats.record_http_version('HTTP/2')
+    result = stats.stats(settings, connections=1)
+    assert (result['requests'], result['connections_opened'], result['reuse_rate'], result['http_version']) == \
+        (4, 2, 0.5, 'HTTP/2')
+
+
+def test_idle_pools_are_evicted_and_their_connections_kept_in_the_counters(clock_of):
+    clock = clock_of(transport)
+    settings = ConnectionSettings(keepalive_expiry=30)
+    stats = ConnectionStats()
+    adapter = settings.adapter()
+    eviction = IdleEviction(adapter, stats, settings.keepalive_expiry)
+    adapter.poolmanager.connection_from_host('fw.example.com', 443, 'https').num_connections = 2
+
+    clock.now += 30
+    eviction.touch()
+    assert len(adapter.poolmanager.pools) == 1
+    clock.now += 31
+    eviction.touch()
+    assert len(adapter.poolmanager.pools) == 0
+    assert stats.connections == 2
+
+
+def test_http2_falls_back_to_http1_without_h2(monkeypatch, caplog):
+    from fortigate import fortigate
+
+    monkeypatch.setattr(fortigate, 'http2_available', lambda: False)
+    with caplog.at_level(logging.WARNING):
+        api = fortigate.AsyncFortigateAPI('fw.example.com', 'token', connection={'http2': True})
+    assert api.connection.http2 is False
+    assert "'h2' package is not installed" in caplog.text
+    asyncio.run(api.aclose())